@@ -0,0 +1,106 @@
+"""
+日志显示压测：比较逐行信号 + QTextEdit.append 与 LogBuffer 批量显示的界面线程耗时。
+
+    python benchmarks/bench_log_view.py --lines 10000
+
+需要 PyQt5，可在无显示器的环境中运行（QT_QPA_PLATFORM=offscreen）。
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QPlainTextEdit, QTextEdit
+
+from utils.log_buffer import LogBuffer
+
+LINE = "📄 打印 PDF: C:/打印/101/送货单_0001.pdf 🖨️ 打印机: EPSON LQ-630K"
+
+
+class _Emitter(QObject):
+    line = pyqtSignal(str)
+
+
+def _produce(callback, lines):
+    for i in range(lines):
+        callback(f"{LINE} #{i}")
+
+
+def bench_per_line(app, lines):
+    """旧方式：每行一个跨线程信号，QTextEdit 不限行数"""
+    view = QTextEdit()
+    view.resize(800, 400)
+    view.show()
+    emitter = _Emitter()
+    received = [0]
+
+    def on_line(text):
+        view.append(text)
+        received[0] += 1
+        if received[0] == lines:
+            app.quit()
+
+    emitter.line.connect(on_line)
+    worker = threading.Thread(target=_produce, args=(emitter.line.emit, lines))
+    return _run_event_loop(app, worker)
+
+
+def _run_event_loop(app, worker):
+    """运行事件循环直到 app.quit()，返回界面线程的 CPU 时间（包含信号分发和重新布局）"""
+    QTimer.singleShot(0, worker.start)
+    start = time.thread_time()
+    app.exec_()
+    ui_seconds = time.thread_time() - start
+    worker.join()
+    return ui_seconds
+
+
+def bench_buffered(app, lines, interval_ms=100, max_view_lines=5000):
+    """新方式：LogBuffer 缓冲，定时批量追加到限制行数的 QPlainTextEdit"""
+    view = QPlainTextEdit()
+    view.setMaximumBlockCount(max_view_lines)
+    view.resize(800, 400)
+    view.show()
+    buffer = LogBuffer()
+    worker = threading.Thread(target=_produce, args=(buffer.append, lines))
+
+    def flush():
+        batch = buffer.drain(1000)
+        if batch:
+            view.appendPlainText("\n".join(batch))
+        if not worker.is_alive() and buffer.total == lines and not len(buffer):
+            app.quit()
+
+    timer = QTimer()
+    timer.setInterval(interval_ms)
+    timer.timeout.connect(flush)
+    timer.start()
+    return _run_event_loop(app, worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--output", help="结果保存为 JSON")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    result = {
+        "lines": args.lines,
+        "per_line_ui_seconds": round(bench_per_line(app, args.lines), 4),
+        "buffered_ui_seconds": round(bench_buffered(app, args.lines), 4),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+打印流程压测：生成模拟的诊所目录，用模拟打印后端运行 PrinterCore.run()，
+统计每分钟文件数、打印任务数和页数、各阶段耗时分位数（扫描、打开、页面设置、提交打印、移动）、
+打印机空闲时间和内存峰值，以及各诊所从开始到打印完成的时间（比较打印顺序策略）。
+
+    python benchmarks/bench_pipeline.py --clinics 40 --files 10 --output before.json
+    python benchmarks/bench_pipeline.py --clinics 40 --files 10 --compare before.json
+
+--set 覆盖 PrinterCore 配置，--sim 覆盖模拟后端参数，例如:
+    --set excel_prerender=true --sim excel_render_seconds=0.2
+    --size-spread 0.9 --set schedule_policy=smallest_first
+    --corrupt-ratio 0.05 --set preflight=false
+    --set merge_clinic_jobs=true --sim job_latency=1.5
+    --failure-rate 0.05 --set retry_failed=false     （对比：出错即停止该打印机的队列）
+    --failure-rate 0.05 --set 'retry_policies={"spooler": {"delay": 0.5}, "com_busy": {"delay": 0.5}}'
+
+不依赖 Windows 和 Qt，可在 Linux 上运行。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from printer_core import PrinterCore
+from synthetic_tree import make_clinic_tree
+
+# 模拟后端默认参数：接近针式打印机 + 本地 Excel 的耗时
+DEFAULT_SIMULATION = {
+    "job_latency": 0.02,
+    "pages_per_minute": 600,
+    "excel_start_seconds": 0.2,
+    "excel_open_seconds": 0.03,
+    "excel_render_seconds": 0.05,
+    "page_setup_write_seconds": 0.002,
+    "excel_sheet_count": 2,
+    # 0: 按 PDF 文件的实际页数
+    "pdf_pages": 0,
+    "seed": 1,
+}
+
+
+class StageRecorder:
+    """记录各阶段每次调用的耗时"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.clinic_done: List[float] = []
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples[stage].append(elapsed)
+        return timed
+
+    def mark_clinic_done(self):
+        with self._lock:
+            self.clinic_done.append(time.perf_counter())
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, values in self.samples.items():
+            values = sorted(values)
+            result[stage] = {
+                "count": len(values),
+                "total": round(sum(values), 4),
+                "p50": round(percentile(values, 50), 5),
+                "p90": round(percentile(values, 90), 5),
+                "p99": round(percentile(values, 99), 5),
+                "max": round(values[-1], 5),
+            }
+        return result
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def instrument(core: PrinterCore, recorder: StageRecorder):
+    """在 PrinterCore 和模拟后端的各阶段外面包一层计时"""
+    core.build_plan = recorder.wrap("scan", core.build_plan)
+    core.mover.relocate = recorder.wrap("move", core.mover.relocate)
+    core.process_job = recorder.wrap("job", core.process_job)
+    core.page_setup.apply = recorder.wrap("page_setup", core.page_setup.apply)
+
+    # 诊所目录打印完时调用，记录完成时刻
+    sweep_clinic = core.sweep_clinic
+
+    def clinic_finished(root):
+        recorder.mark_clinic_done()
+        return sweep_clinic(root)
+
+    core.sweep_clinic = clinic_finished
+
+    backend = core.backend
+    backend.print_pdf = recorder.wrap("spool", backend.print_pdf)
+
+    factory = core.excel_factory
+    create = factory.create
+
+    def create_app():
+        app = create()
+        open_workbook = app.Workbooks.Open
+
+        def open_and_wrap(*args, **kwargs):
+            wb = open_workbook(*args, **kwargs)
+            wb.PrintOut = recorder.wrap("spool", wb.PrintOut)
+            wb.ExportAsFixedFormat = recorder.wrap("render", wb.ExportAsFixedFormat)
+            return wb
+
+        app.Workbooks.Open = recorder.wrap("open", open_and_wrap)
+        return app
+
+    factory.create = recorder.wrap("excel_start", create_app)
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    # Linux 上单位为 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def run_once(args, workdir: str, run_index: int) -> Dict:
+    source = os.path.join(workdir, f"打印_{run_index}")
+    counts = make_clinic_tree(source, args.clinics, args.files, args.xlsx_ratio, seed=args.seed,
+                              size_spread=args.size_spread, corrupt_ratio=args.corrupt_ratio)
+
+    simulation = dict(DEFAULT_SIMULATION)
+    if args.failure_rate:
+        # 提交打印任务和打开工作簿（Excel 忙）各按该概率失败
+        simulation.update(failure_rate=args.failure_rate, excel_failure_rate=args.failure_rate)
+    simulation.update(args.sim)
+    config = {
+        "source_dir": source,
+        "monthly_printer_name": "模拟激光打印机",
+        "delay_seconds": 5,
+        "enable_wait_prompt": False,
+        "printer_backend": "simulated",
+        "simulated_backend": simulation,
+        "journal_path": os.path.join(workdir, f"journal_{run_index}.db"),
+        "prerender_dir": os.path.join(workdir, "prerender"),
+        "render_cache_dir": os.path.join(workdir, f"render_cache_{run_index}"),
+        "merge_dir": os.path.join(workdir, "merged"),
+        "quarantine_dir": os.path.join(workdir, f"quarantine_{run_index}"),
+    }
+    config.update(args.set)
+
+    recorder = StageRecorder()
+    core = PrinterCore(config, None, lambda message: None)
+    instrument(core, recorder)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    core.run()
+    elapsed = time.perf_counter() - started
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    spooler = core.backend.spooler
+    spooler.wait_idle(30)
+    printers = {}
+    for name, stats in spooler.stats()["printers"].items():
+        printers[name] = {
+            "jobs": stats["completed"],
+            "pages": stats["pages"],
+            "busy_seconds": stats["busy_seconds"],
+            # 本轮打印期间打印机没有任务可做的时间
+            "idle_seconds": round(max(0.0, elapsed - stats["busy_seconds"]), 3),
+        }
+
+    done = core.progress.done if core.progress else 0
+    spool_jobs = sum(p["jobs"] for p in printers.values())
+    pages = sum(p["pages"] for p in printers.values())
+    clinic_waits = sorted(t - started for t in recorder.clinic_done)
+    return {
+        "files": counts,
+        "printed": done,
+        "failed": core.progress.failed if core.progress else 0,
+        # 打印前检查跳过的文件
+        "skipped": int(core.metrics.counter_total("preflight_problems_total")),
+        # 失败后进入重试队列的次数，移到隔离目录的文件数
+        "retries": int(core.metrics.counter_total("retries_total")),
+        "quarantined": int(core.metrics.counter_total("quarantined_total")),
+        # 本轮结束时仍留在源目录的文件（出错停止或重试用尽）
+        "unprinted": sum(len(files) for _, _, files in os.walk(source)),
+        "elapsed": round(elapsed, 3),
+        "files_per_minute": round(done * 60.0 / elapsed, 1) if elapsed > 0 else 0.0,
+        # 提交给打印队列的任务数和页数（合并打印时一个任务包含多个文件）
+        "jobs_per_minute": round(spool_jobs * 60.0 / elapsed, 1) if elapsed > 0 else 0.0,
+        "pages_per_minute": round(pages * 60.0 / elapsed, 1) if elapsed > 0 else 0.0,
+        "spool_jobs": spool_jobs,
+        "pages": pages,
+        "stages": recorder.summary(),
+        # 各诊所从开始到打印完成的秒数
+        "clinic_wait": {
+            "count": len(clinic_waits),
+            "avg": round(sum(clinic_waits) / len(clinic_waits), 3) if clinic_waits else 0.0,
+            "p50": round(percentile(clinic_waits, 50), 3),
+            "p90": round(percentile(clinic_waits, 90), 3),
+            "max": round(clinic_waits[-1], 3) if clinic_waits else 0.0,
+        },
+        # PrinterCore 自身记录的阶段统计（core.metrics）
+        "core_stages": core.metrics.run_summary(),
+        "printers": printers,
+        "traced_peak_mb": round(traced_peak / 1024.0 / 1024.0, 2),
+    }
+
+
+def parse_assignments(values: List[str]) -> Dict:
+    """把 key=value 解析为字典，value 按 JSON 解析（失败时作为字符串）"""
+    result = {}
+    for item in values or []:
+        key, _, raw = item.partition("=")
+        try:
+            result[key] = json.loads(raw)
+        except ValueError:
+            result[key] = raw
+    return result
+
+
+def compare(previous: Dict, current: Dict):
+    """与之前保存的结果对比"""
+    def change(old, new):
+        return f"{old} -> {new} ({(new - old) / old * 100:+.1f}%)" if old else f"{old} -> {new}"
+
+    print(f"files/min: {change(previous['files_per_minute'], current['files_per_minute'])}")
+    print(f"elapsed:   {change(previous['elapsed'], current['elapsed'])}")
+    for key in ("printed", "unprinted", "retries"):
+        if key in previous and key in current:
+            print(f"{key}: {previous[key]} -> {current[key]}")
+    for key in ("jobs_per_minute", "pages_per_minute"):
+        if key in previous and key in current:
+            print(f"{key.replace('_per_minute', '')}/min: {change(previous[key], current[key])}")
+    if previous.get("clinic_wait") and current.get("clinic_wait"):
+        print(f"clinic wait avg: {change(previous['clinic_wait']['avg'], current['clinic_wait']['avg'])}")
+    for stage, stats in current["stages"].items():
+        old = previous.get("stages", {}).get(stage)
+        if old:
+            print(f"{stage:12s} p50 {change(old['p50'], stats['p50'])}, p90 {change(old['p90'], stats['p90'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clinics", type=int, default=40)
+    parser.add_argument("--files", type=int, default=10, help="每个诊所的出货单/送货单数量")
+    parser.add_argument("--xlsx-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size-spread", type=float, default=0.0, help="各诊所文件数的随机幅度，如 0.9")
+    parser.add_argument("--corrupt-ratio", type=float, default=0.0, help="无法打印的文件比例，如 0.05")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="注入的打印/Excel 失败概率，如 0.05")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="覆盖 PrinterCore 配置")
+    parser.add_argument("--sim", action="append", metavar="KEY=VALUE", help="覆盖模拟后端参数")
+    parser.add_argument("--output", help="结果保存为 JSON")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+    args.set = parse_assignments(args.set)
+    args.sim = parse_assignments(args.sim)
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        runs = [run_once(args, workdir, i) for i in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    best = max(runs, key=lambda r: r["files_per_minute"])
+    result = {
+        "params": {"clinics": args.clinics, "files": args.files, "xlsx_ratio": args.xlsx_ratio,
+                   "seed": args.seed, "size_spread": args.size_spread,
+                   "corrupt_ratio": args.corrupt_ratio, "failure_rate": args.failure_rate,
+                   "set": args.set, "sim": args.sim},
+        "files_per_minute": best["files_per_minute"],
+        "jobs_per_minute": best["jobs_per_minute"],
+        "pages_per_minute": best["pages_per_minute"],
+        "elapsed": best["elapsed"],
+        "printed": best["printed"],
+        "unprinted": best["unprinted"],
+        "retries": best["retries"],
+        "quarantined": best["quarantined"],
+        "clinic_wait": best["clinic_wait"],
+        "stages": best["stages"],
+        "peak_rss_mb": peak_rss_mb(),
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+生成与实际打印目录结构相同的测试目录：数字命名的诊所目录，PDF/XLSX 混合，每个诊所一份月结单，
+部分目录中有 Excel 打开时留下的 ~$ 锁文件；--corrupt-ratio 时混入没有内容的 PDF 和有打开密码的 XLSX。
+
+    python benchmarks/synthetic_tree.py /tmp/打印 --clinics 40 --files 10
+"""
+import os
+import random
+import zipfile
+import argparse
+from typing import Dict
+
+
+def make_pdf(path: str, pages: int = 1, padding: int = 0):
+    """最小的有效 PDF（可被页数统计等工具解析）"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + i} 0 R" for i in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    for _ in range(pages):
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("ascii")
+    if padding:
+        out += b"%" + b"0" * padding + b"\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_xlsx(path: str, sheets: int = 1, rows: int = 20):
+    """最小的有效 XLSX（zip + SpreadsheetML）"""
+    ns = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    pkg_rel = "http://schemas.openxmlformats.org/package/2006/relationships"
+    sheet_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{sheet_type}"/>'
+            for i in range(1, sheets + 1))
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/xl/workbook.xml" '
+                   'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                   f'{overrides}</Types>')
+        z.writestr("_rels/.rels",
+                   f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{pkg_rel}">'
+                   f'<Relationship Id="rId1" Type="{rel_ns}/officeDocument" Target="xl/workbook.xml"/>'
+                   '</Relationships>')
+        sheet_list = "".join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in range(1, sheets + 1))
+        z.writestr("xl/workbook.xml",
+                   f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   f'<workbook xmlns="{ns}" xmlns:r="{rel_ns}"><sheets>{sheet_list}</sheets></workbook>')
+        rels = "".join(f'<Relationship Id="rId{i}" Type="{rel_ns}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                       for i in range(1, sheets + 1))
+        z.writestr("xl/_rels/workbook.xml.rels",
+                   f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                   f'<Relationships xmlns="{pkg_rel}">{rels}</Relationships>')
+        for i in range(1, sheets + 1):
+            data = "".join(f'<row r="{r}"><c r="A{r}"><v>{r}</v></c></row>' for r in range(1, rows + 1))
+            z.writestr(f"xl/worksheets/sheet{i}.xml",
+                       f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                       f'<worksheet xmlns="{ns}"><dimension ref="A1:A{rows}"/>'
+                       f'<sheetData>{data}</sheetData></worksheet>')
+
+
+def make_broken_file(path: str):
+    """无法打印的文件：PDF 为预先分配空间但没有写入内容的下载（全是 0），XLSX 写成加密工作簿的 OLE 文件头"""
+    if path.lower().endswith(".pdf"):
+        with open(path, "wb") as f:
+            f.write(b"\x00" * 1024)
+    else:
+        with open(path, "wb") as f:
+            f.write(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 504)
+
+
+def make_clinic_tree(root: str, clinics: int = 40, files_per_clinic: int = 10, xlsx_ratio: float = 0.3,
+                     monthly: bool = True, lock_ratio: float = 0.1, max_pages: int = 3,
+                     seed: int = 0, size_spread: float = 0.0, corrupt_ratio: float = 0.0) -> Dict[str, int]:
+    """
+    在 root 下生成诊所目录，返回各类文件的数量。
+
+    size_spread 大于 0 时各诊所的文件数在 files_per_clinic * (1 ± size_spread) 之间随机，
+    用于比较不同打印顺序策略；corrupt_ratio 为出货单/送货单中无法打印的文件比例。
+    """
+    rng = random.Random(seed)
+    sizes = random.Random(seed + 1)
+    broken = random.Random(seed + 2)
+    counts = {"clinics": clinics, "pdf": 0, "xlsx": 0, "monthly": 0, "locks": 0, "corrupt": 0}
+    for c in range(clinics):
+        clinic_dir = os.path.join(root, str(101 + c))
+        os.makedirs(clinic_dir, exist_ok=True)
+        files = files_per_clinic
+        if size_spread > 0:
+            files = max(1, round(files_per_clinic * sizes.uniform(1 - size_spread, 1 + size_spread)))
+        for i in range(files):
+            if rng.random() < xlsx_ratio:
+                make_xlsx(os.path.join(clinic_dir, f"出货单_{i + 1}.xlsx"), sheets=rng.randint(1, 3))
+                counts["xlsx"] += 1
+            else:
+                make_pdf(os.path.join(clinic_dir, f"送货单_{i + 1}.pdf"), pages=rng.randint(1, max_pages),
+                         padding=rng.randint(0, 20000))
+                counts["pdf"] += 1
+            if corrupt_ratio and broken.random() < corrupt_ratio:
+                name = f"出货单_{i + 1}.xlsx" if os.path.exists(os.path.join(clinic_dir, f"出货单_{i + 1}.xlsx")) \
+                    else f"送货单_{i + 1}.pdf"
+                make_broken_file(os.path.join(clinic_dir, name))
+                counts["corrupt"] += 1
+        if monthly:
+            name = f"月结单_{101 + c}.xlsx"
+            make_xlsx(os.path.join(clinic_dir, name), sheets=rng.randint(1, 4), rows=60)
+            counts["monthly"] += 1
+            if rng.random() < lock_ratio:
+                # Excel 打开文件时留下的锁文件，不应被打印
+                with open(os.path.join(clinic_dir, "~$" + name), "wb") as f:
+                    f.write(b"\x00" * 165)
+                counts["locks"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    parser.add_argument("--clinics", type=int, default=40)
+    parser.add_argument("--files", type=int, default=10, help="每个诊所的出货单/送货单数量")
+    parser.add_argument("--xlsx-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size-spread", type=float, default=0.0, help="各诊所文件数的随机幅度，如 0.9")
+    parser.add_argument("--corrupt-ratio", type=float, default=0.0, help="无法打印的文件比例，如 0.05")
+    args = parser.parse_args()
+    print(make_clinic_tree(args.root, args.clinics, args.files, args.xlsx_ratio, seed=args.seed,
+                           size_spread=args.size_spread, corrupt_ratio=args.corrupt_ratio))
+
+
+if __name__ == "__main__":
+    main()
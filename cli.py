@@ -0,0 +1,234 @@
+"""
+无界面的命令行入口：按 config/settings.json（或 --config 指定的文件）中的设置运行 PrinterCore，
+不导入 PyQt5，用于计划任务 / Windows 服务的夜间无人值守打印，也可在 Linux 上用模拟后端运行。
+
+    python cli.py                                       # 按界面保存的设置打印一轮
+    python cli.py --source D:\\出货单 --printer "EPSON LQ-630K"
+    python cli.py --watch                               # 监控模式，直到 Ctrl+C / 服务停止
+    python cli.py --simulate --source /tmp/打印 --progress json
+    python cli.py --set merge_clinic_jobs=true --set retry_policies='{"spooler": {"retries": 5}}'
+
+Ctrl+C（或 SIGTERM / Ctrl+Break）打印完正在打印的文件后停止，再按一次立即停止。
+
+--progress json 时标准输出每行一个 JSON 事件（start / progress / pause / finish），日志输出到标准错误；
+日志同时照常写入 logs 目录。
+
+退出码: 0 全部打印成功; 1 有文件打印失败、被跳过或隔离; 2 配置错误（如源目录不存在）; 3 被中断; 4 程序异常
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, TextIO
+
+from utils.config_manager import ConfigManager
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CONFIG = 2
+EXIT_INTERRUPTED = 3
+EXIT_ERROR = 4
+
+PROGRESS_TEXT = "text"
+PROGRESS_JSON = "json"
+
+
+def parse_assignments(values: Optional[List[str]]) -> Dict[str, Any]:
+    """把 key=value 解析为字典，value 按 JSON 解析（失败时作为字符串）"""
+    result = {}
+    for item in values or []:
+        key, sep, raw = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"应为 KEY=VALUE: {item}")
+        try:
+            result[key] = json.loads(raw)
+        except ValueError:
+            result[key] = raw
+    return result
+
+
+def load_config(config_path: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """读取界面保存的配置（缺少的项使用默认值），再应用命令行覆盖"""
+    config = ConfigManager(config_path).get_all()
+    config.update(overrides or {})
+    return config
+
+
+class HeadlessRunner:
+    """
+    不依赖界面运行 PrinterCore：日志写到 err，进度按 progress 格式写到 out，返回退出码。
+
+    stop() 可在任意线程调用（信号处理、Windows 服务的 SvcStop），PrinterCore 创建前调用也有效。
+    """
+
+    def __init__(self, config: Dict[str, Any], progress: str = PROGRESS_TEXT, quiet: bool = False,
+                 out: TextIO = sys.stdout, err: TextIO = sys.stderr, backend=None):
+        self.config = config
+        self.progress = progress
+        self.quiet = quiet
+        self.out = out
+        self.err = err
+        self.backend = backend
+        self.core = None
+        self._stop_requested: Optional[bool] = None  # None: 未请求；True / False: drain
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        """JSON 进度模式下输出一行事件"""
+        if self.progress != PROGRESS_JSON:
+            return
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False)
+        with self._lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def log(self, message: str):
+        if self.quiet:
+            return
+        with self._lock:
+            self.err.write(message + "\n")
+            self.err.flush()
+
+    def on_progress(self, done: int, total: int, eta: float):
+        self.emit("progress", done=done, total=total, eta=round(eta, 1))
+
+    def on_pauses(self, pauses: List[Dict[str, Any]]):
+        self.emit("pause", pauses=pauses)
+
+    def stop(self, drain: bool = True):
+        """请求停止：drain=True 打印完正在打印的文件后停止，再次调用 stop(drain=False) 立即停止"""
+        with self._lock:
+            if self._stop_requested is None or not drain:
+                self._stop_requested = drain
+            core = self.core
+        if core is not None:
+            core.stop(drain)
+
+    def run(self, watch: bool = False) -> int:
+        source = self.config.get("source_dir")
+        if not source or not os.path.isdir(source):
+            self.log(f"❌ 源目录不存在: {source}")
+            self.emit("finish", exit_code=EXIT_CONFIG, error="source_dir")
+            return EXIT_CONFIG
+
+        # 只在需要时导入，--help 和参数错误时不加载打印模块
+        from printer_core import PrinterCore
+
+        started = time.monotonic()
+        try:
+            core = PrinterCore(self.config, None, self.log, backend=self.backend,
+                               progress_callback=self.on_progress, pause_callback=self.on_pauses)
+        except Exception as e:
+            self.log(f"❌ 初始化打印失败: {e}")
+            self.emit("finish", exit_code=EXIT_CONFIG, error=str(e))
+            return EXIT_CONFIG
+        with self._lock:
+            self.core = core
+            stop_requested = self._stop_requested
+        if stop_requested is not None:
+            core.stop(stop_requested)
+
+        self.emit("start", source=source, backend=core.backend.name, watch=watch,
+                  printer=core.get_run_default_printer(), monthly_printer=core.MONTHLY_PRINTER_NAME)
+        error = None
+        try:
+            if watch:
+                core.run_watch()
+            else:
+                core.run()
+        except Exception as e:
+            error = str(e)
+            self.log(f"❌ 打印异常: {e}")
+
+        progress = core.progress
+        counts = core.retry_report.counts()
+        result = {
+            "printed": progress.done if progress else 0,
+            "failed": progress.failed if progress else 0,
+            "total": progress.total if progress else 0,
+            "skipped": int(core.metrics.counter_total("preflight_problems_total")),
+            "retries": int(core.metrics.counter_total("retries_total")),
+            "quarantined": counts["quarantined"],
+            "elapsed": round(time.monotonic() - started, 3),
+        }
+        # 监控模式只能通过停止结束，停止不算中断
+        interrupted = core.cancel_token.cancelled and not watch
+        if error is not None:
+            exit_code = EXIT_ERROR
+        elif interrupted:
+            exit_code = EXIT_INTERRUPTED
+        elif result["failed"] or result["skipped"]:
+            exit_code = EXIT_FAILED
+        else:
+            exit_code = EXIT_OK
+        self.emit("finish", exit_code=exit_code, error=error, **result)
+        return exit_code
+
+
+def install_signal_handlers(runner: HeadlessRunner):
+    """第一次 Ctrl+C / SIGTERM / Ctrl+Break 打印完当前文件后停止，第二次立即停止"""
+    requests = []
+
+    def handler(signum, frame):
+        requests.append(signum)
+        drain = len(requests) == 1
+        runner.log("🛑 收到停止信号，打印完当前文件后停止（再按一次 Ctrl+C 立即停止）" if drain
+                   else "🛑 立即停止")
+        runner.stop(drain)
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            signal.signal(signum, handler)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="配置文件，默认为程序目录下的 config/settings.json")
+    parser.add_argument("--source", help="源目录（覆盖配置中的 source_dir）")
+    parser.add_argument("--printer", help="出货单打印机（覆盖配置中的 selected_printer）")
+    parser.add_argument("--monthly-printer", help="月结单打印机（覆盖配置中的 monthly_printer_name）")
+    parser.add_argument("--watch", action="store_true", default=None, help="监控模式：持续打印新文件直到停止")
+    parser.add_argument("--once", dest="watch", action="store_false", help="只打印一轮（忽略配置中的 watch_mode）")
+    parser.add_argument("--simulate", action="store_true", help="使用模拟打印后端（不需要 Windows 和打印机）")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="覆盖配置项，VALUE 按 JSON 解析")
+    parser.add_argument("--sim", action="append", metavar="KEY=VALUE", help="模拟后端参数，如 job_latency=0.5")
+    parser.add_argument("--progress", choices=(PROGRESS_TEXT, PROGRESS_JSON), default=PROGRESS_TEXT,
+                        help="json: 标准输出每行一个 JSON 事件")
+    parser.add_argument("--quiet", action="store_true", help="不在标准错误输出日志（仍写入 logs 目录）")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        overrides = parse_assignments(args.set)
+        simulation = parse_assignments(args.sim)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return EXIT_CONFIG
+
+    if args.source:
+        overrides["source_dir"] = args.source
+    if args.printer:
+        overrides["selected_printer"] = args.printer
+    if args.monthly_printer is not None:
+        overrides["monthly_printer_name"] = args.monthly_printer
+    if args.simulate:
+        overrides["printer_backend"] = "simulated"
+    if simulation:
+        overrides["simulated_backend"] = simulation
+    if args.watch is not None:
+        overrides["watch_mode"] = args.watch
+
+    config = load_config(args.config, overrides)
+    runner = HeadlessRunner(config, progress=args.progress, quiet=args.quiet)
+    install_signal_handlers(runner)
+    return runner.run(watch=bool(config.get("watch_mode", False)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import time
+import threading
+from typing import Callable, List, Optional
+
+
+class Cancelled(Exception):
+    """打印被取消；submitted 表示当前文件是否已经提交给打印机"""
+
+    def __init__(self, stage: str = "", submitted: bool = False):
+        super().__init__(f"打印已取消 ({stage})" if stage else "打印已取消")
+        self.stage = stage
+        self.submitted = submitted
+
+
+class CancelToken:
+    """
+    停止打印的请求，在扫描、打印和各种等待之间传递。
+
+    - 立即停止 cancel()：所有等待在 poll 间隔内返回，正在打印的文件在下一个检查点放弃
+    - 平稳停止 cancel(drain=True)：正在打印的文件照常完成（提交、确认、移动），之后不再开始新文件
+
+    should_continue 用于文件之间的等待（节奏控制、诊所暂停），两种停止都会中断；
+    job_should_continue 用于文件打印过程中的等待（预渲染、打印队列确认），只有立即停止才中断。
+    平稳停止后仍可再调用 cancel() 升级为立即停止。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._drain = False
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.requested_at: Optional[float] = None
+
+    def cancel(self, drain: bool = False):
+        with self._lock:
+            if self._event.is_set():
+                if drain or not self._drain:
+                    return
+                self._drain = False
+            else:
+                self._drain = drain
+                self.requested_at = time.monotonic()
+                self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """取消（或从平稳停止升级为立即停止）时调用 callback，用于唤醒不轮询的等待"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def draining(self) -> bool:
+        return self._event.is_set() and self._drain
+
+    @property
+    def aborted(self) -> bool:
+        return self._event.is_set() and not self._drain
+
+    def should_continue(self) -> bool:
+        return not self._event.is_set()
+
+    def job_should_continue(self) -> bool:
+        return not self.aborted
+
+    def check(self, stage: str = "", submitted: bool = False):
+        """立即停止时抛出 Cancelled"""
+        if self.aborted:
+            raise Cancelled(stage, submitted)
+
+    def sleep(self, seconds: float) -> bool:
+        """睡眠最多 seconds 秒，被取消时立即返回 False"""
+        return not self._event.wait(seconds)
@@ -0,0 +1,238 @@
+import time
+import queue
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from core.cancel import Cancelled
+from core.jobs import PrintJob
+
+
+class PrinterWorker(threading.Thread):
+    """一台打印机的工作线程：按顺序处理自己的队列，有独立的节奏控制和失败处理"""
+
+    def __init__(self, dispatcher: "PrintDispatcher", printer_name: str):
+        super().__init__(name=f"printer-{printer_name}", daemon=True)
+        self.dispatcher = dispatcher
+        self.core = dispatcher.core
+        self.printer_name = printer_name
+        self.queue: "queue.Queue" = queue.Queue()
+        self.pending = 0
+        self._pending_lock = threading.Lock()
+
+        # 统计信息
+        self.done = 0
+        self.failed = 0
+        self.retried = 0
+        self.started_at = None
+        self.finished_at = None
+        self.wait_seconds = 0.0
+
+    def put(self, job: PrintJob):
+        with self._pending_lock:
+            self.pending += 1
+            self.core.metrics.set_gauge("queue_pending", self.pending, printer=self.printer_name)
+        self.queue.put(job)
+
+    def close(self):
+        """队列中不再有新任务，处理完后线程退出"""
+        self.queue.put(None)
+
+    def run(self):
+        core = self.core
+        logger = core.logger
+        retries = core.retry_queue
+        pacer = core._create_pacer()
+        closed = False
+        self.started_at = time.monotonic()
+        try:
+            while core._is_running:
+                # 先处理到期的重试，等待重试期间照常打印队列中的其他文件
+                job = retries.pop_due(self.printer_name)
+                queued = job is None
+                if queued:
+                    if closed:
+                        wait = retries.wait_time(self.printer_name)
+                        if wait is None:
+                            break
+                        core.cancel_token.sleep(min(wait, 0.2))
+                        continue
+                    try:
+                        wait = retries.wait_time(self.printer_name)
+                        job = self.queue.get(timeout=0.2 if wait is None else min(0.2, wait))
+                    except queue.Empty:
+                        continue
+                    if job is None:
+                        closed = True
+                        continue
+
+                try:
+                    ok = core.process_job(job)
+                except Cancelled:
+                    break
+                if not ok and not core.RETRY_FAILED:
+                    self.failed += 1
+                    logger.error(f"🛑 打印机队列因错误停止: {self.printer_name}, 未打印 {self.pending - 1} 个文件")
+                    break
+
+                if ok:
+                    self.done += 1
+                elif retries.contains(job):
+                    self.retried += 1
+                else:
+                    self.failed += 1
+                if queued:
+                    with self._pending_lock:
+                        self.pending -= 1
+                        core.metrics.set_gauge("queue_pending", self.pending, printer=self.printer_name)
+                remaining = self.pending + retries.pending(self.printer_name)
+                logger.info(f"📄 [{self.printer_name}] 剩余待打印文件数:  {remaining}")
+                if self.dispatcher.job_done(job, retries.settled(job)) and remaining > 0:
+                    # 本打印机上该诊所已打印完，只暂停本队列，其他打印机继续
+                    core.on_clinic_finished(job.root, self.printer_name)
+
+                # 队列里还有文件时才需要等待打印机
+                if remaining > 0:
+                    # 切换到备用打印机时等待实际提交到的打印机
+                    waited = pacer.wait(job.spooled_to or self.printer_name, core.cancel_token.should_continue)
+                    self.wait_seconds += waited
+                    core.metrics.observe("pacing_wait", waited)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ 打印线程异常 [{self.printer_name}]: {e}")
+        finally:
+            # Excel 实例属于本线程，退出前关闭
+            core.shutdown_excel_pool()
+            self.finished_at = time.monotonic()
+
+    def stats(self) -> Dict[str, float]:
+        elapsed = (self.finished_at or time.monotonic()) - (self.started_at or time.monotonic())
+        return {
+            "done": self.done,
+            "failed": self.failed,
+            "retried": self.retried,
+            "pending": self.pending,
+            "elapsed": round(elapsed, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "files_per_minute": round(self.done * 60.0 / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class PrintDispatcher:
+    """
+    按目标打印机把文件分到各自的工作队列，多台打印机同时打印。
+
+    每台打印机上的文件保持原有顺序；某个诊所的文件在一台打印机上打印完后，
+    由该打印机的工作线程触发诊所边界暂停，只阻塞该队列；诊所在所有打印机上都打印完后清理空目录。
+
+    监控模式下先 start() 再陆续 submit()，出现新的打印机时自动启动对应的工作线程。
+    """
+
+    def __init__(self, core, clinic_prompts: bool = True,
+                 on_job_done: Optional[Callable[[PrintJob], None]] = None):
+        self.core = core
+        self.clinic_prompts = clinic_prompts
+        self.on_job_done = on_job_done
+        self.workers: "OrderedDict[str, PrinterWorker]" = OrderedDict()
+        self._clinic_pending: Counter = Counter()
+        self._printer_clinic_pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+
+    def _worker_for(self, printer_name: str) -> PrinterWorker:
+        with self._lock:
+            worker = self.workers.get(printer_name)
+            if worker is None:
+                worker = PrinterWorker(self, printer_name)
+                self.workers[printer_name] = worker
+                if self._started:
+                    worker.start()
+            return worker
+
+    def submit(self, job: PrintJob):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PrintDispatcher 已关闭，不能再提交文件")
+            # 合并的批次按其中的文件计数：批次改为逐个打印、部分文件等待重试时仍能正确判断诊所边界
+            files = len(job.files)
+            self._clinic_pending[job.root] += files
+            self._printer_clinic_pending[(job.printer, job.root)] += files
+        self._worker_for(job.printer).put(job)
+
+    def job_done(self, job: PrintJob, files: Optional[int] = None) -> bool:
+        """
+        记录文件完成；返回该诊所在这台打印机上是否已打印完（需要诊所边界暂停）。
+
+        files 为其中已有结果的文件数（默认全部），等待重试的文件重试后再记录。
+        """
+        files = len(job.files) if files is None else files
+        if not files:
+            return False
+        with self._lock:
+            self._clinic_pending[job.root] -= files
+            clinic_finished = self._clinic_pending[job.root] == 0
+            key = (job.printer, job.root)
+            self._printer_clinic_pending[key] -= files
+            printer_finished = self._printer_clinic_pending[key] == 0
+        if self.on_job_done is not None:
+            self.on_job_done(job)
+        if clinic_finished:
+            self.core.sweep_clinic(job.root)
+        return self.clinic_prompts and printer_finished
+
+    def start(self):
+        """启动所有已有队列的工作线程"""
+        with self._lock:
+            self._started = True
+            workers = list(self.workers.values())
+        for worker in workers:
+            worker.start()
+
+    def close(self):
+        """不再提交新文件，各队列处理完已有文件后退出"""
+        with self._lock:
+            self._closed = True
+            workers = list(self.workers.values())
+        for worker in workers:
+            worker.close()
+
+    def join(self):
+        for worker in list(self.workers.values()):
+            while worker.is_alive():
+                worker.join(0.2)
+
+    def run(self, jobs: List[PrintJob]) -> bool:
+        """分发并等待所有队列完成，全部成功时返回 True"""
+        for job in jobs:
+            self.submit(job)
+
+        logger = self.core.logger
+        for name, worker in self.workers.items():
+            logger.info(f"🖨️ 打印队列 [{name}]: {worker.pending} 个文件")
+
+        started = time.monotonic()
+        self.start()
+        self.close()
+        self.join()
+        elapsed = time.monotonic() - started
+        return self.log_summary(elapsed)
+
+    def log_summary(self, elapsed: float) -> bool:
+        """输出各队列的统计信息，全部成功时返回 True"""
+        logger = self.core.logger
+
+        total_done = 0
+        all_ok = True
+        for name, worker in self.workers.items():
+            stats = worker.stats()
+            total_done += stats["done"]
+            all_ok = all_ok and stats["failed"] == 0 and stats["pending"] == 0
+            logger.info(f"📊 [{name}] 完成 {stats['done']} 个, 失败 {stats['failed']} 个, 重试 {stats['retried']} 次, "
+                        f"用时 {stats['elapsed']} 秒, {stats['files_per_minute']} 个/分钟")
+        if elapsed > 0 and total_done:
+            logger.info(f"📊 共打印 {total_done} 个文件, 用时 {elapsed:.1f} 秒, {total_done * 60.0 / elapsed:.1f} 个/分钟")
+        return all_ok
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: worker.stats() for name, worker in self.workers.items()}
@@ -0,0 +1,175 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+class ExcelApplicationFactory:
+    """Excel 应用实例工厂接口，COM 相关调用全部集中在这里，便于用假对象替换"""
+
+    def initialize(self):
+        """当前线程初始化 COM"""
+
+    def uninitialize(self):
+        """当前线程释放 COM"""
+
+    def create(self):
+        """创建一个新的 Excel.Application（不可见、不弹提示框）"""
+        raise NotImplementedError
+
+    def quit(self, app):
+        """关闭 Excel.Application"""
+        app.Quit()
+
+
+class Win32ExcelFactory(ExcelApplicationFactory):
+    """通过 pywin32 创建真实的 Excel 进程"""
+
+    def initialize(self):
+        import pythoncom
+        pythoncom.CoInitialize()
+
+    def uninitialize(self):
+        import pythoncom
+        pythoncom.CoUninitialize()
+
+    def create(self):
+        import win32com.client
+        # DispatchEx 保证每个会话都是独立的 Excel 进程，回收时不会影响其他会话
+        excel = win32com.client.DispatchEx("Excel.Application")
+        excel.Visible = False
+        excel.DisplayAlerts = False
+        return excel
+
+
+class ExcelSession:
+    """池中的一个 Excel 实例"""
+
+    def __init__(self, app, session_id: int):
+        self.app = app
+        self.session_id = session_id
+        self.workbook_count = 0
+        self.created_at = time.monotonic()
+
+
+class ExcelSessionPool:
+    """
+    Excel 会话池：整个 run() 期间保持 Excel 常驻，避免每个工作簿都启动/退出一次 Excel。
+
+    - 每个实例处理 recycle_after 个工作簿后回收重建
+    - 处理工作簿出错后立即回收该实例
+    - shutdown() 关闭所有实例并释放 COM
+
+    COM 对象属于创建它的线程（STA），因此一个池只能在一个线程中使用，
+    多个工作线程需要各自持有一个池。
+    """
+
+    def __init__(self, factory: ExcelApplicationFactory, size: int = 1,
+                 recycle_after: int = 50, logger: Optional[logging.Logger] = None):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.recycle_after = max(1, int(recycle_after))
+        self.logger = logger or logging.getLogger("PrinterCore")
+
+        self._idle: List[ExcelSession] = []
+        self._busy: List[ExcelSession] = []
+        self._owner_thread = None
+        self._next_id = 1
+        self._closed = False
+
+        # 统计信息
+        self.created_count = 0
+        self.recycled_count = 0
+
+    def _check_thread(self):
+        current = threading.get_ident()
+        if self._owner_thread is None:
+            self.factory.initialize()
+            self._owner_thread = current
+        elif self._owner_thread != current:
+            raise RuntimeError("ExcelSessionPool 不能跨线程使用")
+
+    def _create_session(self) -> ExcelSession:
+        app = self.factory.create()
+        session = ExcelSession(app, self._next_id)
+        self._next_id += 1
+        self.created_count += 1
+        self.logger.info(f"🟢 启动 Excel 实例 #{session.session_id}")
+        return session
+
+    def _close_session(self, session: ExcelSession, reason: str):
+        # 关闭残留的工作簿，再退出 Excel
+        try:
+            workbooks = session.app.Workbooks
+            for i in range(workbooks.Count, 0, -1):
+                try:
+                    workbooks(i).Close(False)
+                except Exception:
+                    pass
+        except Exception:
+            pass
+        try:
+            self.factory.quit(session.app)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 关闭 Excel 实例 #{session.session_id} 失败: {e}")
+        self.logger.info(f"🔴 关闭 Excel 实例 #{session.session_id} ({reason}, 已处理 {session.workbook_count} 个工作簿)")
+
+    def acquire(self) -> ExcelSession:
+        """取出一个空闲实例，没有则新建"""
+        if self._closed:
+            raise RuntimeError("ExcelSessionPool 已关闭")
+        self._check_thread()
+
+        session = self._idle.pop() if self._idle else None
+        if session is None:
+            if len(self._busy) >= self.size:
+                raise RuntimeError(f"Excel 实例已全部占用 (上限 {self.size})")
+            session = self._create_session()
+        self._busy.append(session)
+        return session
+
+    def release(self, session: ExcelSession, failed: bool = False):
+        """归还实例；出错或达到回收阈值时关闭该实例"""
+        if session in self._busy:
+            self._busy.remove(session)
+        session.workbook_count += 1
+
+        if self._closed:
+            self._close_session(session, "池已关闭")
+        elif failed:
+            self.recycled_count += 1
+            self._close_session(session, "处理出错后回收")
+        elif session.workbook_count >= self.recycle_after:
+            self.recycled_count += 1
+            self._close_session(session, "达到回收阈值")
+        else:
+            self._idle.append(session)
+
+    @contextmanager
+    def session(self):
+        """with pool.session() as excel: ... 出现异常时自动回收实例"""
+        session = self.acquire()
+        failed = False
+        try:
+            yield session.app
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(session, failed=failed)
+
+    def shutdown(self):
+        """关闭所有实例并释放 COM，在 run() 结束或停止打印时调用"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._owner_thread is None:
+            return
+        for session in self._idle + self._busy:
+            self._close_session(session, "停止打印")
+        self._idle.clear()
+        self._busy.clear()
+        if self._owner_thread == threading.get_ident():
+            self.factory.uninitialize()
+        self._owner_thread = None
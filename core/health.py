@@ -0,0 +1,258 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from core.printer_status import PRINTER_BLOCKING_STATUS, QueueState, describe_printer_status
+
+# 熔断器状态
+BREAKER_CLOSED = "closed"        # 正常打印
+BREAKER_OPEN = "open"            # 打印机异常，暂停该打印机的队列
+BREAKER_HALF_OPEN = "half_open"  # 打印机状态已恢复，先试打一个文件
+
+BREAKER_NAMES = {
+    BREAKER_CLOSED: "正常",
+    BREAKER_OPEN: "已暂停",
+    BREAKER_HALF_OPEN: "试打",
+}
+
+
+class CircuitBreaker:
+    """
+    一台打印机的熔断器。
+
+    - 正常 -> 已暂停：状态位出现缺纸、卡纸、脱机等，或打印失败时打印机状态异常
+    - 已暂停 -> 试打：连续 recovery_checks 次读到正常状态；读不到状态时暂停 cooldown 秒后试打
+    - 试打 -> 正常：试打的文件打印成功；试打失败则重新暂停
+    """
+
+    def __init__(self, printer: str, recovery_checks: int = 2, cooldown: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.printer = printer
+        self.recovery_checks = max(1, int(recovery_checks))
+        self.cooldown = float(cooldown)
+        self._clock = clock
+        self.state = BREAKER_CLOSED
+        self.reason = ""
+        self.status = 0
+        self.opened_at: Optional[float] = None
+        self.healthy_checks = 0
+        # 统计信息
+        self.trips = 0
+        self.open_seconds = 0.0
+
+    @property
+    def allows(self) -> bool:
+        """是否可以向该打印机提交文件"""
+        return self.state != BREAKER_OPEN
+
+    def observe(self, status: Optional[int]) -> Optional[str]:
+        """读到打印机状态位（None 表示读取失败），状态变化时返回新状态"""
+        if status is None:
+            if self.state == BREAKER_OPEN and self._clock() - self.opened_at >= self.cooldown:
+                return self._transition(BREAKER_HALF_OPEN, "无法读取打印机状态，试打下一个文件")
+            return None
+        self.status = status
+        if status & PRINTER_BLOCKING_STATUS:
+            self.healthy_checks = 0
+            if self.state != BREAKER_OPEN:
+                return self._transition(BREAKER_OPEN, describe_printer_status(status))
+            self.reason = describe_printer_status(status)
+            return None
+        if self.state == BREAKER_OPEN:
+            self.healthy_checks += 1
+            if self.healthy_checks >= self.recovery_checks:
+                return self._transition(BREAKER_HALF_OPEN, "打印机状态已恢复")
+        return None
+
+    def record_success(self) -> Optional[str]:
+        if self.state == BREAKER_HALF_OPEN:
+            return self._transition(BREAKER_CLOSED, "试打成功")
+        return None
+
+    def record_failure(self, status: Optional[int]) -> Optional[str]:
+        """打印失败：正在试打，或失败时打印机状态异常，则暂停"""
+        if self.state == BREAKER_HALF_OPEN:
+            return self._transition(BREAKER_OPEN, "试打失败")
+        if status is not None:
+            return self.observe(status)
+        return None
+
+    def _transition(self, state: str, reason: str) -> str:
+        now = self._clock()
+        if self.state == BREAKER_OPEN and self.opened_at is not None:
+            self.open_seconds += now - self.opened_at
+        self.state = state
+        self.reason = reason
+        if state == BREAKER_OPEN:
+            self.opened_at = now
+            self.healthy_checks = 0
+            self.trips += 1
+        return state
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"printer": self.printer, "state": self.state, "reason": self.reason,
+                "status": self.status, "trips": self.trips}
+
+
+class PrinterHealthMonitor:
+    """
+    后台线程每 interval 秒读取各打印机的状态位（GetPrinter），维护每台打印机的熔断器。
+
+    打印线程提交文件前调用 acquire()：打印机正常时直接返回；熔断时改用 failover 中配置的备用打印机，
+    没有可用的备用打印机则只阻塞该打印机的队列，恢复后自动继续。打印结果通过 record_success() /
+    record_failure() 反馈给熔断器。状态变化时调用 listener(打印机, 新状态, 原因)。
+    """
+
+    def __init__(self, get_queue_state: Callable[[str], Optional[QueueState]], interval: float = 2.0,
+                 recovery_checks: int = 2, cooldown: float = 30.0,
+                 failover: Optional[Dict[str, List[str]]] = None,
+                 listener: Optional[Callable[[str, str, str], None]] = None,
+                 logger: Optional[logging.Logger] = None, clock: Callable[[], float] = time.monotonic):
+        self.get_queue_state = get_queue_state
+        self.interval = max(0.05, float(interval))
+        self.recovery_checks = recovery_checks
+        self.cooldown = cooldown
+        self.failover = {printer: list(backups) for printer, backups in (failover or {}).items()}
+        self.listener = listener
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self._clock = clock
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # 各打印机当前实际使用的打印机（切换到备用打印机时记录，用于只在切换时输出日志）
+        self._routes: Dict[str, str] = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, printers):
+        """监控这些打印机及其备用打印机"""
+        with self._cond:
+            for printer in printers:
+                for name in [printer] + self.failover.get(printer, []):
+                    if name and name not in self.breakers:
+                        self.breakers[name] = CircuitBreaker(name, self.recovery_checks, self.cooldown, self._clock)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="printer-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wake(self):
+        """唤醒 acquire() 中的等待（停止打印时调用）"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.check_all()
+            self._stop.wait(self.interval)
+
+    def _read_status(self, printer: str) -> Optional[int]:
+        try:
+            state = self.get_queue_state(printer)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 获取打印机状态失败: {printer} - {e}")
+            return None
+        return None if state is None else state.printer_status
+
+    def check(self, printer: str) -> Optional[int]:
+        """立即读取一台打印机的状态并更新熔断器，返回状态位"""
+        status = self._read_status(printer)
+        with self._cond:
+            breaker = self.breakers.get(printer)
+            if breaker is not None:
+                self._changed(breaker, breaker.observe(status))
+        return status
+
+    def check_all(self):
+        for printer in list(self.breakers):
+            self.check(printer)
+
+    def _breaker(self, printer: str) -> CircuitBreaker:
+        breaker = self.breakers.get(printer)
+        if breaker is None:
+            breaker = self.breakers[printer] = CircuitBreaker(printer, self.recovery_checks, self.cooldown,
+                                                              self._clock)
+        return breaker
+
+    def _route(self, printer: str) -> Optional[str]:
+        if self._breaker(printer).allows:
+            return printer
+        for backup in self.failover.get(printer, []):
+            if self._breaker(backup).allows:
+                return backup
+        return None
+
+    def acquire(self, printer: str, should_continue: Callable[[], bool] = lambda: True,
+                poll_interval: float = 0.25) -> Optional[str]:
+        """
+        返回本次应提交到的打印机：该打印机或可用的备用打印机；都不可用时阻塞等待。
+
+        should_continue() 返回 False 时返回 None。
+        """
+        waiting = False
+        with self._cond:
+            while True:
+                target = self._route(printer)
+                if target is not None:
+                    break
+                if not should_continue():
+                    return None
+                if not waiting:
+                    waiting = True
+                    self.logger.warning(f"⏸️ [{printer}] 打印机异常（{self.breakers[printer].reason}），"
+                                        f"暂停该打印机的队列，恢复后自动继续")
+                self._cond.wait(poll_interval)
+
+            previous = self._routes.get(printer, printer)
+            self._routes[printer] = target
+        if target != previous:
+            if target == printer:
+                self.logger.info(f"🔀 [{printer}] 打印机已恢复，不再使用备用打印机 [{previous}]")
+            else:
+                self.logger.warning(f"🔀 [{printer}] 打印机异常（{self.breakers[printer].reason}），"
+                                    f"改用备用打印机 [{target}]")
+        return target
+
+    def record_success(self, printer: str):
+        with self._cond:
+            breaker = self._breaker(printer)
+            self._changed(breaker, breaker.record_success())
+
+    def record_failure(self, printer: str) -> bool:
+        """打印失败后立即检查打印机状态；打印机已熔断（应在恢复后重试该文件）时返回 True"""
+        status = self._read_status(printer)
+        with self._cond:
+            breaker = self._breaker(printer)
+            self._changed(breaker, breaker.record_failure(status))
+            return not breaker.allows
+
+    def _changed(self, breaker: CircuitBreaker, state: Optional[str]):
+        """在 _cond 中调用：记录熔断器状态变化并唤醒等待的队列"""
+        if state is None:
+            return
+        if state == BREAKER_OPEN:
+            self.logger.warning(f"⛔ [{breaker.printer}] 打印机异常（{breaker.reason}），暂停提交")
+        elif state == BREAKER_HALF_OPEN:
+            self.logger.info(f"🔄 [{breaker.printer}] {breaker.reason}，试打下一个文件")
+        else:
+            self.logger.info(f"✅ [{breaker.printer}] 打印机恢复正常，继续打印")
+        if self.listener is not None:
+            try:
+                self.listener(breaker.printer, state, breaker.reason)
+            except Exception:
+                pass
+        self._cond.notify_all()
+
+    def states(self) -> List[Dict[str, object]]:
+        with self._cond:
+            return [breaker.to_dict() for breaker in self.breakers.values()]
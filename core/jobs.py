@@ -0,0 +1,79 @@
+import os
+import itertools
+from typing import List, Optional
+
+PDF_EXTENSIONS = (".pdf",)
+EXCEL_EXTENSIONS = (".xls", ".xlsx")
+
+
+def job_kind(filename: str) -> Optional[str]:
+    """根据扩展名判断文件类型: pdf / excel，不支持的类型返回 None"""
+    lower = filename.lower()
+    if lower.endswith(PDF_EXTENSIONS):
+        return "pdf"
+    if lower.endswith(EXCEL_EXTENSIONS):
+        return "excel"
+    return None
+
+
+class PrintJob:
+    """一个待打印文件"""
+
+    def __init__(self, path: str, printer: str, is_monthly: bool, size: int = 0, mtime_ns: int = 0):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.root = os.path.dirname(path)
+        # 诊所目录名（数字目录），非诊所目录时为目录名本身
+        self.clinic = os.path.basename(self.root)
+        self.kind = job_kind(self.name)
+        self.printer = printer
+        self.is_monthly = is_monthly
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # 预计打印的页数，由打印前检查填写，未检查时为 None
+        self.pages: Optional[int] = None
+        # 实际提交到的打印机：打印机熔断后改用备用打印机时与 printer 不同
+        self.spooled_to: Optional[str] = None
+        # 失败次数（重试队列使用）
+        self.attempts = 0
+        # 在打印任务日志中的标识，启用日志时由 PrinterCore 设置
+        self.journal_key = None
+
+    @property
+    def is_clinic_dir(self) -> bool:
+        return self.clinic.isdigit()
+
+    @property
+    def files(self) -> List["PrintJob"]:
+        """这个打印任务包含的文件"""
+        return [self]
+
+    def __repr__(self):
+        return f"PrintJob({self.path!r}, printer={self.printer!r})"
+
+
+class PrintBatch(PrintJob):
+    """
+    同一诊所、同一打印机、页面设置相同的多个文件，合并为一个 PDF 作为一个打印任务提交。
+
+    打印计划和各打印机队列中代替这些文件；打印成功后各文件分别记录并移动到备份目录。
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, jobs: List[PrintJob]):
+        first = jobs[0]
+        super().__init__(first.path, first.printer, first.is_monthly,
+                         size=sum(job.size for job in jobs), mtime_ns=first.mtime_ns)
+        self.kind = "batch"
+        self.jobs = list(jobs)
+        self.id = next(self._ids)
+        if all(job.pages is not None for job in jobs):
+            self.pages = sum(job.pages for job in jobs)
+
+    @property
+    def files(self) -> List[PrintJob]:
+        return self.jobs
+
+    def __repr__(self):
+        return f"PrintBatch({self.root!r}, {len(self.jobs)} files, printer={self.printer!r})"
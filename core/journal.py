@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+# 文件的状态，按先后顺序
+STATE_DISCOVERED = "discovered"  # 已扫描到
+STATE_STARTED = "started"        # 开始打印（打开工作簿、页面设置、合并），还没有提交给打印机
+STATE_SUBMITTED = "submitted"    # 已提交给打印机（可能已打印）
+STATE_SPOOLED = "spooled"        # 打印队列已确认接收
+STATE_MOVED = "moved"            # 已移动到备份目录
+STATE_FAILED = "failed"          # 打印失败，下次需要重新打印
+
+# 这些状态说明文件已经送到打印机，恢复时不能再打印一次；停在 started 的文件重新打印
+SENT_STATES = (STATE_SUBMITTED, STATE_SPOOLED)
+
+JournalKey = Tuple[str, int, int]
+
+
+class JobJournal:
+    """
+    追加写入的打印任务日志（SQLite WAL，每次状态变化都落盘）。
+
+    程序崩溃或打印线程被强制终止后，下次 run() 根据日志判断哪些文件已经送到打印机
+    但还没有移动到备份目录，只补做移动，不再重复打印。
+
+    文件以 (相对路径, 大小, 修改时间) 作为标识，同名的新文件会被当作新任务。
+    """
+
+    def __init__(self, db_path: str, source_root: str, retention_days: float = 30):
+        self.db_path = db_path
+        self.source_root = os.path.normpath(source_root)
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 每次提交都 fsync，断电也不会丢失已记录的状态
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " source_root TEXT NOT NULL,"
+            " rel_path TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " state TEXT NOT NULL,"
+            " printer TEXT,"
+            " detail TEXT,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_events_key ON events (source_root, rel_path, size, mtime_ns)"
+        )
+        self.write_count = 0
+        self.write_seconds = 0.0
+
+    def key_for(self, path: str, size: int, mtime_ns: int) -> JournalKey:
+        rel_path = os.path.relpath(path, self.source_root).replace("\\", "/")
+        return rel_path, int(size), int(mtime_ns)
+
+    def record(self, key: JournalKey, state: str, printer: str = "", detail: str = ""):
+        """追加一条状态记录"""
+        self.record_many([key], state, printer, detail)
+
+    def record_many(self, keys: Iterable[JournalKey], state: str, printer: str = "", detail: str = ""):
+        """在一个事务中追加多条相同状态的记录"""
+        now = time.time()
+        rows = [(self.source_root, k[0], k[1], k[2], state, printer, detail, now) for k in keys]
+        if not rows:
+            return
+        start = time.perf_counter()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO events (source_root, rel_path, size, mtime_ns, state, printer, detail, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.write_count += 1
+            self.write_seconds += time.perf_counter() - start
+
+    def latest_states(self) -> Dict[JournalKey, str]:
+        """当前源目录下每个文件的最新状态"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.rel_path, e.size, e.mtime_ns, e.state FROM events e"
+                " JOIN (SELECT MAX(id) AS id FROM events WHERE source_root = ?"
+                "       GROUP BY rel_path, size, mtime_ns) last ON e.id = last.id",
+                (self.source_root,),
+            ).fetchall()
+        return {(r[0], r[1], r[2]): r[3] for r in rows}
+
+    def state_of(self, key: JournalKey) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM events WHERE source_root = ? AND rel_path = ? AND size = ? AND mtime_ns = ?"
+                " ORDER BY id DESC LIMIT 1",
+                (self.source_root,) + tuple(key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def compact(self):
+        """删除保留期之前已经完成（moved）的文件的记录"""
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM events WHERE (source_root, rel_path, size, mtime_ns) IN ("
+                " SELECT source_root, rel_path, size, mtime_ns FROM events"
+                " GROUP BY source_root, rel_path, size, mtime_ns"
+                " HAVING MAX(created_at) < ? AND SUM(state = ?) > 0)",
+                (cutoff, STATE_MOVED),
+            )
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
@@ -0,0 +1,55 @@
+import os
+from typing import Callable, Dict, List, Optional
+
+from core.jobs import PrintBatch, PrintJob
+
+
+def merge_available() -> bool:
+    """合并 PDF 需要 pypdf"""
+    try:
+        import pypdf  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def group_jobs(jobs: List[PrintJob], can_merge: Callable[[PrintJob], bool], max_files: int = 50) -> List[PrintJob]:
+    """
+    把同一打印机上连续的、同一诊所且页面设置相同（月结单/出货单）的文件合并为 PrintBatch。
+
+    每台打印机上的文件顺序不变：只合并该打印机上相邻的文件，批次放在第一个文件的位置；
+    can_merge() 返回 False 的文件单独打印，并且会隔断前后的文件。
+    """
+    runs: List[List[PrintJob]] = []
+    current: Dict[str, Optional[List[PrintJob]]] = {}
+    for job in jobs:
+        mergeable = can_merge(job)
+        run = current.get(job.printer)
+        if (mergeable and run is not None and len(run) < max_files
+                and run[0].root == job.root and run[0].is_monthly == job.is_monthly):
+            run.append(job)
+            continue
+        run = [job]
+        runs.append(run)
+        current[job.printer] = run if mergeable else None
+    return [PrintBatch(run) if len(run) > 1 else run[0] for run in runs]
+
+
+def merge_pdfs(paths: List[str], output_path: str, first_page_only: bool = False) -> int:
+    """按顺序把多个 PDF 合并为一个文件，返回总页数；first_page_only 时每个文件只取第一页"""
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        reader = PdfReader(path)
+        pages = reader.pages[:1] if first_page_only else reader.pages
+        for page in pages:
+            writer.add_page(page)
+    pages = len(writer.pages)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp = f"{output_path}.tmp"
+    with open(tmp, "wb") as f:
+        writer.write(f)
+    os.replace(tmp, output_path)
+    return pages
@@ -0,0 +1,256 @@
+import os
+import time
+import bisect
+import random
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 阶段耗时直方图的分桶上限（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _pad(text: str, width: int, left: bool = False) -> str:
+    """按显示宽度对齐（中文字符占两列）"""
+    display = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    padding = " " * max(0, width - display)
+    return text + padding if left else padding + text
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class StageTiming:
+    """一次阶段计时；阶段没有抛出异常但结果失败时，设置 failed = True 计入错误数"""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+
+class _StageStats:
+    def __init__(self, buckets: Tuple[float, ...], reservoir: int):
+        self.buckets = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        # 本轮打印的统计（每轮开始时清零），样本数超过 reservoir 时随机替换
+        self.run_count = 0
+        self.run_errors = 0
+        self.run_total = 0.0
+        self.run_max = 0.0
+        self.run_samples: List[float] = []
+        self.reservoir = reservoir
+
+
+class MetricsRegistry:
+    """
+    打印流程的指标：各阶段耗时（直方图）、计数器和当前值（如队列长度）。
+
+    每次记录只是加锁后更新几个数字，开销在微秒级；累计值可导出为 Prometheus 文本格式，
+    本轮打印的统计用于结束时输出阶段耗时表。
+    """
+
+    def __init__(self, prefix: str = "autoprint", buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 reservoir: int = 2048):
+        self.prefix = prefix
+        self.bucket_bounds = tuple(buckets)
+        self.reservoir = reservoir
+        self._lock = threading.Lock()
+        self._stages: "OrderedDict[str, _StageStats]" = OrderedDict()
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(dict)
+        self._gauges: Dict[str, Dict[LabelKey, float]] = defaultdict(dict)
+        self._random = random.Random(0)
+        self.run_started = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def counter_total(self, name: str) -> float:
+        """计数器所有标签的合计"""
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges[name][key] = value
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats(self.bucket_bounds, self.reservoir)
+            stats.buckets[bisect.bisect_left(self.bucket_bounds, seconds)] += 1
+            stats.count += 1
+            stats.total += seconds
+            stats.run_count += 1
+            stats.run_total += seconds
+            stats.run_max = max(stats.run_max, seconds)
+            if error:
+                stats.errors += 1
+                stats.run_errors += 1
+            if len(stats.run_samples) < stats.reservoir:
+                stats.run_samples.append(seconds)
+            else:
+                slot = self._random.randrange(stats.run_count)
+                if slot < stats.reservoir:
+                    stats.run_samples[slot] = seconds
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[StageTiming]:
+        """记录 with 块的耗时；抛出异常或 timing.failed 为 True 时计为错误"""
+        timing = StageTiming()
+        start = time.perf_counter()
+        try:
+            yield timing
+        except BaseException:
+            timing.failed = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, timing.failed)
+
+    def begin_run(self):
+        """开始新一轮打印：清空本轮统计，累计值保留"""
+        with self._lock:
+            for stats in self._stages.values():
+                stats.run_count = stats.run_errors = 0
+                stats.run_total = stats.run_max = 0.0
+                stats.run_samples = []
+            self.run_started = time.monotonic()
+
+    def run_summary(self) -> "OrderedDict[str, Dict[str, float]]":
+        """本轮各阶段的次数、错误数、总耗时和分位数（秒）"""
+        result = OrderedDict()
+        with self._lock:
+            for stage, stats in self._stages.items():
+                if not stats.run_count:
+                    continue
+                samples = sorted(stats.run_samples)
+                result[stage] = {
+                    "count": stats.run_count,
+                    "errors": stats.run_errors,
+                    "total": round(stats.run_total, 4),
+                    "avg": round(stats.run_total / stats.run_count, 5),
+                    "p50": round(samples[int((len(samples) - 1) * 0.50)], 5),
+                    "p95": round(samples[int((len(samples) - 1) * 0.95)], 5),
+                    "max": round(stats.run_max, 5),
+                }
+        return result
+
+    def summary_lines(self) -> List[str]:
+        """本轮阶段耗时表（按总耗时排序）"""
+        summary = self.run_summary()
+        if not summary:
+            return []
+        wall = max(time.monotonic() - self.run_started, 1e-9)
+        widths = (18, 8, 6, 10, 6, 10, 10, 10)
+        rows = [("阶段", "次数", "错误", "总计(秒)", "占比", "平均(ms)", "P95(ms)", "最大(ms)")]
+        for stage, st in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+            rows.append((stage, str(st["count"]), str(st["errors"]), f"{st['total']:.2f}",
+                         f"{st['total'] / wall * 100:.0f}%", f"{st['avg'] * 1000:.1f}",
+                         f"{st['p95'] * 1000:.1f}", f"{st['max'] * 1000:.1f}"))
+        return [_pad(row[0], widths[0], left=True) + "".join(_pad(cell, width) for cell, width in zip(row[1:], widths[1:]))
+                for row in rows]
+
+    def render_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        p = self.prefix
+        out = []
+        with self._lock:
+            if self._stages:
+                out.append(f"# HELP {p}_stage_duration_seconds 各阶段耗时")
+                out.append(f"# TYPE {p}_stage_duration_seconds histogram")
+                for stage, stats in self._stages.items():
+                    key = (("stage", stage),)
+                    cumulative = 0
+                    for bound, count in zip(self.bucket_bounds, stats.buckets):
+                        cumulative += count
+                        le = 'le="%s"' % bound
+                        out.append(f"{p}_stage_duration_seconds_bucket{_format_labels(key, le)} {cumulative}")
+                    le = 'le="+Inf"'
+                    out.append(f"{p}_stage_duration_seconds_bucket{_format_labels(key, le)} {stats.count}")
+                    out.append(f"{p}_stage_duration_seconds_sum{_format_labels(key)} {stats.total:.6f}")
+                    out.append(f"{p}_stage_duration_seconds_count{_format_labels(key)} {stats.count}")
+                out.append(f"# HELP {p}_stage_errors_total 各阶段失败次数")
+                out.append(f"# TYPE {p}_stage_errors_total counter")
+                for stage, stats in self._stages.items():
+                    out.append(f"{p}_stage_errors_total{_format_labels((('stage', stage),))} {stats.errors}")
+            for name, series in self._counters.items():
+                out.append(f"# TYPE {p}_{name} counter")
+                for key, value in series.items():
+                    out.append(f"{p}_{name}{_format_labels(key)} {value}")
+            for name, series in self._gauges.items():
+                out.append(f"# TYPE {p}_{name} gauge")
+                for key, value in series.items():
+                    out.append(f"{p}_{name}{_format_labels(key)} {value}")
+        return "\n".join(out) + "\n"
+
+    def write_textfile(self, path: str):
+        """写入 Prometheus 文本文件（node_exporter textfile collector），先写临时文件再替换"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+class MetricsServer:
+    """在本机端口上提供 /metrics（Prometheus 抓取）"""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1",
+                 logger: Optional[logging.Logger] = None):
+        self.registry = registry
+        self.logger = logger or logging.getLogger("PrinterCore")
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.logger.info(f"📈 指标地址: http://{self._server.server_address[0]}:{self.port}/metrics")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,183 @@
+import os
+import time
+import queue
+import shutil
+import logging
+import threading
+from typing import Callable, Optional, Set
+
+MoveCallback = Callable[[bool, Optional[str]], None]  # (是否成功, 错误信息)
+Observer = Callable[[str, float, bool], None]  # (阶段, 耗时, 是否出错)，如 MetricsRegistry.observe
+
+
+class FileMover:
+    """
+    把打印完的文件移动到备份目录，诊所目录打印完后一次性清理空目录。
+
+    async_io 为 True 时由单独的 I/O 线程按提交顺序执行，打印线程提交后立即返回；
+    清理请求排在该诊所所有移动之后。源目录和备份目录在同一个卷上时使用 os.replace（原子重命名），
+    已创建的目标目录会被记住，不再重复 makedirs。
+    """
+
+    def __init__(self, source_root: str, target_root: str, async_io: bool = True,
+                 logger: Optional[logging.Logger] = None, observe: Optional[Observer] = None):
+        self.source_root = os.path.normpath(source_root)
+        self.target_root = os.path.normpath(target_root)
+        self.async_io = async_io
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self.observe = observe
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._created_dirs: Set[str] = set()
+        self._same_volume: Optional[bool] = None
+        # 有文件移走、还没清理过的目录
+        self._touched: Set[str] = set()
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.moved = 0
+        self.failed = 0
+        self.renamed = 0
+        self.removed_dirs = 0
+        self.io_seconds = 0.0
+
+    def start(self):
+        # 两轮打印之间目标目录可能被手动删除，重新检查
+        self._created_dirs.clear()
+        self._same_volume = None
+        if self.async_io and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="file-mover", daemon=True)
+            self._thread.start()
+
+    def _submit(self, task):
+        if self._thread is not None:
+            self._queue.put(task)
+        else:
+            task()
+
+    def move(self, src_file: str, on_done: Optional[MoveCallback] = None):
+        """移动文件到备份目录中相同的相对位置，完成后调用 on_done(成功, 错误信息)"""
+        def task():
+            start = time.perf_counter()
+            try:
+                self.relocate(src_file)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                self._observe("move", time.perf_counter() - start, True)
+                self.logger.error(f"❌ 移动文件失败: {src_file} - {e}")
+                if on_done is not None:
+                    on_done(False, str(e))
+                return
+            self._observe("move", time.perf_counter() - start, False)
+            if on_done is not None:
+                on_done(True, None)
+        self._submit(task)
+
+    def sweep(self, clinic_dir: str):
+        """诊所目录打印完后，自下而上删除其中的空目录（源目录本身不删除）"""
+        self._submit(lambda: self._sweep(clinic_dir))
+
+    def relocate(self, src_file: str) -> str:
+        """立即移动一个文件，返回目标路径"""
+        start = time.perf_counter()
+        rel_path = os.path.relpath(src_file, self.source_root)
+        dest_file = os.path.join(self.target_root, rel_path)
+        dest_dir = os.path.dirname(dest_file)
+        if dest_dir not in self._created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            self._created_dirs.add(dest_dir)
+
+        if self._is_same_volume():
+            try:
+                os.replace(src_file, dest_file)
+                renamed = True
+            except OSError:
+                # 跨卷（如目录被挂载到其他盘）或目标文件被占用时退回复制
+                shutil.move(src_file, dest_file)
+                renamed = False
+        else:
+            shutil.move(src_file, dest_file)
+            renamed = False
+
+        with self._lock:
+            self.moved += 1
+            self.renamed += renamed
+            self.io_seconds += time.perf_counter() - start
+            self._touched.add(os.path.dirname(os.path.normpath(src_file)))
+        self.logger.info(f"📁 已移动文件: {dest_file}")
+        return dest_file
+
+    def _is_same_volume(self) -> bool:
+        if self._same_volume is None:
+            try:
+                os.makedirs(self.target_root, exist_ok=True)
+                self._created_dirs.add(self.target_root)
+                self._same_volume = os.stat(self.source_root).st_dev == os.stat(self.target_root).st_dev
+            except OSError:
+                self._same_volume = False
+        return self._same_volume
+
+    def _sweep(self, clinic_dir: str):
+        clinic_dir = os.path.normpath(clinic_dir)
+        start = time.perf_counter()
+        with self._lock:
+            self._touched = {d for d in self._touched if not _is_within(d, clinic_dir)}
+        if clinic_dir == self.source_root or not _is_within(clinic_dir, self.source_root):
+            return
+        for dirpath, _, _ in os.walk(clinic_dir, topdown=False):
+            try:
+                # 还有文件（包括 Excel 的 ~$ 锁文件）的目录保留
+                if os.listdir(dirpath):
+                    continue
+                os.rmdir(dirpath)
+                with self._lock:
+                    self.removed_dirs += 1
+                self.logger.info(f"🗑️ 删除空目录: {dirpath}")
+            except OSError as e:
+                # 多台打印机并行或监控模式下，目录可能已被删除或有新文件写入
+                self.logger.warning(f"⚠️ 删除目录失败: {dirpath} - {e}")
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.io_seconds += elapsed
+        self._observe("dir_sweep", elapsed, False)
+
+    def _observe(self, stage: str, seconds: float, error: bool):
+        if self.observe is not None:
+            self.observe(stage, seconds, error)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _loop(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                task()
+            except Exception as e:
+                self.logger.error(f"❌ 文件移动线程异常: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """等待已提交的移动和清理全部完成"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """清理还没清理过的目录，等待完成后停止 I/O 线程"""
+        with self._lock:
+            leftovers = sorted(self._touched, key=len, reverse=True)
+        for directory in leftovers:
+            self.sweep(directory)
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+def _is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
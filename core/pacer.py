@@ -0,0 +1,108 @@
+import time
+import logging
+from typing import Callable, Optional
+
+from core.printer_status import QueueState
+
+
+class AdaptivePacer:
+    """
+    根据打印队列状态决定何时提交下一个文件，代替固定的 DELAY_SECONDS。
+
+    - 至少等待 min_delay 秒（下限），给阅读器/驱动把任务放进队列的时间
+    - 队列任务数低于 high_water 时立即返回
+    - 最多等待 max_delay 秒（上限），队列状态不可用时退化为固定间隔
+    - 打印机缺纸、卡纸、脱机等状态下按指数退避等待，直到恢复或超过 max_error_wait；
+      pause_on_error=False 时不等待，由 PrinterHealthMonitor 的熔断器暂停该打印机或切换到备用打印机
+    """
+
+    def __init__(self, get_queue_state: Callable[[str], Optional[QueueState]],
+                 high_water: int = 1, min_delay: float = 0.5, max_delay: float = 5.0,
+                 poll_interval: float = 0.25, backoff_initial: float = 2.0, backoff_max: float = 60.0,
+                 max_error_wait: float = 600.0, pause_on_error: bool = True,
+                 logger: Optional[logging.Logger] = None,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.monotonic):
+        self.get_queue_state = get_queue_state
+        self.high_water = max(1, int(high_water))
+        self.min_delay = max(0.0, float(min_delay))
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.poll_interval = max(0.01, float(poll_interval))
+        self.backoff_initial = float(backoff_initial)
+        self.backoff_max = float(backoff_max)
+        self.max_error_wait = float(max_error_wait)
+        self.pause_on_error = pause_on_error
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self._sleep = sleep
+        self._clock = clock
+
+        # 统计信息
+        self.total_wait = 0.0
+        self.error_wait = 0.0
+
+    def _sleep_until(self, deadline: float, should_continue: Callable[[], bool]) -> bool:
+        """分段睡眠到 deadline，期间 should_continue() 为 False 时提前返回 False"""
+        while True:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return True
+            if not should_continue():
+                return False
+            self._sleep(min(remaining, self.poll_interval))
+
+    def _query(self, printer_name: str) -> Optional[QueueState]:
+        try:
+            return self.get_queue_state(printer_name)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 获取打印队列状态失败: {printer_name} - {e}")
+            return None
+
+    def wait(self, printer_name: str, should_continue: Callable[[], bool] = lambda: True) -> float:
+        """提交一个文件后调用，阻塞到可以提交下一个文件，返回实际等待秒数"""
+        start = self._clock()
+        if not self._sleep_until(start + self.min_delay, should_continue):
+            return self._finish(start)
+
+        backoff = self.backoff_initial
+        error_started = None
+        while should_continue():
+            now = self._clock()
+            state = self._query(printer_name)
+
+            if state is None:
+                # 拿不到队列状态，按固定间隔等待
+                self._sleep_until(start + self.max_delay, should_continue)
+                break
+
+            if state.is_blocked:
+                if not self.pause_on_error:
+                    break
+                if error_started is None:
+                    error_started = now
+                    self.logger.warning(f"⚠️ 打印机状态异常，暂停提交: {printer_name} {state}")
+                elif now - error_started >= self.max_error_wait > 0:
+                    self.logger.warning(f"⚠️ 打印机异常已持续 {now - error_started:.0f} 秒，继续提交: {printer_name}")
+                    break
+                self._sleep_until(now + backoff, should_continue)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+
+            if error_started is not None:
+                self.error_wait += now - error_started
+                self.logger.info(f"✅ 打印机已恢复: {printer_name}")
+                error_started = None
+                backoff = self.backoff_initial
+
+            if state.job_count < self.high_water:
+                break
+            if now - start >= self.max_delay:
+                break
+            self._sleep_until(min(now + self.poll_interval, start + self.max_delay), should_continue)
+
+        if error_started is not None:
+            self.error_wait += self._clock() - error_started
+        return self._finish(start)
+
+    def _finish(self, start: float) -> float:
+        waited = self._clock() - start
+        self.total_wait += waited
+        return waited
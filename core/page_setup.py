@@ -0,0 +1,154 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core.cancel import Cancelled
+
+A4_PAPER_SIZE = 9
+
+
+class ComCallCounter:
+    """统计一个工作簿页面设置过程中的 COM 调用次数"""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        # 是否在 PrintCommunication=False 下批量提交（只与打印机驱动通信一次）
+        self.batched = False
+
+    @property
+    def total(self) -> int:
+        return self.reads + self.writes
+
+    def __repr__(self):
+        mode = "批量提交" if self.batched else "逐项提交"
+        return f"{self.total} 次 (读 {self.reads} / 写 {self.writes}, {mode})"
+
+
+class _Counted:
+    """COM 对象的计数代理：每次属性读写都计一次跨进程调用"""
+
+    def __init__(self, target, counter: ComCallCounter, wrap: Tuple[str, ...] = ()):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_counter", counter)
+        object.__setattr__(self, "_wrap", wrap)
+
+    def __getattr__(self, name):
+        self._counter.reads += 1
+        value = getattr(self._target, name)
+        if name in self._wrap:
+            return _Counted(value, self._counter)
+        return value
+
+    def __setattr__(self, name, value):
+        self._counter.writes += 1
+        setattr(self._target, name, value)
+
+
+class PageProfile:
+    """一组页面设置（打印机 + 纸张 + 缩放 + 黑白），按字段顺序赋值"""
+
+    def __init__(self, printer: str, paper_size: int, zoom, fit_wide, fit_tall, orientation: int, bw: bool):
+        self.printer = printer
+        self.fields = OrderedDict()
+        self.fields["PaperSize"] = paper_size
+        # Zoom 必须在 FitToPages* 之前设置：Zoom=False 时 FitToPages* 才生效
+        self.fields["Zoom"] = zoom
+        self.fields["FitToPagesWide"] = fit_wide
+        self.fields["FitToPagesTall"] = fit_tall
+        self.fields["Orientation"] = orientation
+        # 只在需要黑白打印时设置，保持原有行为
+        if bw:
+            self.fields["BlackAndWhite"] = True
+
+    def __repr__(self):
+        return f"PageProfile({self.printer!r}, {dict(self.fields)})"
+
+
+class PageSetupApplier:
+    """
+    批量应用 Excel 页面设置。
+
+    - 通过 Application.PrintCommunication = False 暂停与打印机驱动的通信，全部设置完后一次提交
+    - 工作表已有的设置与目标一致时不再赋值
+    - 每种 打印机/纸张/缩放 组合缓存为一个 PageProfile；打印机不支持的纸张只尝试一次，之后直接用 A4
+    """
+
+    def __init__(self, batch: bool = True, logger: Optional[logging.Logger] = None):
+        self.batch = batch
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self._profiles: Dict[tuple, PageProfile] = {}
+        self._unsupported_paper: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+    def profile(self, printer: str, is_monthly: bool, paper_size: int, zoom: int, bw: bool) -> PageProfile:
+        """取得（或创建并缓存）目标页面设置"""
+        if not is_monthly and (printer, paper_size) in self._unsupported_paper:
+            paper_size = A4_PAPER_SIZE
+        key = (printer, is_monthly, paper_size, zoom, bw)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                if is_monthly:
+                    # 月结单：A4 缩放到一页
+                    profile = PageProfile(printer, A4_PAPER_SIZE, False, 1, 1, 1, bw)
+                else:
+                    profile = PageProfile(printer, paper_size, zoom, False, False, 1, bw)
+                self._profiles[key] = profile
+            return profile
+
+    def apply(self, excel, wb, profile: PageProfile,
+              should_continue: Callable[[], bool] = lambda: True) -> ComCallCounter:
+        """对工作簿的所有工作表应用页面设置，返回 COM 调用统计；每个工作表之前检查 should_continue()"""
+        counter = ComCallCounter()
+        if not self.batch:
+            self._apply_legacy(wb, profile, counter, should_continue)
+            return counter
+
+        app = _Counted(excel, counter)
+        try:
+            app.PrintCommunication = False
+            counter.batched = True
+        except Exception:
+            # Excel 2007 及更早版本没有 PrintCommunication
+            pass
+
+        try:
+            for sheet in wb.Sheets:
+                if not should_continue():
+                    raise Cancelled("页面设置")
+                page_setup = _Counted(sheet, counter, ("PageSetup",)).PageSetup
+                for field, value in profile.fields.items():
+                    try:
+                        if getattr(page_setup, field) == value:
+                            continue
+                    except Exception:
+                        pass
+                    self._set_field(page_setup, profile, field, value)
+        finally:
+            if counter.batched:
+                app.PrintCommunication = True
+        return counter
+
+    def _apply_legacy(self, wb, profile: PageProfile, counter: ComCallCounter,
+                      should_continue: Callable[[], bool]):
+        """逐个属性赋值（旧方式），用于对比 COM 调用次数"""
+        for sheet in wb.Sheets:
+            if not should_continue():
+                raise Cancelled("页面设置")
+            sheet = _Counted(sheet, counter, ("PageSetup",))
+            for field, value in profile.fields.items():
+                self._set_field(sheet.PageSetup, profile, field, value)
+
+    def _set_field(self, page_setup, profile: PageProfile, field: str, value):
+        try:
+            setattr(page_setup, field, value)
+        except Exception:
+            if field != "PaperSize" or value == A4_PAPER_SIZE:
+                raise
+            # 打印机不支持该纸张，改用 A4，并记住这个组合
+            self.logger.warning(f"⚠️ 打印机不支持纸张编号 {value}，改用 A4: {profile.printer}")
+            with self._lock:
+                self._unsupported_paper.add((profile.printer, value))
+            setattr(page_setup, field, A4_PAPER_SIZE)
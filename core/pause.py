@@ -0,0 +1,96 @@
+import time
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional
+
+# 暂停结束的原因
+PAUSE_TIMEOUT = "timeout"   # 等待时间到
+PAUSE_SKIPPED = "skipped"   # 用户点击跳过
+PAUSE_STOPPED = "stopped"   # 停止打印
+
+
+class ClinicPause:
+    """某台打印机在诊所目录边界上的一次暂停"""
+
+    def __init__(self, pause_id: int, printer: str, clinic: str, seconds: float):
+        self.id = pause_id
+        self.printer = printer
+        self.clinic = clinic
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def end(self, reason: str):
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"id": self.id, "printer": self.printer, "clinic": self.clinic,
+                "seconds": self.seconds, "remaining": round(self.remaining, 1)}
+
+
+class PauseBoard:
+    """
+    诊所边界暂停的登记表。
+
+    暂停只阻塞调用 wait() 的打印线程（即该打印机的队列），其他队列和预渲染线程照常运行。
+    暂停开始和结束时调用 listener(当前所有暂停)，界面据此显示倒计时；
+    skip() 可由界面线程调用，stop_all() 在停止打印时立即结束所有暂停。
+    """
+
+    def __init__(self, listener: Optional[Callable[[List[Dict[str, object]]], None]] = None,
+                 poll_interval: float = 0.1):
+        self.listener = listener
+        self.poll_interval = poll_interval
+        self._pauses: Dict[int, ClinicPause] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def begin(self, printer: str, clinic: str, seconds: float) -> ClinicPause:
+        with self._lock:
+            pause = ClinicPause(next(self._ids), printer, clinic, seconds)
+            self._pauses[pause.id] = pause
+        self._notify()
+        return pause
+
+    def wait(self, pause: ClinicPause, should_continue: Callable[[], bool] = lambda: True) -> str:
+        """等待暂停结束，返回结束原因；should_continue() 返回 False 时在 poll_interval 内返回"""
+        try:
+            while not pause._event.wait(min(self.poll_interval, pause.remaining)):
+                if not should_continue():
+                    pause.end(PAUSE_STOPPED)
+                elif pause.remaining <= 0:
+                    pause.end(PAUSE_TIMEOUT)
+            return pause.reason
+        finally:
+            with self._lock:
+                self._pauses.pop(pause.id, None)
+            self._notify()
+
+    def skip(self, pause_id: Optional[int] = None, printer: Optional[str] = None):
+        """跳过指定的暂停；不指定时跳过所有暂停"""
+        for pause in self.active():
+            if (pause_id is None or pause.id == pause_id) and (printer is None or pause.printer == printer):
+                pause.end(PAUSE_SKIPPED)
+
+    def stop_all(self):
+        for pause in self.active():
+            pause.end(PAUSE_STOPPED)
+
+    def active(self) -> List[ClinicPause]:
+        with self._lock:
+            return list(self._pauses.values())
+
+    def _notify(self):
+        if self.listener is None:
+            return
+        try:
+            self.listener([pause.to_dict() for pause in self.active()])
+        except Exception:
+            pass
@@ -0,0 +1,185 @@
+import os
+import re
+import time
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.cancel import Cancelled
+from core.jobs import PrintJob
+
+
+def natural_key(name: str):
+    """自然排序：诊所目录 2 排在 10 前面"""
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part.lower())
+            for part in re.split(r"(\d+)", name) if part]
+
+
+class FileEntry:
+    def __init__(self, name: str, size: int, mtime_ns: int):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+
+class DirectoryIndex:
+    """
+    源目录的内存索引，按目录修改时间增量刷新。
+
+    目录的修改时间只有在增删文件时才会变化，所以修改时间未变的目录直接复用上次的文件列表，
+    只需 stat 一次目录本身；原地改写的文件大小可能是旧值，打印时以实际文件为准。
+    """
+
+    def __init__(self):
+        self._dirs: Dict[str, Tuple[int, List[FileEntry], List[str]]] = {}
+        self.scanned_dirs = 0
+        self.reused_dirs = 0
+        # 上一次 scan() 中重新列举过的目录（新目录或修改时间变化的目录）
+        self.changed_dirs: List[str] = []
+        self._should_continue: Callable[[], bool] = lambda: True
+
+    def scan(self, root: str, should_continue: Callable[[], bool] = lambda: True) -> List[Tuple[str, FileEntry]]:
+        """
+        返回 (目录, 文件) 列表，顺序与 os.walk(topdown=False) 一致：子目录在前，同级按自然顺序。
+
+        每个目录之前检查 should_continue()，返回 False 时抛出 Cancelled（已列举的目录仍保留在索引中）。
+        """
+        self.scanned_dirs = 0
+        self.reused_dirs = 0
+        self.changed_dirs = []
+        result: List[Tuple[str, FileEntry]] = []
+        seen = set()
+        self._should_continue = should_continue
+        self._scan_dir(root, result, seen)
+        # 清理已经不存在的目录
+        for path in list(self._dirs):
+            if path not in seen:
+                del self._dirs[path]
+        return result
+
+    def _scan_dir(self, path: str, result: List[Tuple[str, FileEntry]], seen: set):
+        if not self._should_continue():
+            raise Cancelled("扫描")
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        seen.add(path)
+
+        cached = self._dirs.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            files, subdirs = cached[1], cached[2]
+            self.reused_dirs += 1
+        else:
+            files, subdirs = [], []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                            elif entry.is_file() and not entry.name.startswith("~$"):
+                                st = entry.stat()
+                                files.append(FileEntry(entry.name, st.st_size, st.st_mtime_ns))
+                        except OSError:
+                            continue
+            except OSError:
+                return
+            subdirs.sort(key=natural_key)
+            files.sort(key=lambda f: natural_key(f.name))
+            self._dirs[path] = (mtime_ns, files, subdirs)
+            self.scanned_dirs += 1
+            self.changed_dirs.append(path)
+
+        for name in subdirs:
+            self._scan_dir(os.path.join(path, name), result, seen)
+        for entry in files:
+            result.append((path, entry))
+
+
+class PrintPlan:
+    """一次 run() 的打印计划：所有待打印文件及其目标打印机"""
+
+    def __init__(self, jobs: List[PrintJob]):
+        self.jobs = jobs
+        self.created_at = time.time()
+
+    @property
+    def total(self) -> int:
+        return len(self.jobs)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(job.size for job in self.jobs)
+
+    def by_printer(self) -> Counter:
+        return Counter(job.printer for job in self.jobs)
+
+    def clinics(self) -> List[str]:
+        seen = []
+        for job in self.jobs:
+            if job.clinic not in seen:
+                seen.append(job.clinic)
+        return seen
+
+
+class PrintPlanner:
+    """扫描源目录并生成确定顺序的打印计划，目录索引在多次 run() 之间复用"""
+
+    def __init__(self, printer_for: Callable[[bool], str], is_monthly: Callable[[str], bool]):
+        self.printer_for = printer_for
+        self.is_monthly = is_monthly
+        self.index = DirectoryIndex()
+
+    def build(self, source_root: str, should_continue: Callable[[], bool] = lambda: True) -> PrintPlan:
+        jobs = []
+        for root, entry in self.index.scan(source_root, should_continue):
+            monthly = self.is_monthly(entry.name)
+            jobs.append(PrintJob(os.path.join(root, entry.name), self.printer_for(monthly), monthly,
+                                 size=entry.size, mtime_ns=entry.mtime_ns))
+        return PrintPlan(jobs)
+
+
+class ProgressTracker:
+    """统计打印进度并估算剩余时间"""
+
+    def __init__(self, total: int, callback: Optional[Callable[[int, int, float], None]] = None):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def add(self, count: int):
+        """监控模式下陆续加入的新文件"""
+        with self._lock:
+            self.total += count
+
+    def job_finished(self, success: bool):
+        with self._lock:
+            if success:
+                self.done += 1
+            else:
+                self.failed += 1
+            done, eta = self.done, self.eta()
+        if self.callback is not None:
+            try:
+                self.callback(done, self.total, eta)
+            except Exception:
+                pass
+
+    def eta(self) -> float:
+        """按已完成文件的平均速度估算剩余秒数，还没有完成的文件时返回 -1"""
+        finished = self.done + self.failed
+        if finished == 0:
+            return -1.0
+        elapsed = time.monotonic() - self.started_at
+        return elapsed / finished * max(0, self.total - finished)
+
+
+def format_eta(seconds: float) -> str:
+    if seconds < 0:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
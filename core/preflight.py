@@ -0,0 +1,650 @@
+import os
+import re
+import math
+import time
+import zlib
+import zipfile
+import logging
+import posixpath
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from core.cancel import Cancelled
+from core.jobs import PrintJob
+
+# 预检结果
+PREFLIGHT_OK = "ok"
+PREFLIGHT_CORRUPT = "corrupt"      # 确定无法打开：不是声称的格式、zip 结构或 XML 损坏
+PREFLIGHT_ENCRYPTED = "encrypted"  # 需要密码才能打开
+PREFLIGHT_UNREADABLE = "unreadable"  # 无法读取（被占用、没有权限），可能只是暂时的
+
+PREFLIGHT_NAMES = {
+    PREFLIGHT_OK: "正常",
+    PREFLIGHT_CORRUPT: "文件损坏",
+    PREFLIGHT_ENCRYPTED: "有打开密码",
+    PREFLIGHT_UNREADABLE: "无法读取",
+}
+
+# 估算不出页数时每个文件（Excel 为每个可见工作表）按 1 页计
+FALLBACK_PAGES = 1
+
+# 估算打印耗时：每个文件的固定开销（提交、节奏控制），Excel 还要打开工作簿
+FILE_OVERHEAD_SECONDS = {"pdf": 1.0, "excel": 3.0}
+
+# 纸张尺寸（纵向，磅），编号同 Excel PageSetup.PaperSize；132/133 为针式打印机连续纸
+PAPER_POINTS = {
+    1: (612.0, 792.0),      # Letter
+    5: (612.0, 1008.0),     # Legal
+    8: (841.9, 1190.6),     # A3
+    9: (595.3, 841.9),      # A4
+    11: (419.5, 595.3),     # A5
+    132: (683.1, 792.0),    # 连续纸 241 x 279.4 mm
+    133: (1080.0, 792.0),   # 连续纸 381 x 279.4 mm
+}
+A4_POINTS = PAPER_POINTS[9]
+
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+class PreflightError(Exception):
+    """确定无法打印的文件（不是 PDF / xlsx、zip 损坏、有打开密码）"""
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class PageEstimateError(Exception):
+    """
+    文件结构不在估算规则之内，估算不出页数（如 %%EOF 后有附加数据、只有图片的工作表、非标准 xref）。
+
+    这类文件通常可以正常打印，预检只给出警告并按 pages 页估算，不跳过文件。
+    """
+
+    def __init__(self, message: str, pages: int = FALLBACK_PAGES):
+        super().__init__(message)
+        self.pages = max(FALLBACK_PAGES, pages)
+
+
+class FileReport:
+    """一个文件的预检结果；pages 为预计打印的页数，exact 表示页数是否从文件结构中直接读出"""
+
+    def __init__(self, job: PrintJob, status: str = PREFLIGHT_OK, pages: int = 0, exact: bool = False,
+                 sheets: int = 0, detail: str = ""):
+        self.job = job
+        self.status = status
+        self.pages = pages
+        self.exact = exact
+        self.sheets = sheets
+        self.detail = detail
+
+    @property
+    def ok(self) -> bool:
+        return self.status == PREFLIGHT_OK
+
+    def __repr__(self):
+        return f"FileReport({self.job.name!r}, {self.status}, pages={self.pages})"
+
+
+class PrinterEstimate:
+    """一台打印机上的文件数、页数和预计打印时间"""
+
+    def __init__(self, printer: str, pages_per_minute: float):
+        self.printer = printer
+        self.pages_per_minute = pages_per_minute
+        self.files = 0
+        self.pages = 0
+        self.seconds = 0.0
+
+    def add(self, report: FileReport):
+        self.files += 1
+        self.pages += report.pages
+        self.seconds += FILE_OVERHEAD_SECONDS.get(report.job.kind, 0.0)
+        if self.pages_per_minute > 0:
+            self.seconds += report.pages * 60.0 / self.pages_per_minute
+
+
+class PreflightReport:
+    """一批文件的预检结果"""
+
+    def __init__(self, reports: List[FileReport], elapsed: float):
+        self.reports = reports
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> List[FileReport]:
+        return [r for r in self.reports if r.ok]
+
+    @property
+    def problems(self) -> List[FileReport]:
+        return [r for r in self.reports if not r.ok]
+
+    @property
+    def pages(self) -> int:
+        return sum(r.pages for r in self.reports if r.ok)
+
+    def estimates(self, pages_per_minute: Callable[[str], float]) -> "OrderedDict[str, PrinterEstimate]":
+        """按打印机汇总可以打印的文件；各打印机并行打印，整批耗时取最长的一台"""
+        result: "OrderedDict[str, PrinterEstimate]" = OrderedDict()
+        for report in self.ok:
+            printer = report.job.printer
+            estimate = result.get(printer)
+            if estimate is None:
+                estimate = result[printer] = PrinterEstimate(printer, pages_per_minute(printer))
+            estimate.add(report)
+        return result
+
+
+# ---------------------------------------------------------------------------
+# PDF：从 xref 表找到 Catalog -> Pages 根节点读取 /Count，不解析页面内容
+# ---------------------------------------------------------------------------
+
+_RE_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_RE_ROOT = re.compile(rb"/Root\s+(\d+)\s+\d+\s+R")
+_RE_PAGES_REF = re.compile(rb"/Pages\s+(\d+)\s+\d+\s+R")
+_RE_COUNT = re.compile(rb"/Count\s+(\d+)")
+_RE_PREV = re.compile(rb"/Prev\s+(\d+)")
+_RE_XREF_SECTION = re.compile(rb"\s*(\d+)\s+(\d+)[ ]*(?:\r\n|\r|\n)")
+_RE_XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_RE_OBJECT = re.compile(rb"(\d+)\s+\d+\s+obj\b(.*?)\bendobj", re.S)
+_RE_PAGES_TYPE = re.compile(rb"/Type\s*/Pages\b")
+_RE_PAGE_TYPE = re.compile(rb"/Type\s*/Page\b")
+_RE_STREAM = re.compile(rb"stream\r?\n")
+
+_PDF_TAIL_BYTES = 4096
+# 阅读器允许 %%EOF 后有附加数据（签名、下载工具追加的字节），找不到时再向前多读这么多
+_PDF_TRAILER_SEARCH_BYTES = 1024 * 1024
+_PDF_OBJECT_BYTES = 4096
+
+
+class _PdfFile:
+    def __init__(self, f, size: int):
+        self.f = f
+        self.size = size
+
+    def read_at(self, offset: int, length: int) -> bytes:
+        self.f.seek(offset)
+        return self.f.read(length)
+
+    def object_offset(self, xref_offset: int, number: int) -> Optional[int]:
+        """沿 xref 表及 /Prev 链查找对象的位置；xref 流（PDF 1.5）或表格式不标准时返回 None"""
+        seen = set()
+        while 0 <= xref_offset < self.size and xref_offset not in seen:
+            seen.add(xref_offset)
+            head = self.read_at(xref_offset, 16)
+            if not head.lstrip().startswith(b"xref"):
+                return None
+            pos = xref_offset + head.index(b"xref") + 4
+            while True:
+                match = _RE_XREF_SECTION.match(self.read_at(pos, 64))
+                if match is None:
+                    break
+                start, count = int(match.group(1)), int(match.group(2))
+                pos += match.end()
+                if start <= number < start + count:
+                    entry = _RE_XREF_ENTRY.match(self.read_at(pos + (number - start) * 20, 20))
+                    if entry is None:
+                        return None
+                    return int(entry.group(1)) if entry.group(3) == b"n" else None
+                pos += count * 20
+            prev = _RE_PREV.search(self.read_at(pos, 1024))
+            if prev is None:
+                return None
+            xref_offset = int(prev.group(1))
+        return None
+
+    def object_body(self, offset: int, number: int) -> Optional[bytes]:
+        data = self.read_at(offset, _PDF_OBJECT_BYTES)
+        match = re.match(rb"\s*%d\s+\d+\s+obj\b" % number, data)
+        if match is None:
+            return None
+        body = data[match.end():]
+        for end in (b"endobj", b"stream"):
+            index = body.find(end)
+            if index >= 0:
+                body = body[:index]
+        return body
+
+
+def _pdf_page_count_by_xref(pdf: _PdfFile, tail: bytes) -> Optional[int]:
+    startxref = _RE_STARTXREF.findall(tail)
+    if not startxref:
+        return None
+    xref_offset = int(startxref[-1])
+    root = _RE_ROOT.findall(tail)
+    if not root:
+        return None
+    root_number = int(root[-1])
+    root_offset = pdf.object_offset(xref_offset, root_number)
+    if root_offset is None:
+        return None
+    catalog = pdf.object_body(root_offset, root_number)
+    pages_ref = _RE_PAGES_REF.search(catalog or b"")
+    if pages_ref is None:
+        return None
+    pages_number = int(pages_ref.group(1))
+    pages_offset = pdf.object_offset(xref_offset, pages_number)
+    if pages_offset is None:
+        return None
+    count = _RE_COUNT.search(pdf.object_body(pages_offset, pages_number) or b"")
+    return int(count.group(1)) if count else None
+
+
+def _pdf_object_streams(data: bytes) -> Iterator[bytes]:
+    """解压对象流（/Type /ObjStm），其中的对象没有 obj/endobj 标记"""
+    for match in _RE_OBJECT.finditer(data):
+        body = match.group(2)
+        if b"/ObjStm" not in body or b"/FlateDecode" not in body:
+            continue
+        stream = _RE_STREAM.search(body)
+        if stream is None:
+            continue
+        try:
+            yield zlib.decompressobj().decompress(body[stream.end():])
+        except zlib.error:
+            continue
+
+
+def _pdf_page_count_by_scan(data: bytes) -> Optional[int]:
+    """逐个对象查找 Pages 根节点（没有 /Parent）；对象在压缩的对象流中时先解压"""
+    best = None
+    for match in _RE_OBJECT.finditer(data):
+        body = match.group(2).split(b"stream", 1)[0]
+        if _RE_PAGES_TYPE.search(body) and b"/Parent" not in body:
+            count = _RE_COUNT.search(body)
+            if count:
+                best = max(best or 0, int(count.group(1)))
+    if best is not None:
+        return best
+
+    # 对象流中的对象按顺序排列，Pages 字典和其他对象之间没有分隔，只统计 /Count 最大的 Pages 节点
+    pages = 0
+    for text in _pdf_object_streams(data):
+        for type_match in _RE_PAGES_TYPE.finditer(text):
+            start = text.rfind(b"<<", 0, type_match.start())
+            end = text.find(b">>", type_match.end())
+            count = _RE_COUNT.search(text, max(0, start), end if end >= 0 else len(text))
+            if count:
+                best = max(best or 0, int(count.group(1)))
+        pages += len(_RE_PAGE_TYPE.findall(text))
+    if best is not None:
+        return best
+    pages += len(_RE_PAGE_TYPE.findall(data))
+    return pages or None
+
+
+def _pdf_tail(pdf: _PdfFile) -> Optional[bytes]:
+    """文件尾（到最后一个 %%EOF 为止）；%%EOF 后的附加数据超过搜索范围或没有 %%EOF 时返回 None"""
+    tail = pdf.read_at(max(0, pdf.size - _PDF_TAIL_BYTES), _PDF_TAIL_BYTES)
+    if b"%%EOF" not in tail and pdf.size > _PDF_TAIL_BYTES:
+        start = max(0, pdf.size - _PDF_TRAILER_SEARCH_BYTES)
+        tail = pdf.read_at(start, pdf.size - start)
+    end = tail.rfind(b"%%EOF")
+    if end < 0:
+        return None
+    return tail[max(0, end - _PDF_TAIL_BYTES):end + 5]
+
+
+def pdf_page_count(path: str) -> Tuple[int, bool]:
+    """
+    读取 PDF 页数，返回 (页数, 是否加密)。
+
+    先按 xref 表只读取文件尾、Catalog 和 Pages 根节点；使用 xref 流或表格式不标准的文件再整体扫描。
+    文件头不是 PDF 时抛出 PreflightError；缺少 %%EOF 或找不到页面时阅读器通常仍能打开（修复后打印），
+    抛出 PageEstimateError。
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        pdf = _PdfFile(f, size)
+        if b"%PDF-" not in pdf.read_at(0, 1024):
+            raise PreflightError(PREFLIGHT_CORRUPT, "不是 PDF 文件")
+        tail = _pdf_tail(pdf)
+        pages = _pdf_page_count_by_xref(pdf, tail) if tail else None
+        encrypted = bool(tail) and b"/Encrypt" in tail
+        if pages is None:
+            data = pdf.read_at(0, size)
+            encrypted = encrypted or b"/Encrypt" in data[-64 * 1024:]
+            pages = _pdf_page_count_by_scan(data)
+    if not pages:
+        reason = "找不到页面" if tail else "缺少 %%EOF，文件可能不完整"
+        raise PageEstimateError(f"估算不出页数（{reason}）")
+    return pages, encrypted
+
+
+# ---------------------------------------------------------------------------
+# XLSX：从 zip 中读取工作簿、工作表的打印区域和行列尺寸，按打印时的页面设置估算页数
+# ---------------------------------------------------------------------------
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+# Strict Open XML（另存为“Strict Open XML 电子表格”）使用 purl.oclc.org 命名空间，结构相同
+_NS_MAIN_STRICT = "{http://purl.oclc.org/ooxml/spreadsheetml/main}"
+_NS_REL_STRICT = "{http://purl.oclc.org/ooxml/officeDocument/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_RE_CELL = re.compile(r"\$?([A-Za-z]{1,3})?\$?(\d+)?$")
+
+# Excel 默认的行高（磅）、列宽（字符）和页边距（英寸）
+DEFAULT_ROW_POINTS = 15.0
+DEFAULT_COLUMN_CHARS = 8.43
+DEFAULT_MARGINS = {"left": 0.7, "right": 0.7, "top": 0.75, "bottom": 0.75}
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for ch in letters.upper():
+        number = number * 26 + ord(ch) - 64
+    return number
+
+
+def _parse_range(ref: str) -> Optional[Tuple[int, int, int, int]]:
+    """把 "A1:H40"、"$A:$H"、"$1:$40" 解析为 (首行, 首列, 末行, 末列)，整列/整行时行/列为 0"""
+    parts = ref.split(":")
+    if len(parts) == 1:
+        parts = parts * 2
+    bounds = []
+    for part in parts[:2]:
+        match = _RE_CELL.match(part.strip())
+        if match is None:
+            return None
+        col, row = match.groups()
+        bounds.append((int(row) if row else 0, _column_number(col) if col else 0))
+    (r1, c1), (r2, c2) = bounds
+    return min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2)
+
+
+def _column_points(chars: float) -> float:
+    # 列宽按字符数存储，默认字体下每个字符 7 像素，另加 5 像素边距；1 像素 = 0.75 磅
+    return (chars * 7 + 5) * 0.75
+
+
+class SheetLayout:
+    """从工作表 XML 中读取的打印相关信息"""
+
+    def __init__(self):
+        self.cells = 0
+        self.used: Optional[Tuple[int, int, int, int]] = None
+        self.default_row = DEFAULT_ROW_POINTS
+        self.default_column = DEFAULT_COLUMN_CHARS
+        self.row_points: Dict[int, float] = {}
+        self.column_points: Dict[int, float] = {}
+        self.row_breaks = 0
+        self.col_breaks = 0
+        self.margins = dict(DEFAULT_MARGINS)
+
+    def height(self, first: int, last: int) -> float:
+        total = (last - first + 1) * self.default_row
+        for row, points in self.row_points.items():
+            if first <= row <= last:
+                total += points - self.default_row
+        return total
+
+    def width(self, first: int, last: int) -> float:
+        default = _column_points(self.default_column)
+        total = (last - first + 1) * default
+        for col, points in self.column_points.items():
+            if first <= col <= last:
+                total += points - default
+        return total
+
+
+def _read_sheet_layout(f, ns: str = _NS_MAIN) -> SheetLayout:
+    layout = SheetLayout()
+    max_row = max_col = 0
+    min_row = min_col = None
+    # 单元格可以省略 r 属性，此时按出现顺序计算行列
+    rows = row_cells = widest = 0
+    for _, elem in ElementTree.iterparse(f):
+        tag = elem.tag
+        if tag == ns + "c":
+            layout.cells += 1
+            row_cells += 1
+            match = _RE_CELL.match(elem.get("r", ""))
+            if match and match.group(1) and match.group(2):
+                row, col = int(match.group(2)), _column_number(match.group(1))
+                max_row, max_col = max(max_row, row), max(max_col, col)
+                min_row = row if min_row is None else min(min_row, row)
+                min_col = col if min_col is None else min(min_col, col)
+            elem.clear()
+        elif tag == ns + "row":
+            rows += 1
+            widest, row_cells = max(widest, row_cells), 0
+            row = elem.get("r")
+            if row and row.isdigit():
+                if elem.get("hidden") in ("1", "true"):
+                    layout.row_points[int(row)] = 0.0
+                elif elem.get("customHeight") in ("1", "true") and elem.get("ht"):
+                    layout.row_points[int(row)] = float(elem.get("ht"))
+            elem.clear()
+        elif tag == ns + "dimension":
+            layout.used = _parse_range(elem.get("ref", ""))
+        elif tag == ns + "sheetFormatPr":
+            layout.default_row = float(elem.get("defaultRowHeight") or DEFAULT_ROW_POINTS)
+            if elem.get("defaultColWidth"):
+                layout.default_column = float(elem.get("defaultColWidth"))
+        elif tag == ns + "col":
+            first, last = int(elem.get("min", 0)), int(elem.get("max", 0))
+            hidden = elem.get("hidden") in ("1", "true")
+            points = 0.0 if hidden else _column_points(float(elem.get("width") or DEFAULT_COLUMN_CHARS))
+            # 整表设置列宽时 max 为 16384，只记录实际可能用到的列
+            for col in range(first, min(last, first + 1024) + 1):
+                layout.column_points[col] = points
+        elif tag == ns + "rowBreaks":
+            layout.row_breaks = int(elem.get("count") or len(elem))
+        elif tag == ns + "colBreaks":
+            layout.col_breaks = int(elem.get("count") or len(elem))
+        elif tag == ns + "pageMargins":
+            for key in layout.margins:
+                if elem.get(key):
+                    layout.margins[key] = float(elem.get(key))
+    if layout.cells and min_row is not None:
+        # dimension 缺失或不准确时以实际单元格为准
+        layout.used = (min_row, min_col, max_row, max_col)
+    elif layout.cells and (layout.used is None or not layout.used[2]):
+        layout.used = (1, 1, max(rows, 1), max(widest, row_cells, 1))
+    return layout
+
+
+def _sheet_pages(layout: SheetLayout, areas: List[Tuple[int, int, int, int]], paper: Tuple[float, float],
+                 zoom: float) -> int:
+    if not layout.cells or layout.used is None:
+        # 空白工作表不打印
+        return 0
+    width, height = paper
+    printable_w = max(72.0, width - (layout.margins["left"] + layout.margins["right"]) * 72)
+    printable_h = max(72.0, height - (layout.margins["top"] + layout.margins["bottom"]) * 72)
+    scale = zoom / 100.0
+    pages = 0
+    for r1, c1, r2, c2 in areas or [layout.used]:
+        # 整行/整列的打印区域以已用区域补全
+        ur1, uc1, ur2, uc2 = layout.used
+        r1, r2 = (r1, r2) if r1 else (ur1, ur2)
+        c1, c2 = (c1, c2) if c1 else (uc1, uc2)
+        tall = max(1, math.ceil(layout.height(r1, r2) * scale / printable_h - 1e-6))
+        wide = max(1, math.ceil(layout.width(c1, c2) * scale / printable_w - 1e-6))
+        pages += max(tall, layout.row_breaks + 1) * max(wide, layout.col_breaks + 1)
+    return pages
+
+
+def _read_xml(zf: zipfile.ZipFile, name: str) -> ElementTree.Element:
+    try:
+        with zf.open(name) as f:
+            return ElementTree.parse(f).getroot()
+    except KeyError:
+        raise PreflightError(PREFLIGHT_CORRUPT, f"缺少 {name}")
+
+
+def _relationships(zf: zipfile.ZipFile, part: str) -> Dict[str, str]:
+    """读取某个部件的关系，返回 rId -> 部件在 zip 中的路径"""
+    folder, name = posixpath.split(part)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_name not in zf.NameToInfo:
+        return {}
+    targets = {}
+    for rel in _read_xml(zf, rels_name).iter(_NS_PKG_REL + "Relationship"):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        targets[rel.get("Id")] = target
+    return targets
+
+
+def xlsx_page_estimate(path: str, paper_size: int = 9, zoom: float = 100,
+                       fit_to_page: bool = False) -> Tuple[int, int]:
+    """
+    估算工作簿打印的页数，返回 (页数, 打印的工作表数)。
+
+    只读取 zip 中的 workbook.xml、关系和可见工作表的 XML；打印区域（_xlnm.Print_Area）、
+    自定义行高列宽、分页符和页边距按文件中的设置，纸张和缩放按打印时的页面设置。
+    fit_to_page（月结单缩放到一页）时每个非空工作表一页。
+
+    有打开密码、不是 zip、zip 或 XML 损坏时抛出 PreflightError；工作表只有图片、形状（sheetData 为空）
+    或缺少工作表部件等估算不了的情况抛出 PageEstimateError，按每个可见工作表一页估算。
+    """
+    with open(path, "rb") as f:
+        magic = f.read(8)
+    if magic == OLE_MAGIC:
+        # 设置了打开密码的 xlsx 保存为 OLE 复合文档（EncryptedPackage）
+        raise PreflightError(PREFLIGHT_ENCRYPTED, "工作簿有打开密码")
+    if magic[:4] != ZIP_MAGIC:
+        raise PreflightError(PREFLIGHT_CORRUPT, "不是 xlsx 文件")
+
+    try:
+        with zipfile.ZipFile(path) as zf:
+            root_rels = _relationships(zf, "")
+            workbook_part = next((t for t in root_rels.values() if t.endswith(".xml") and "workbook" in t),
+                                 "xl/workbook.xml")
+            workbook = _read_xml(zf, workbook_part)
+            sheet_parts = _relationships(zf, workbook_part)
+            if workbook.tag.startswith(_NS_MAIN_STRICT):
+                ns, ns_rel = _NS_MAIN_STRICT, _NS_REL_STRICT
+            else:
+                ns, ns_rel = _NS_MAIN, _NS_REL
+
+            print_areas: Dict[int, List[Tuple[int, int, int, int]]] = {}
+            for defined in workbook.iter(ns + "definedName"):
+                if defined.get("name") != "_xlnm.Print_Area" or defined.get("localSheetId") is None:
+                    continue
+                areas = []
+                for ref in (defined.text or "").split(","):
+                    bounds = _parse_range(ref.rsplit("!", 1)[-1])
+                    if bounds is not None:
+                        areas.append(bounds)
+                print_areas[int(defined.get("localSheetId"))] = areas
+
+            paper = A4_POINTS if fit_to_page else PAPER_POINTS.get(int(paper_size), A4_POINTS)
+            pages = sheets = visible = 0
+            missing = []
+            for index, sheet in enumerate(workbook.iter(ns + "sheet")):
+                if sheet.get("state") in ("hidden", "veryHidden"):
+                    continue
+                visible += 1
+                part = sheet_parts.get(sheet.get(ns_rel + "id"))
+                if part is None or part not in zf.NameToInfo:
+                    missing.append(sheet.get("name") or str(index + 1))
+                    continue
+                if "worksheets/" not in part:
+                    # 图表工作表按一页计
+                    pages += 1
+                    sheets += 1
+                    continue
+                with zf.open(part) as f:
+                    layout = _read_sheet_layout(f, ns)
+                sheet_pages = _sheet_pages(layout, print_areas.get(index, []), paper, zoom)
+                if sheet_pages:
+                    sheets += 1
+                    pages += 1 if fit_to_page else sheet_pages
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError) as e:
+        raise PreflightError(PREFLIGHT_CORRUPT, f"zip 结构损坏: {e}")
+    except ElementTree.ParseError as e:
+        raise PreflightError(PREFLIGHT_CORRUPT, f"XML 损坏: {e}")
+    if missing:
+        raise PageEstimateError(f"估算不出页数（找不到工作表 {', '.join(missing)}）", pages + len(missing))
+    if not sheets:
+        # 单元格为空的工作表可能只有图片、形状或图表，Excel 照常打印
+        raise PageEstimateError("估算不出页数（工作表中没有单元格，可能只有图片或形状）", visible)
+    return pages, sheets
+
+
+# ---------------------------------------------------------------------------
+
+
+class PreflightAnalyzer:
+    """
+    打印前检查：不启动 Office，读取 PDF 页数和 xlsx 的打印区域、页面设置，估算页数和打印时间，
+    并找出确定无法打开的文件（格式不对、zip 损坏、有打开密码），避免打印到一半才由 Excel 报错。
+    估算不出页数只给出警告，文件照常打印。
+
+    paper_size / zoom / first_page_only 与打印时的页面设置一致；多个文件在线程池中并行检查。
+    """
+
+    def __init__(self, paper_size: int = 9, zoom: float = 100, first_page_only: bool = False,
+                 workers: int = 4, logger: Optional[logging.Logger] = None):
+        self.paper_size = paper_size
+        self.zoom = zoom
+        self.first_page_only = first_page_only
+        self.workers = max(1, int(workers))
+        self.logger = logger or logging.getLogger("PrinterCore")
+
+    def analyze(self, job: PrintJob) -> FileReport:
+        report = FileReport(job)
+        try:
+            if job.kind == "pdf":
+                report.pages, encrypted = pdf_page_count(job.path)
+                report.exact = True
+                if encrypted:
+                    # 只有权限密码的 PDF 可以直接打印，有打开密码时由阅读器报错
+                    report.detail = "已加密"
+            elif job.name.lower().endswith(".xls"):
+                report.pages, report.sheets = self._analyze_xls(job)
+            else:
+                report.pages, report.sheets = xlsx_page_estimate(job.path, self.paper_size, self.zoom,
+                                                                 fit_to_page=job.is_monthly)
+        except PreflightError as e:
+            report.status = e.status
+            report.detail = str(e)
+        except PageEstimateError as e:
+            # 只是估算不了页数，文件照常打印
+            report.pages = e.pages
+            report.exact = False
+            report.detail = f"{e}，按 {e.pages} 页计"
+        except OSError as e:
+            report.status = PREFLIGHT_UNREADABLE
+            report.detail = str(e)
+        if self.first_page_only and report.pages > 1:
+            report.pages = 1
+        job.pages = report.pages if report.ok else None
+        return report
+
+    def _analyze_xls(self, job: PrintJob) -> Tuple[int, int]:
+        with open(job.path, "rb") as f:
+            magic = f.read(8)
+        if magic[:4] == ZIP_MAGIC:
+            # 扩展名为 xls 的 xlsx 文件
+            return xlsx_page_estimate(job.path, self.paper_size, self.zoom, fit_to_page=job.is_monthly)
+        if magic != OLE_MAGIC:
+            # HTML 表格、SpreadsheetML 2003 等导出为 xls 的文本文件，Excel 可以打开，只是估算不了页数
+            raise PageEstimateError("估算不出页数（不是 BIFF 或 xlsx 格式）")
+        # 旧格式（BIFF）不解析，按一页估算
+        return 1, 1
+
+    def run(self, jobs: List[PrintJob], should_continue: Callable[[], bool] = lambda: True) -> PreflightReport:
+        """并行检查所有文件，结果按 jobs 的顺序返回；should_continue() 返回 False 时抛出 Cancelled"""
+        started = time.perf_counter()
+
+        def analyze(job: PrintJob) -> FileReport:
+            if not should_continue():
+                raise Cancelled("预检")
+            return self.analyze(job)
+
+        if len(jobs) <= 1 or self.workers == 1:
+            reports = [analyze(job) for job in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                    thread_name_prefix="preflight") as pool:
+                reports = list(pool.map(analyze, jobs))
+        return PreflightReport(reports, time.perf_counter() - started)
@@ -0,0 +1,305 @@
+import os
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+from core.render_cache import RenderCache
+
+# 预渲染任务状态
+RENDER_QUEUED = "queued"
+RENDER_RUNNING = "running"
+RENDER_READY = "ready"
+RENDER_FAILED = "failed"
+
+
+class Converter:
+    """把工作簿转换为 PDF；每个预渲染线程调用 convert()，线程退出前调用 close_thread()"""
+
+    name = "converter"
+
+    def convert(self, path: str, pdf_path: str, use_alt: bool):
+        raise NotImplementedError
+
+    def close_thread(self):
+        pass
+
+
+class ExcelConverter(Converter):
+    """使用 Excel ExportAsFixedFormat 渲染，页面设置与直接打印相同；每个线程使用自己的 Excel 会话池"""
+
+    name = "excel"
+
+    def __init__(self, core):
+        self.core = core
+
+    def convert(self, path: str, pdf_path: str, use_alt: bool):
+        if not self.core.render_excel_to_pdf(path, pdf_path, use_alt):
+            raise RuntimeError(f"Excel 导出 PDF 失败: {path}")
+
+    def close_thread(self):
+        self.core.shutdown_excel_pool()
+
+
+class LibreOfficeConverter(Converter):
+    """
+    使用 LibreOffice 无界面模式渲染，可在没有 Excel 的机器（包括 Linux）上运行。
+
+    按工作簿中保存的页面设置输出，不应用 PaperSize/Zoom 等打印设置。
+    """
+
+    name = "libreoffice"
+
+    WINDOWS_PATHS = (
+        r"C:\Program Files\LibreOffice\program\soffice.exe",
+        r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    )
+
+    def __init__(self, soffice_path: str = "", timeout: float = 120):
+        self.soffice = soffice_path or self.find_soffice()
+        if not self.soffice:
+            raise FileNotFoundError("未找到 LibreOffice (soffice)")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def find_soffice(cls) -> Optional[str]:
+        for name in ("soffice", "libreoffice"):
+            path = shutil.which(name)
+            if path:
+                return path
+        for path in cls.WINDOWS_PATHS:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _profile_dir(self) -> str:
+        # 同一个用户配置目录只能被一个 soffice 进程使用，每个线程各自一个
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = tempfile.mkdtemp(prefix="lo_profile_")
+            self._local.profile = profile
+        return profile
+
+    def convert(self, path: str, pdf_path: str, use_alt: bool):
+        out_dir = tempfile.mkdtemp(prefix="lo_out_", dir=os.path.dirname(pdf_path))
+        try:
+            profile_url = "file:///" + self._profile_dir().replace("\\", "/").lstrip("/")
+            subprocess.run(
+                [self.soffice, "--headless", "--norestore", f"-env:UserInstallation={profile_url}",
+                 "--convert-to", "pdf", "--outdir", out_dir, path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=self.timeout, check=True,
+            )
+            produced = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".pdf")
+            if not os.path.exists(produced):
+                raise RuntimeError(f"LibreOffice 没有生成 PDF: {path}")
+            os.replace(produced, pdf_path)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def close_thread(self):
+        profile = getattr(self._local, "profile", None)
+        if profile is not None:
+            shutil.rmtree(profile, ignore_errors=True)
+            self._local.profile = None
+
+
+class CachingConverter(Converter):
+    """先查渲染缓存，命中时直接复制缓存的 PDF；未命中时转换并把结果存入缓存"""
+
+    def __init__(self, converter: Converter, cache: RenderCache,
+                 key_for: Callable[[str, bool], Optional[str]]):
+        self.converter = converter
+        self.cache = cache
+        self.key_for = key_for
+        self.name = converter.name
+
+    def convert(self, path: str, pdf_path: str, use_alt: bool):
+        key = self.key_for(path, use_alt)
+        if key is not None and self.cache.copy_to(key, pdf_path):
+            return
+        self.converter.convert(path, pdf_path, use_alt)
+        if key is not None:
+            self.cache.put(key, pdf_path)
+
+    def close_thread(self):
+        self.converter.close_thread()
+
+
+class RenderTask:
+    def __init__(self, path: str, use_alt: bool, pdf_path: str):
+        self.path = path
+        self.use_alt = use_alt
+        self.pdf_path = pdf_path
+        self.state = RENDER_QUEUED
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+class PrerenderPipeline:
+    """
+    Excel 预渲染流水线：转换线程按打印顺序提前把工作簿渲染为 PDF，打印阶段只需提交 PDF。
+
+    lookahead 限制已渲染但还没打印（包括正在渲染）的文件数，控制缓存目录的磁盘占用。
+    打印阶段取文件时，如果该文件还没开始渲染，直接由打印线程自己处理（take() 返回 None），
+    不会等待排在后面的转换，因此某个打印队列停止时也不会卡住其他队列。
+    """
+
+    def __init__(self, converter: Converter, cache_dir: str, workers: int = 1, lookahead: int = 4,
+                 logger: Optional[logging.Logger] = None):
+        self.converter = converter
+        self.cache_dir = cache_dir
+        self.workers = max(1, int(workers))
+        self.lookahead = max(1, int(lookahead))
+        self.logger = logger or logging.getLogger("PrinterCore")
+
+        self._queue: "queue.Queue[RenderTask]" = queue.Queue()
+        self._tasks: Dict[str, RenderTask] = {}
+        self._slots = threading.Semaphore(self.lookahead)
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._closed = threading.Event()
+        self._seq = 0
+
+        # 统计信息
+        self.rendered = 0
+        self.failed = 0
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def start(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"prerender-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def schedule(self, path: str, use_alt: bool):
+        """按打印顺序加入待渲染的工作簿"""
+        with self._lock:
+            if path in self._tasks:
+                return
+            self._seq += 1
+            name = f"{self._seq:06d}_{os.path.splitext(os.path.basename(path))[0]}.pdf"
+            task = RenderTask(path, use_alt, os.path.join(self.cache_dir, name))
+            self._tasks[path] = task
+        self._queue.put(task)
+
+    def _next_task(self) -> Optional[RenderTask]:
+        """占用一个 look-ahead 名额并取出下一个待渲染的任务"""
+        while not self._closed.is_set():
+            if not self._slots.acquire(timeout=0.2):
+                continue
+            while not self._closed.is_set():
+                try:
+                    task = self._queue.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                with self._lock:
+                    if task.state == RENDER_QUEUED and self._tasks.get(task.path) is task:
+                        task.state = RENDER_RUNNING
+                        return task
+                # 已被打印线程直接处理，名额留给下一个任务
+            self._slots.release()
+        return None
+
+    def _worker(self):
+        try:
+            while True:
+                task = self._next_task()
+                if task is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    self.converter.convert(task.path, task.pdf_path, task.use_alt)
+                    state = RENDER_READY
+                except Exception as e:
+                    task.error = str(e)
+                    state = RENDER_FAILED
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.render_seconds += elapsed
+                    if state == RENDER_READY:
+                        self.rendered += 1
+                    else:
+                        self.failed += 1
+                    task.state = state
+                task.done.set()
+                if state == RENDER_READY:
+                    self.logger.info(f"🧾 已预渲染: {os.path.basename(task.path)} ({elapsed:.2f} 秒)")
+                else:
+                    self.logger.warning(f"⚠️ 预渲染失败，将直接打印: {task.path} - {task.error}")
+        finally:
+            self.converter.close_thread()
+
+    def take(self, path: str, should_continue: Callable[[], bool] = lambda: True) -> Optional[str]:
+        """取得已渲染的 PDF 路径；文件没有预渲染或渲染失败时返回 None，由调用方直接打印"""
+        with self._lock:
+            task = self._tasks.get(path)
+            if task is None or task.state == RENDER_QUEUED:
+                # 还没开始渲染：不再等待转换线程
+                if task is not None:
+                    del self._tasks[path]
+                self.misses += 1
+                return None
+
+        start = time.perf_counter()
+        while not task.done.wait(0.2):
+            if not should_continue():
+                return None
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.wait_seconds += waited
+            if task.state != RENDER_READY:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return task.pdf_path
+
+    def release(self, path: str):
+        """文件打印完（或放弃）后删除缓存的 PDF，释放 look-ahead 名额"""
+        with self._lock:
+            task = self._tasks.get(path)
+            if task is None or task.state not in (RENDER_READY, RENDER_FAILED):
+                return
+            del self._tasks[path]
+        self._remove(task.pdf_path)
+        self._slots.release()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def close(self):
+        """停止转换线程并删除没有用到的缓存文件"""
+        self._closed.set()
+        for thread in self._threads:
+            thread.join()
+        with self._lock:
+            leftovers = list(self._tasks.values())
+            self._tasks.clear()
+        for task in leftovers:
+            self._remove(task.pdf_path)
+        self.logger.info(f"📊 Excel 预渲染: 完成 {self.rendered} 个, 失败 {self.failed} 个, "
+                         f"打印时命中 {self.hits} 个, 未命中 {self.misses} 个, "
+                         f"渲染用时 {self.render_seconds:.1f} 秒, 打印等待 {self.wait_seconds:.1f} 秒")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rendered": self.rendered,
+                "failed": self.failed,
+                "hits": self.hits,
+                "misses": self.misses,
+                "render_seconds": round(self.render_seconds, 3),
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
@@ -0,0 +1,643 @@
+import os
+import time
+import random
+import threading
+import subprocess
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from core.excel_session import ExcelApplicationFactory, Win32ExcelFactory
+from core.preflight import PageEstimateError, PreflightError, pdf_page_count
+from core.printer_status import PRINTER_BLOCKING_STATUS, PRINTER_STATUS_OFFLINE, QueueState
+from core.spool import (JOB_COMPLETED, JOB_SPOOLED, JOB_SUBMITTED, PrintJobHandle,
+                        Win32SpoolHandle, queue_job_ids)
+from utils.path_utils import get_app_path
+
+
+class SpoolerError(Exception):
+    """后台打印队列错误（打印机脱机、队列已满、注入的故障等）"""
+
+
+class SimulatedComError(Exception):
+    """模拟 pywintypes.com_error: args 为 (hresult, 说明, excepinfo, argerror)"""
+
+    def __init__(self, hresult: int, text: str, excepinfo: Optional[tuple] = None):
+        super().__init__(hresult, text, excepinfo, None)
+        self.hresult = hresult
+        self.strerror = text
+
+
+class PrinterBackend:
+    """
+    打印后端接口，PrinterCore 只通过它访问打印机、Excel 和系统弹窗。
+
+    - Win32Backend: 真实的 Windows 打印队列 / Excel
+    - SimulatedBackend: 进程内模拟打印队列，用于在 Linux 上测试和压测
+    """
+
+    name = "base"
+
+    def get_default_printer(self) -> str:
+        raise NotImplementedError
+
+    def set_default_printer(self, printer_name: str):
+        raise NotImplementedError
+
+    def list_printers(self) -> List[str]:
+        raise NotImplementedError
+
+    def printer_details(self, printer_name: str) -> Dict[str, Any]:
+        """
+        打印机的驱动、端口、状态和支持的纸张，可能较慢（网络打印机），不要在界面线程调用。
+
+        返回 {"driver", "port", "status", "forms"}，forms 与 EnumForms 的格式相同:
+        [{"Name": 名称, "Size": {"cx": 宽, "cy": 高}}]，单位为 0.001 毫米。
+        """
+        raise NotImplementedError
+
+    def print_pdf(self, path: str, printer_name: str, bw: bool = False,
+                  first_page_only: bool = False) -> PrintJobHandle:
+        """提交一个 PDF 打印任务，返回可等待的任务句柄"""
+        raise NotImplementedError
+
+    def supports_pdf_options(self) -> bool:
+        """PDF 打印是否支持黑白 / 只打印首页"""
+        return True
+
+    def get_queue_state(self, printer_name: str) -> Optional[QueueState]:
+        """查询打印队列的任务数和状态，不支持时返回 None"""
+        return None
+
+    def excel_factory(self) -> ExcelApplicationFactory:
+        """返回创建 Excel 实例的工厂"""
+        raise NotImplementedError
+
+    def show_message(self, text: str, caption: str, timeout_ms: int) -> int:
+        """显示带超时的提示框，返回按钮编号"""
+        return 0
+
+
+class Win32Backend(PrinterBackend):
+    """通过 pywin32 调用 Windows 打印队列"""
+
+    name = "win32"
+
+    def __init__(self, pdf_print_method: str = "auto", sumatra_path: str = "", submit_timeout: float = 120.0,
+                 submit_grace: float = 15.0):
+        # PDF 打印方式: sumatra（命令行直接提交）/ raw（直接写入打印队列）/ shell（printto 交给关联的阅读器）
+        self.sumatra_path = sumatra_path or get_app_path("SumatraPDF.exe")
+        if pdf_print_method == "auto":
+            pdf_print_method = "sumatra" if os.path.exists(self.sumatra_path) else "shell"
+        self.pdf_print_method = pdf_print_method
+        self.submit_timeout = float(submit_timeout)
+        # 阅读器异步提交的任务最多等这么久出现在打印队列中，之后不再等待
+        self.submit_grace = float(submit_grace)
+
+    def get_default_printer(self) -> str:
+        import win32print
+        return win32print.GetDefaultPrinter()
+
+    def set_default_printer(self, printer_name: str):
+        import win32print
+        win32print.SetDefaultPrinter(printer_name)
+
+    def list_printers(self) -> List[str]:
+        import win32print
+        printers = win32print.EnumPrinters(
+            win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
+        )
+        return [p[2] for p in printers]
+
+    def printer_details(self, printer_name: str) -> Dict[str, Any]:
+        import win32print
+        hprinter = win32print.OpenPrinter(printer_name)
+        try:
+            info = win32print.GetPrinter(hprinter, 2)
+            forms = win32print.EnumForms(hprinter)
+        finally:
+            win32print.ClosePrinter(hprinter)
+        return {
+            "driver": info.get("pDriverName", ""),
+            "port": info.get("pPortName", ""),
+            "status": info.get("Status", 0),
+            "forms": [{"Name": form["Name"], "Size": {"cx": form["Size"]["cx"], "cy": form["Size"]["cy"]}}
+                      for form in forms],
+        }
+
+    def print_pdf(self, path: str, printer_name: str, bw: bool = False,
+                  first_page_only: bool = False) -> PrintJobHandle:
+        if self.pdf_print_method == "sumatra":
+            return self._print_pdf_sumatra(path, printer_name, bw, first_page_only)
+        if self.pdf_print_method == "raw":
+            return self._print_pdf_raw(path, printer_name)
+        return self._print_pdf_shell(path, printer_name)
+
+    def supports_pdf_options(self) -> bool:
+        return self.pdf_print_method == "sumatra"
+
+    def _print_pdf_sumatra(self, path, printer_name, bw, first_page_only) -> PrintJobHandle:
+        """SumatraPDF 在命令返回时已把任务完整写入打印队列"""
+        settings = []
+        if first_page_only:
+            settings.append("1")
+        if bw:
+            settings.append("monochrome")
+        args = [self.sumatra_path, "-print-to", printer_name, "-silent"]
+        if settings:
+            args += ["-print-settings", ",".join(settings)]
+        args.append(path)
+        existing_ids = queue_job_ids(printer_name)
+        subprocess.run(args, check=True, timeout=self.submit_timeout,
+                       creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        return Win32SpoolHandle(printer_name, path, state=JOB_SPOOLED, existing_ids=existing_ids)
+
+    def _print_pdf_raw(self, path, printer_name) -> PrintJobHandle:
+        """直接把 PDF 数据写入打印队列，仅适用于支持 PDF 直接打印的打印机"""
+        import win32print
+        with open(path, "rb") as f:
+            data = f.read()
+        hprinter = win32print.OpenPrinter(printer_name)
+        try:
+            job_id = win32print.StartDocPrinter(hprinter, 1, (os.path.basename(path), None, "RAW"))
+            try:
+                win32print.StartPagePrinter(hprinter)
+                win32print.WritePrinter(hprinter, data)
+                win32print.EndPagePrinter(hprinter)
+            finally:
+                win32print.EndDocPrinter(hprinter)
+        finally:
+            win32print.ClosePrinter(hprinter)
+        return Win32SpoolHandle(printer_name, path, state=JOB_SPOOLED, job_id=job_id)
+
+    def _print_pdf_shell(self, path, printer_name) -> PrintJobHandle:
+        """printto 动词把打印机名称传给关联的 PDF 阅读器，任务由阅读器异步提交"""
+        import win32api
+        existing_ids = queue_job_ids(printer_name)
+        win32api.ShellExecute(0, "printto", path, f'"{printer_name}"', ".", 0)
+        return Win32SpoolHandle(printer_name, path, state=JOB_SUBMITTED, submit_grace=self.submit_grace,
+                                existing_ids=existing_ids)
+
+    def get_queue_state(self, printer_name: str) -> Optional[QueueState]:
+        import win32print
+        hprinter = win32print.OpenPrinter(printer_name)
+        try:
+            info = win32print.GetPrinter(hprinter, 2)
+            jobs = win32print.EnumJobs(hprinter, 0, info["cJobs"], 1) if info["cJobs"] else []
+        finally:
+            win32print.ClosePrinter(hprinter)
+        job_status = 0
+        for job in jobs:
+            job_status |= job.get("Status", 0)
+        return QueueState(len(jobs), info.get("Status", 0), job_status)
+
+    def excel_factory(self) -> ExcelApplicationFactory:
+        return Win32ExcelFactory()
+
+    def show_message(self, text: str, caption: str, timeout_ms: int) -> int:
+        import ctypes
+        import ctypes.wintypes
+
+        MB_OK = 0x00
+        MB_ICONINFORMATION = 0x40
+
+        MessageBoxTimeoutW = ctypes.windll.user32.MessageBoxTimeoutW
+        MessageBoxTimeoutW.restype = ctypes.c_int
+        MessageBoxTimeoutW.argtypes = [
+            ctypes.wintypes.HWND,
+            ctypes.wintypes.LPCWSTR,
+            ctypes.wintypes.LPCWSTR,
+            ctypes.wintypes.UINT,
+            ctypes.wintypes.WORD,
+            ctypes.wintypes.DWORD
+        ]
+
+        return MessageBoxTimeoutW(
+            0,  # hWnd
+            text,
+            caption,
+            MB_OK | MB_ICONINFORMATION,
+            0,  # Default button (0 = first button)
+            timeout_ms  # Timeout in milliseconds
+        )
+
+
+# ---------------------------------------------------------------------------
+# 模拟打印队列
+# ---------------------------------------------------------------------------
+
+class SimulatedJob:
+    """模拟打印队列中的一个任务"""
+
+    def __init__(self, job_id: int, printer_name: str, document: str, pages: int):
+        self.job_id = job_id
+        self.printer_name = printer_name
+        self.document = document
+        self.pages = pages
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.status = "queued"  # queued / printing / done / failed
+
+
+class SimulatedPrinter:
+    """一台模拟打印机：单线程按顺序处理队列中的任务"""
+
+    def __init__(self, spooler: "SimulatedSpooler", name: str):
+        self.spooler = spooler
+        self.name = name
+        self.queue = deque()
+        self.status = 0  # 打印机状态位，见 core.printer_status
+        self.completed: List[SimulatedJob] = []
+        self.busy_seconds = 0.0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name=f"sim-printer-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def offline(self) -> bool:
+        return bool(self.status & PRINTER_STATUS_OFFLINE)
+
+    @property
+    def blocked(self) -> bool:
+        return bool(self.status & PRINTER_BLOCKING_STATUS)
+
+    def job_count(self) -> int:
+        with self._cond:
+            return len(self.queue)
+
+    def submit(self, job: SimulatedJob):
+        with self._cond:
+            self.queue.append(job)
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self.queue or self.blocked:
+                    self._cond.wait(0.05)
+                job = self.queue[0]
+            job.status = "printing"
+            job.started_at = time.monotonic()
+            time.sleep(self.spooler.job_duration(job))
+            job.finished_at = time.monotonic()
+            job.status = "done"
+            with self._cond:
+                self.queue.popleft()
+                self.completed.append(job)
+                self.busy_seconds += job.finished_at - job.started_at
+                self._cond.notify_all()
+
+
+class SimulatedSpooler:
+    """
+    进程内模拟的打印队列。
+
+    - job_latency: 每个任务的固定开销（秒），模拟任务创建、走纸等
+    - pages_per_minute: 打印速度
+    - max_queue_depth: 队列上限，超过时提交失败（0 表示不限制）
+    - failure_rate: 提交任务时随机失败的概率，用于故障注入
+    """
+
+    def __init__(self, job_latency: float = 0.0, pages_per_minute: float = 0.0,
+                 max_queue_depth: int = 0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.job_latency = float(job_latency)
+        self.pages_per_minute = float(pages_per_minute)
+        self.max_queue_depth = int(max_queue_depth)
+        self.failure_rate = float(failure_rate)
+        self.printers: Dict[str, SimulatedPrinter] = {}
+        self.submitted = 0
+        self.rejected = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_job_id = 1
+
+    def job_duration(self, job: SimulatedJob) -> float:
+        duration = self.job_latency
+        if self.pages_per_minute > 0:
+            duration += job.pages * 60.0 / self.pages_per_minute
+        return duration
+
+    def get_printer(self, name: str) -> SimulatedPrinter:
+        with self._lock:
+            if name not in self.printers:
+                self.printers[name] = SimulatedPrinter(self, name)
+            return self.printers[name]
+
+    def set_status(self, name: str, status: int):
+        """设置打印机状态位，例如 PRINTER_STATUS_PAPER_OUT，用于模拟缺纸、卡纸等"""
+        self.get_printer(name).status = status
+
+    def set_offline(self, name: str, offline: bool = True):
+        printer = self.get_printer(name)
+        if offline:
+            printer.status |= PRINTER_STATUS_OFFLINE
+        else:
+            printer.status &= ~PRINTER_STATUS_OFFLINE
+
+    def submit(self, printer_name: str, document: str, pages: int = 1) -> SimulatedJob:
+        printer = self.get_printer(printer_name)
+        with self._lock:
+            if printer.offline:
+                self.rejected += 1
+                raise SpoolerError(f"打印机脱机: {printer_name}")
+            if self.max_queue_depth and printer.job_count() >= self.max_queue_depth:
+                self.rejected += 1
+                raise SpoolerError(f"打印队列已满: {printer_name}")
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.rejected += 1
+                raise SpoolerError(f"模拟打印失败: {os.path.basename(document)}")
+            job = SimulatedJob(self._next_job_id, printer_name, document, max(1, int(pages)))
+            self._next_job_id += 1
+            self.submitted += 1
+        printer.submit(job)
+        return job
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待所有打印机队列清空"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while any(p.job_count() for p in list(self.printers.values())):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "printers": {
+                name: {
+                    "completed": len(p.completed),
+                    "pages": sum(j.pages for j in p.completed),
+                    "busy_seconds": round(p.busy_seconds, 3),
+                    "queued": p.job_count(),
+                    "status": p.status,
+                }
+                for name, p in self.printers.items()
+            },
+        }
+
+
+def simulated_pdf(pages: int = 1) -> bytes:
+    """空白页组成的最小 PDF，模拟 Excel 导出的结果（可以统计页数、合并）"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               f"<< /Type /Pages /Kids [{' '.join(f'{3 + i} 0 R' for i in range(pages))}] /Count {pages} >>"]
+    objects += ["<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] >>"] * pages
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("ascii")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    return bytes(out)
+
+
+class SimulatedSpoolHandle(PrintJobHandle):
+    """模拟打印队列中任务的句柄"""
+
+    def __init__(self, job: SimulatedJob):
+        super().__init__(job.printer_name, job.document, JOB_SPOOLED)
+        self.job = job
+        self.job_id = job.job_id
+
+    def poll(self) -> str:
+        if self.job.status == "done":
+            self.state = JOB_COMPLETED
+        return self.state
+
+
+class _FakeCollection:
+    """模拟 COM 集合：支持 Count、1 起始的下标调用和迭代"""
+
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def __call__(self, index):
+        return self._items[index - 1]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+
+class FakePageSetup:
+    """
+    接受任意属性赋值的 PageSetup。
+
+    Application.PrintCommunication 为 True 时，每次赋值都模拟一次与打印机驱动的通信耗时。
+    """
+
+    def __init__(self, app: Optional["FakeExcelApplication"] = None):
+        # 默认值是工作表打开时就有的设置，不计入赋值耗时
+        defaults = {"_app": app, "PaperSize": 9, "Zoom": 100, "FitToPagesWide": False,
+                    "FitToPagesTall": False, "Orientation": 1, "BlackAndWhite": False}
+        for name, value in defaults.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        app = self._app
+        if app is not None and app.PrintCommunication and app.backend.page_setup_write_seconds:
+            time.sleep(app.backend.page_setup_write_seconds)
+        object.__setattr__(self, name, value)
+
+
+class FakeSheet:
+    def __init__(self, name, app: Optional["FakeExcelApplication"] = None):
+        self.Name = name
+        self.PageSetup = FakePageSetup(app)
+
+
+class FakeWorkbook:
+    def __init__(self, app: "FakeExcelApplication", path: str, sheet_count: int):
+        self.app = app
+        self.FullName = path
+        self.Sheets = _FakeCollection(FakeSheet(f"Sheet{i}", app) for i in range(1, sheet_count + 1))
+        self.closed = False
+
+    def PrintOut(self, From=None, To=None, ActivePrinter=None, **kwargs):
+        printer = ActivePrinter or self.app.backend.get_default_printer()
+        pages = self.Sheets.Count
+        if From is not None and To is not None:
+            pages = To - From + 1
+        self.app.backend.render_delay()
+        self.app.backend.spooler.submit(printer, self.FullName, pages)
+
+    def ExportAsFixedFormat(self, Type, Filename, **kwargs):
+        self.app.backend.render_delay()
+        pages = self.Sheets.Count
+        if kwargs.get("From") is not None and kwargs.get("To") is not None:
+            pages = kwargs["To"] - kwargs["From"] + 1
+        with open(Filename, "wb") as f:
+            f.write(simulated_pdf(pages))
+
+    def Close(self, SaveChanges=False):
+        if not self.closed:
+            self.closed = True
+            self.app.Workbooks._items.remove(self)
+
+
+class _FakeWorkbooks(_FakeCollection):
+    def __init__(self, app: "FakeExcelApplication"):
+        super().__init__()
+        self.app = app
+
+    def Open(self, path, ReadOnly=False, **kwargs):
+        backend = self.app.backend
+        if not os.path.exists(path):
+            raise SpoolerError(f"文件不存在: {path}")
+        if backend.excel_open_seconds:
+            time.sleep(backend.excel_open_seconds)
+        if backend.excel_failure_rate and backend.random() < backend.excel_failure_rate:
+            # 与 Excel 忙时相同：RPC_E_CALL_REJECTED，稍后重试即可
+            raise SimulatedComError(-2147418111, "Call was rejected by callee.")
+        if path.lower().endswith(".xlsx"):
+            with open(path, "rb") as f:
+                if f.read(4) != b"PK\x03\x04":
+                    # 与 Excel 相同：损坏或有打开密码的工作簿无法打开（DISP_E_EXCEPTION，scode 0x800A03EC）
+                    raise SimulatedComError(-2147352567, "Exception occurred.", (
+                        0, "Microsoft Excel", f"文件格式或文件扩展名无效: {os.path.basename(path)}",
+                        None, 0, -2146827284))
+        wb = FakeWorkbook(self.app, path, backend.excel_sheet_count)
+        self._items.append(wb)
+        return wb
+
+
+class FakeExcelApplication:
+    """模拟 Excel.Application，打印时把任务提交到模拟打印队列"""
+
+    def __init__(self, backend: "SimulatedBackend"):
+        self.backend = backend
+        self.Visible = False
+        self.DisplayAlerts = False
+        self.ActivePrinter = ""
+        self.PrintCommunication = True
+        self.Workbooks = _FakeWorkbooks(self)
+        self.quit_called = False
+
+    def Quit(self):
+        self.quit_called = True
+
+
+class SimulatedExcelFactory(ExcelApplicationFactory):
+    def __init__(self, backend: "SimulatedBackend"):
+        self.backend = backend
+        self.created = 0
+
+    def create(self):
+        if self.backend.excel_start_seconds:
+            time.sleep(self.backend.excel_start_seconds)
+        self.created += 1
+        return FakeExcelApplication(self.backend)
+
+
+class SimulatedBackend(PrinterBackend):
+    """使用 SimulatedSpooler 的后端，不依赖 Windows，可在 Linux 上完整运行 PrinterCore"""
+
+    name = "simulated"
+
+    def __init__(self, printers: Optional[List[str]] = None, spooler: Optional[SimulatedSpooler] = None,
+                 excel_start_seconds: float = 0.0, excel_open_seconds: float = 0.0,
+                 excel_sheet_count: int = 1, excel_failure_rate: float = 0.0,
+                 pdf_pages: int = 1, set_default_seconds: float = 0.0,
+                 page_setup_write_seconds: float = 0.0, excel_render_seconds: float = 0.0, seed: Optional[int] = None,
+                 **spooler_options):
+        self.spooler = spooler or SimulatedSpooler(seed=seed, **spooler_options)
+        self.printers = list(printers or ["模拟针式打印机", "模拟激光打印机"])
+        self.default_printer = self.printers[0]
+        self.excel_start_seconds = float(excel_start_seconds)
+        self.excel_open_seconds = float(excel_open_seconds)
+        self.excel_sheet_count = int(excel_sheet_count)
+        self.excel_failure_rate = float(excel_failure_rate)
+        self.pdf_pages = int(pdf_pages)
+        # 修改系统默认打印机的耗时（写注册表并广播 WM_SETTINGCHANGE）
+        self.set_default_seconds = float(set_default_seconds)
+        # PrintCommunication 开启时每次页面设置赋值的驱动通信耗时
+        self.page_setup_write_seconds = float(page_setup_write_seconds)
+        # Excel 渲染一个工作簿（PrintOut / ExportAsFixedFormat）的耗时
+        self.excel_render_seconds = float(excel_render_seconds)
+        self.default_printer_changes = 0
+        self.messages: List[str] = []
+        self._random = random.Random(seed)
+        self._excel_factory = SimulatedExcelFactory(self)
+        for name in self.printers:
+            self.spooler.get_printer(name)
+
+    def render_delay(self):
+        if self.excel_render_seconds:
+            time.sleep(self.excel_render_seconds)
+
+    def random(self) -> float:
+        return self._random.random()
+
+    def get_default_printer(self) -> str:
+        return self.default_printer
+
+    def set_default_printer(self, printer_name: str):
+        if self.set_default_seconds:
+            time.sleep(self.set_default_seconds)
+        self.default_printer_changes += 1
+        self.default_printer = printer_name
+
+    def list_printers(self) -> List[str]:
+        return list(self.spooler.printers.keys())
+
+    # 模拟打印机支持的纸张（A4、Letter、针式打印机连续纸）
+    SIMULATED_FORMS = (
+        ("A4", 210000, 297000),
+        ("Letter", 215900, 279400),
+        ("连续纸 241 x 279 mm", 241000, 279400),
+        ("连续纸 381 x 279 mm", 381000, 279400),
+    )
+
+    def printer_details(self, printer_name: str) -> Dict[str, Any]:
+        printer = self.spooler.get_printer(printer_name)
+        return {
+            "driver": "Simulated Printer Driver",
+            "port": "SIM:",
+            "status": printer.status,
+            "forms": [{"Name": name, "Size": {"cx": cx, "cy": cy}} for name, cx, cy in self.SIMULATED_FORMS],
+        }
+
+    def print_pdf(self, path: str, printer_name: str, bw: bool = False,
+                  first_page_only: bool = False) -> PrintJobHandle:
+        if not os.path.exists(path):
+            raise SpoolerError(f"文件不存在: {path}")
+        pages = 1 if first_page_only else self.pdf_pages
+        if not pages:
+            # pdf_pages 为 0 时按文件的实际页数
+            try:
+                pages = pdf_page_count(path)[0]
+            except (PreflightError, PageEstimateError, OSError):
+                pages = 1
+        return SimulatedSpoolHandle(self.spooler.submit(printer_name, path, pages))
+
+    def get_queue_state(self, printer_name: str) -> Optional[QueueState]:
+        printer = self.spooler.get_printer(printer_name)
+        return QueueState(printer.job_count(), printer.status)
+
+    def excel_factory(self) -> ExcelApplicationFactory:
+        return self._excel_factory
+
+    def show_message(self, text: str, caption: str, timeout_ms: int) -> int:
+        self.messages.append(text)
+        return 0
+
+
+def create_backend(config: dict) -> PrinterBackend:
+    """根据配置中的 printer_backend（win32 / simulated）创建打印后端"""
+    backend_name = config.get("printer_backend", "win32")
+    if backend_name == "simulated":
+        return SimulatedBackend(**config.get("simulated_backend", {}))
+    if backend_name == "win32":
+        return Win32Backend(
+            pdf_print_method=config.get("pdf_print_method", "auto"),
+            sumatra_path=config.get("sumatra_path", ""),
+            submit_grace=float(config.get("pdf_submit_grace", 15)),
+        )
+    raise ValueError(f"未知的打印后端: {backend_name}")
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+CACHE_VERSION = 1
+
+
+class PrinterCapabilities:
+    """一台打印机的驱动、端口、状态和支持的纸张（forms 格式同 EnumForms）"""
+
+    def __init__(self, name: str, driver: str = "", port: str = "", status: int = 0,
+                 forms: Optional[List[Dict[str, Any]]] = None, fetched_at: float = 0.0,
+                 error: Optional[str] = None):
+        self.name = name
+        self.driver = driver
+        self.port = port
+        self.status = status
+        self.forms = forms or []
+        # 查询时间（time.time()），0 表示还没有查询过
+        self.fetched_at = fetched_at
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "driver": self.driver, "port": self.port, "status": self.status,
+                "forms": self.forms, "fetched_at": self.fetched_at, "error": self.error}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PrinterCapabilities":
+        return cls(data["name"], data.get("driver", ""), data.get("port", ""), int(data.get("status", 0)),
+                   data.get("forms") or [], float(data.get("fetched_at", 0.0)), data.get("error"))
+
+
+class PrinterCatalog:
+    """
+    打印机列表和各打印机能力的缓存，超过 ttl 秒后重新查询，并保存到 JSON 文件。
+
+    界面启动时先用文件中的缓存显示，再由后台线程调用 refresh() 更新；EnumPrinters、OpenPrinter、
+    EnumForms 遇到网络打印机可能需要数秒，各打印机并行查询，单台失败不影响其他打印机。
+    """
+
+    def __init__(self, backend, cache_path: str, ttl: float = 3600, workers: int = 4,
+                 logger: Optional[logging.Logger] = None):
+        self.backend = backend
+        self.cache_path = cache_path
+        self.ttl = float(ttl)
+        self.workers = max(1, int(workers))
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self._lock = threading.Lock()
+        # 同一时间只做一次刷新，界面多次点击时后来的调用等待前一次完成
+        self._refresh_lock = threading.Lock()
+        self._printers: Dict[str, PrinterCapabilities] = {}
+        self._order: List[str] = []
+        self.default_printer: Optional[str] = None
+        self.listed_at = 0.0
+
+    def load(self) -> bool:
+        """读取缓存文件，文件不存在或格式不对时返回 False"""
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION:
+                return False
+            printers = [PrinterCapabilities.from_dict(item) for item in data.get("printers", [])]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self._printers = {caps.name: caps for caps in printers}
+            self._order = [caps.name for caps in printers]
+            self.default_printer = data.get("default")
+            self.listed_at = float(data.get("listed_at", 0.0))
+        return True
+
+    def save(self):
+        with self._lock:
+            data = {
+                "version": CACHE_VERSION,
+                "default": self.default_printer,
+                "listed_at": self.listed_at,
+                "printers": [self._printers[name].to_dict() for name in self._order],
+            }
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.cache_path)
+
+    @property
+    def printers(self) -> List[str]:
+        with self._lock:
+            return list(self._order)
+
+    def get(self, name: str) -> Optional[PrinterCapabilities]:
+        with self._lock:
+            return self._printers.get(name)
+
+    def forms(self, name: str) -> Optional[List[Dict[str, Any]]]:
+        """打印机支持的纸张（最近一次查询成功的结果），还没有查询过时返回 None"""
+        caps = self.get(name)
+        if caps is None or not caps.fetched_at:
+            return None
+        return caps.forms
+
+    def _fresh(self, fetched_at: float, now: float) -> bool:
+        return fetched_at > 0 and now - fetched_at < self.ttl
+
+    def is_fresh(self, name: Optional[str] = None) -> bool:
+        """打印机列表（name 为 None）或某台打印机的信息是否在有效期内"""
+        now = time.time()
+        if name is None:
+            return self._fresh(self.listed_at, now)
+        caps = self.get(name)
+        return caps is not None and not caps.error and self._fresh(caps.fetched_at, now)
+
+    def refresh(self, force: bool = False, names: Optional[Iterable[str]] = None) -> bool:
+        """
+        更新缓存：列表过期（或 force）时重新列举打印机，再查询过期的打印机信息。
+
+        names 指定时只查询这些打印机，不重新列举。有变化并已保存时返回 True。
+        """
+        with self._refresh_lock:
+            changed = False
+            if names is None:
+                if force or not self.is_fresh():
+                    self._list_printers()
+                    changed = True
+                names = self.printers
+            stale = [name for name in names if force or not self.is_fresh(name)]
+            if stale:
+                self._query(stale)
+                changed = True
+            if changed:
+                try:
+                    self.save()
+                except OSError as e:
+                    self.logger.warning(f"⚠️ 保存打印机缓存失败: {e}")
+            return changed
+
+    def _list_printers(self):
+        names = self.backend.list_printers()
+        try:
+            default = self.backend.get_default_printer()
+        except Exception:
+            default = None
+        with self._lock:
+            self._printers = {name: self._printers.get(name) or PrinterCapabilities(name) for name in names}
+            self._order = list(names)
+            self.default_printer = default
+            self.listed_at = time.time()
+
+    def _query(self, names: List[str]):
+        def query(name: str) -> PrinterCapabilities:
+            try:
+                details = self.backend.printer_details(name)
+                return PrinterCapabilities(name, details.get("driver", ""), details.get("port", ""),
+                                           int(details.get("status", 0)), details.get("forms") or [],
+                                           time.time())
+            except Exception as e:
+                self.logger.warning(f"⚠️ 获取打印机信息失败: {name} - {e}")
+                # 保留上次的信息，下次刷新时重试
+                previous = self.get(name) or PrinterCapabilities(name)
+                previous.error = str(e)
+                return previous
+
+        if len(names) == 1:
+            results = [query(names[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(names)),
+                                    thread_name_prefix="printer-query") as pool:
+                results = list(pool.map(query, names))
+        with self._lock:
+            for caps in results:
+                self._printers[caps.name] = caps
+                if caps.name not in self._order:
+                    self._order.append(caps.name)
@@ -0,0 +1,125 @@
+# Windows 打印机 / 打印任务状态位（winspool.h）
+
+# GetPrinter(level 2) 的 Status 字段
+PRINTER_STATUS_PAUSED = 0x00000001
+PRINTER_STATUS_ERROR = 0x00000002
+PRINTER_STATUS_PENDING_DELETION = 0x00000004
+PRINTER_STATUS_PAPER_JAM = 0x00000008
+PRINTER_STATUS_PAPER_OUT = 0x00000010
+PRINTER_STATUS_MANUAL_FEED = 0x00000020
+PRINTER_STATUS_PAPER_PROBLEM = 0x00000040
+PRINTER_STATUS_OFFLINE = 0x00000080
+PRINTER_STATUS_IO_ACTIVE = 0x00000100
+PRINTER_STATUS_BUSY = 0x00000200
+PRINTER_STATUS_PRINTING = 0x00000400
+PRINTER_STATUS_OUTPUT_BIN_FULL = 0x00000800
+PRINTER_STATUS_NOT_AVAILABLE = 0x00001000
+PRINTER_STATUS_WAITING = 0x00002000
+PRINTER_STATUS_PROCESSING = 0x00004000
+PRINTER_STATUS_INITIALIZING = 0x00008000
+PRINTER_STATUS_WARMING_UP = 0x00010000
+PRINTER_STATUS_TONER_LOW = 0x00020000
+PRINTER_STATUS_NO_TONER = 0x00040000
+PRINTER_STATUS_PAGE_PUNT = 0x00080000
+PRINTER_STATUS_USER_INTERVENTION = 0x00100000
+PRINTER_STATUS_OUT_OF_MEMORY = 0x00200000
+PRINTER_STATUS_DOOR_OPEN = 0x00400000
+PRINTER_STATUS_SERVER_UNKNOWN = 0x00800000
+PRINTER_STATUS_POWER_SAVE = 0x01000000
+
+# EnumJobs(level 1) 的 Status 字段
+JOB_STATUS_PAUSED = 0x00000001
+JOB_STATUS_ERROR = 0x00000002
+JOB_STATUS_DELETING = 0x00000004
+JOB_STATUS_SPOOLING = 0x00000008
+JOB_STATUS_PRINTING = 0x00000010
+JOB_STATUS_OFFLINE = 0x00000020
+JOB_STATUS_PAPEROUT = 0x00000040
+JOB_STATUS_PRINTED = 0x00000080
+JOB_STATUS_DELETED = 0x00000100
+JOB_STATUS_BLOCKED_DEVQ = 0x00000200
+JOB_STATUS_USER_INTERVENTION = 0x00000400
+JOB_STATUS_RESTART = 0x00000800
+JOB_STATUS_COMPLETE = 0x00001000
+
+# 出现这些状态时打印机无法继续出纸，需要暂停提交并退避
+PRINTER_BLOCKING_STATUS = (
+    PRINTER_STATUS_PAUSED
+    | PRINTER_STATUS_ERROR
+    | PRINTER_STATUS_PAPER_JAM
+    | PRINTER_STATUS_PAPER_OUT
+    | PRINTER_STATUS_PAPER_PROBLEM
+    | PRINTER_STATUS_OFFLINE
+    | PRINTER_STATUS_NOT_AVAILABLE
+    | PRINTER_STATUS_OUTPUT_BIN_FULL
+    | PRINTER_STATUS_NO_TONER
+    | PRINTER_STATUS_USER_INTERVENTION
+    | PRINTER_STATUS_DOOR_OPEN
+)
+
+# 状态位的中文说明（按位显示，一台打印机可以同时处于多个状态）
+PRINTER_STATUS_NAMES = (
+    (PRINTER_STATUS_PAUSED, "暂停"),
+    (PRINTER_STATUS_ERROR, "错误"),
+    (PRINTER_STATUS_PENDING_DELETION, "正在删除"),
+    (PRINTER_STATUS_PAPER_JAM, "卡纸"),
+    (PRINTER_STATUS_PAPER_OUT, "缺纸"),
+    (PRINTER_STATUS_MANUAL_FEED, "手动送纸"),
+    (PRINTER_STATUS_PAPER_PROBLEM, "纸张问题"),
+    (PRINTER_STATUS_OFFLINE, "脱机"),
+    (PRINTER_STATUS_IO_ACTIVE, "数据传输中"),
+    (PRINTER_STATUS_BUSY, "忙"),
+    (PRINTER_STATUS_PRINTING, "正在打印"),
+    (PRINTER_STATUS_OUTPUT_BIN_FULL, "出纸槽已满"),
+    (PRINTER_STATUS_NOT_AVAILABLE, "不可用"),
+    (PRINTER_STATUS_WAITING, "等待中"),
+    (PRINTER_STATUS_PROCESSING, "正在处理"),
+    (PRINTER_STATUS_INITIALIZING, "正在初始化"),
+    (PRINTER_STATUS_WARMING_UP, "正在预热"),
+    (PRINTER_STATUS_TONER_LOW, "墨粉不足"),
+    (PRINTER_STATUS_NO_TONER, "墨粉用完"),
+    (PRINTER_STATUS_PAGE_PUNT, "无法打印当前页"),
+    (PRINTER_STATUS_USER_INTERVENTION, "需要人工处理"),
+    (PRINTER_STATUS_OUT_OF_MEMORY, "内存不足"),
+    (PRINTER_STATUS_DOOR_OPEN, "机盖打开"),
+    (PRINTER_STATUS_SERVER_UNKNOWN, "服务器状态未知"),
+    (PRINTER_STATUS_POWER_SAVE, "节能模式"),
+)
+
+
+def describe_printer_status(status: int) -> str:
+    """把 GetPrinter 的 Status 状态位转换为文字，如 "缺纸, 脱机"；0 表示准备就绪"""
+    if not status:
+        return "准备就绪"
+    names = [name for bit, name in PRINTER_STATUS_NAMES if status & bit]
+    unknown = status & ~sum(bit for bit, _ in PRINTER_STATUS_NAMES)
+    if unknown:
+        names.append(f"未知状态 (0x{unknown:x})")
+    return ", ".join(names)
+
+
+JOB_BLOCKING_STATUS = (
+    JOB_STATUS_ERROR
+    | JOB_STATUS_OFFLINE
+    | JOB_STATUS_PAPEROUT
+    | JOB_STATUS_BLOCKED_DEVQ
+    | JOB_STATUS_USER_INTERVENTION
+)
+
+
+class QueueState:
+    """某台打印机当前的队列状态"""
+
+    def __init__(self, job_count: int, printer_status: int = 0, job_status: int = 0):
+        self.job_count = job_count
+        self.printer_status = printer_status
+        # 队列中所有任务状态位的并集
+        self.job_status = job_status
+
+    @property
+    def is_blocked(self) -> bool:
+        return bool(self.printer_status & PRINTER_BLOCKING_STATUS or self.job_status & JOB_BLOCKING_STATUS)
+
+    def __repr__(self):
+        return (f"QueueState(jobs={self.job_count}, printer_status=0x{self.printer_status:x}, "
+                f"job_status=0x{self.job_status:x})")
@@ -0,0 +1,177 @@
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """文件内容的 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class RenderCache:
+    """
+    按内容寻址的渲染结果缓存：键 = 文件内容哈希 + 打印设置（打印机、纸张、缩放、黑白、只打印首页等）。
+
+    同一份工作簿（不同诊所收到的相同月结单、重新打印的文件）只需用 Excel 渲染一次。
+    缓存文件保存在 cache_dir 中，总大小超过 max_bytes 时按最近使用时间淘汰；
+    最近使用时间记录在文件的修改时间上，程序重启后仍然有效。
+    """
+
+    SUFFIX = ".pdf"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, int(max_bytes))
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self._lock = threading.Lock()
+        # 键 -> 文件大小，按最近使用排序（最旧的在前）
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._pins: Counter = Counter()
+        # (路径, 大小, 修改时间) -> 内容哈希，避免同一文件重复计算
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self.total_bytes = 0
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith(self.SUFFIX):
+                # 上次异常退出留下的临时文件
+                if name.endswith(".tmp"):
+                    self._remove(path)
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-len(self.SUFFIX)], st.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def digest(self, path: str) -> str:
+        st = os.stat(path)
+        memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(memo_key)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                if len(self._digests) > 4096:
+                    self._digests.clear()
+                self._digests[memo_key] = digest
+        return digest
+
+    def key_for(self, path: str, profile: tuple) -> str:
+        """文件内容哈希 + 打印设置组成缓存键"""
+        h = hashlib.sha256(self.digest(path).encode("ascii"))
+        h.update(repr(profile).encode("utf-8"))
+        return h.hexdigest()
+
+    @contextmanager
+    def checkout(self, key: str) -> Iterator[Optional[str]]:
+        """取出缓存的 PDF 路径（不存在时为 None）；使用期间不会被淘汰"""
+        path = None
+        with self._lock:
+            if key in self._entries and os.path.exists(self._path(key)):
+                self._entries.move_to_end(key)
+                self._pins[key] += 1
+                self.hits += 1
+                path = self._path(key)
+            else:
+                self._entries.pop(key, None)
+                self.misses += 1
+        if path is None:
+            yield None
+            return
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        try:
+            yield path
+        finally:
+            with self._lock:
+                self._pins[key] -= 1
+                if self._pins[key] <= 0:
+                    del self._pins[key]
+
+    def copy_to(self, key: str, dest: str) -> bool:
+        """命中时把缓存的 PDF 复制到 dest"""
+        with self.checkout(key) as cached:
+            if cached is None:
+                return False
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            shutil.copyfile(cached, dest)
+            return True
+
+    def put(self, key: str, pdf_path: str):
+        """保存渲染结果（复制），超过容量时淘汰最久未使用的文件"""
+        size = os.path.getsize(pdf_path)
+        if size > self.max_bytes:
+            return
+        target = self._path(key)
+        tmp = f"{target}.{threading.get_ident()}.tmp"
+        shutil.copyfile(pdf_path, tmp)
+        os.replace(tmp, target)
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.total_bytes += size
+            evicted = self._evict()
+        for path in evicted:
+            self._remove(path)
+
+    def _evict(self):
+        evicted = []
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if self._pins.get(key):
+                continue
+            self.total_bytes -= self._entries.pop(key)
+            self.evictions += 1
+            evicted.append(self._path(key))
+        return evicted
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
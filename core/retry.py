@@ -0,0 +1,298 @@
+import os
+import time
+import heapq
+import shutil
+import logging
+import itertools
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.jobs import PrintJob
+from core.preflight import PreflightError
+
+# 失败的阶段
+STAGE_START = "start"    # 启动 Excel（DispatchEx）
+STAGE_OPEN = "open"      # 打开文件（Excel 打开工作簿）
+STAGE_SUBMIT = "submit"  # 提交打印任务（阅读器 / PrintOut / 导出 PDF）
+STAGE_SPOOL = "spool"    # 等待打印队列确认
+
+# 错误类别，每个类别有各自的重试策略
+ERROR_COM_BUSY = "com_busy"    # Excel / COM 忙（调用被拒绝），稍后重试通常就能成功
+ERROR_SPOOLER = "spooler"      # 打印队列错误（提交失败、任务出错）
+ERROR_PERMANENT = "permanent"  # 文件本身有问题（损坏、有打开密码、不存在），重试无用
+ERROR_UNKNOWN = "unknown"
+
+ERROR_NAMES = {
+    ERROR_COM_BUSY: "Excel 忙",
+    ERROR_SPOOLER: "打印队列错误",
+    ERROR_PERMANENT: "文件无法打开",
+    ERROR_UNKNOWN: "未知错误",
+}
+
+# COM 调用被拒绝 / 服务器忙的 HRESULT
+RPC_E_CALL_REJECTED = 0x80010001
+RPC_E_SERVERCALL_RETRYLATER = 0x8001010A
+RPC_E_CALL_CANCELED = 0x80010002
+VBA_E_IGNORE = 0x800AC472  # Excel 正忙（如单元格处于编辑状态）
+COM_BUSY_HRESULTS = frozenset((RPC_E_CALL_REJECTED, RPC_E_SERVERCALL_RETRYLATER, RPC_E_CALL_CANCELED, VBA_E_IGNORE))
+
+# 文件本身损坏的 HRESULT（复合文档结构损坏、文件头不对）
+STG_E_DOCFILECORRUPT = 0x80030109
+STG_E_INVALIDHEADER = 0x800300FB
+CORRUPT_FILE_HRESULTS = frozenset((STG_E_DOCFILECORRUPT, STG_E_INVALIDHEADER))
+# Excel 打不开工作簿时的通用错误码，文件被占用、网络路径暂时不可用时也是它，按错误说明区分
+XL_E_OPEN_FAILED = 0x800A03EC
+PERMANENT_OPEN_ERROR_TEXTS = ("password", "密码", "corrupt", "损坏", "file format", "文件格式", "扩展名无效")
+
+# 默认的重试策略：retries 最多重试次数，delay 首次重试前等待的秒数（之后每次翻倍，不超过 max_delay），
+# quarantine 重试用尽或不重试时是否移到隔离目录
+DEFAULT_RETRY_POLICIES = {
+    ERROR_COM_BUSY: {"retries": 5, "delay": 2, "max_delay": 60, "quarantine": False},
+    ERROR_SPOOLER: {"retries": 3, "delay": 5, "max_delay": 120, "quarantine": False},
+    ERROR_PERMANENT: {"retries": 0, "delay": 0, "max_delay": 0, "quarantine": True},
+    ERROR_UNKNOWN: {"retries": 1, "delay": 5, "max_delay": 60, "quarantine": False},
+}
+
+# 运行结束报告中的结果
+OUTCOME_RETRYING = "retrying"
+OUTCOME_RECOVERED = "recovered"
+OUTCOME_FAILED = "failed"
+OUTCOME_QUARANTINED = "quarantined"
+
+OUTCOME_NAMES = {
+    OUTCOME_RETRYING: "等待重试时停止",
+    OUTCOME_RECOVERED: "重试后成功",
+    OUTCOME_FAILED: "打印失败",
+    OUTCOME_QUARANTINED: "已隔离",
+}
+
+
+def com_hresult(error: BaseException) -> Optional[int]:
+    """取 COM 错误的 HRESULT（优先取 excepinfo 中 Excel 返回的 scode），转换为无符号数"""
+    args = getattr(error, "args", ())
+    excepinfo = args[2] if len(args) > 2 else None
+    if isinstance(excepinfo, tuple) and len(excepinfo) > 5 and isinstance(excepinfo[5], int) and excepinfo[5]:
+        scode = excepinfo[5] & 0xFFFFFFFF
+        if scode in COM_BUSY_HRESULTS:
+            return scode
+    hresult = getattr(error, "hresult", None)
+    if hresult is None and args and isinstance(args[0], int):
+        hresult = args[0]
+    return None if hresult is None else hresult & 0xFFFFFFFF
+
+
+def com_scode(error: BaseException) -> Optional[int]:
+    """取 COM 错误 excepinfo 中的 scode（Excel 返回的具体错误码），没有时返回 None"""
+    args = getattr(error, "args", ())
+    excepinfo = args[2] if len(args) > 2 else None
+    if isinstance(excepinfo, tuple) and len(excepinfo) > 5 and isinstance(excepinfo[5], int) and excepinfo[5]:
+        return excepinfo[5] & 0xFFFFFFFF
+    return None
+
+
+def com_description(error: BaseException) -> str:
+    """COM 错误的说明（优先取 excepinfo 中 Excel 给出的说明）"""
+    args = getattr(error, "args", ())
+    excepinfo = args[2] if len(args) > 2 else None
+    if isinstance(excepinfo, tuple) and len(excepinfo) > 2 and excepinfo[2]:
+        return str(excepinfo[2])
+    return str(args[1]) if len(args) > 1 and args[1] else str(error)
+
+
+def is_corrupt_file_error(error: BaseException) -> bool:
+    """已知的文件损坏、格式不对或有打开密码的错误；文件被占用、共享冲突、网络中断等不算"""
+    codes = {com_hresult(error), com_scode(error)}
+    if codes & CORRUPT_FILE_HRESULTS:
+        return True
+    if XL_E_OPEN_FAILED in codes:
+        text = com_description(error).lower()
+        return any(marker in text for marker in PERMANENT_OPEN_ERROR_TEXTS)
+    return False
+
+
+def classify_error(error: Optional[BaseException], stage: str = "") -> str:
+    """按异常和失败的阶段判断错误类别"""
+    if error is None:
+        return ERROR_UNKNOWN
+    if com_hresult(error) in COM_BUSY_HRESULTS:
+        return ERROR_COM_BUSY
+    if isinstance(error, (FileNotFoundError, PreflightError)):
+        return ERROR_PERMANENT
+    if stage == STAGE_START:
+        # Excel 启动失败（服务器忙、正在退出、资源不足），与 Excel 忙一样稍后重试
+        return ERROR_COM_BUSY
+    if stage == STAGE_OPEN:
+        # 只有确认是文件损坏、格式不对或有打开密码时才不重试；文件还在写入、被占用、网络路径
+        # 暂时不可用等原因按未知错误稍后重试
+        return ERROR_PERMANENT if is_corrupt_file_error(error) else ERROR_UNKNOWN
+    if stage in (STAGE_SUBMIT, STAGE_SPOOL):
+        return ERROR_SPOOLER
+    return ERROR_UNKNOWN
+
+
+class RetryPolicy:
+    """一个错误类别的重试策略：指数退避，重试用尽后失败或隔离"""
+
+    def __init__(self, retries: int = 0, delay: float = 2.0, max_delay: float = 60.0, quarantine: bool = False):
+        self.retries = max(0, int(retries))
+        self.delay = max(0.0, float(delay))
+        self.max_delay = max(self.delay, float(max_delay))
+        self.quarantine = bool(quarantine)
+
+    def delay_for(self, attempt: int) -> float:
+        """第 attempt 次失败后等待的秒数"""
+        return min(self.max_delay, self.delay * 2 ** max(0, attempt - 1))
+
+    def __repr__(self):
+        return (f"RetryPolicy(retries={self.retries}, delay={self.delay}, max_delay={self.max_delay}, "
+                f"quarantine={self.quarantine})")
+
+
+def load_retry_policies(overrides: Optional[Dict[str, Dict]] = None) -> Dict[str, RetryPolicy]:
+    """默认策略加上配置中 retry_policies 的覆盖，如 {"com_busy": {"retries": 8}}"""
+    policies = {}
+    for error_class, defaults in DEFAULT_RETRY_POLICIES.items():
+        options = dict(defaults)
+        options.update((overrides or {}).get(error_class) or {})
+        policies[error_class] = RetryPolicy(**options)
+    return policies
+
+
+class RetryQueue:
+    """
+    失败后等待重试的文件，按打印机分组、按到期时间排序。
+
+    各打印机的队列在处理新文件之前先取出自己到期的重试，等待重试期间其他文件照常打印。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._heap: List[Tuple[float, int, PrintJob]] = []
+        self._seq = itertools.count()
+        self._waiting = set()
+        self._lock = threading.Lock()
+
+    def push(self, job: PrintJob, delay: float):
+        with self._lock:
+            heapq.heappush(self._heap, (self._clock() + delay, next(self._seq), job))
+            self._waiting.add(id(job))
+
+    def pop_due(self, printer: Optional[str] = None) -> Optional[PrintJob]:
+        """取出一个已到期的文件（printer 为空时不限打印机）"""
+        now = self._clock()
+        with self._lock:
+            for entry in sorted(self._heap):
+                due, _, job = entry
+                if due > now:
+                    return None
+                if printer is None or job.printer == printer:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    self._waiting.discard(id(job))
+                    return job
+        return None
+
+    def wait_time(self, printer: Optional[str] = None) -> Optional[float]:
+        """距离下一个重试到期的秒数，没有等待重试的文件时返回 None"""
+        with self._lock:
+            dues = [due for due, _, job in self._heap if printer is None or job.printer == printer]
+        if not dues:
+            return None
+        return max(0.0, min(dues) - self._clock())
+
+    def pending(self, printer: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(1 for _, _, job in self._heap if printer is None or job.printer == printer)
+
+    def contains(self, job: PrintJob) -> bool:
+        with self._lock:
+            return id(job) in self._waiting
+
+    def settled(self, job: PrintJob) -> int:
+        """job 处理后已有结果（成功、失败或隔离）的文件数；整体或部分等待重试的文件不计"""
+        with self._lock:
+            if id(job) in self._waiting:
+                return 0
+            return sum(1 for f in job.files if id(f) not in self._waiting)
+
+    def drain(self) -> List[PrintJob]:
+        """取出所有等待重试的文件（停止打印时用于报告）"""
+        with self._lock:
+            jobs = [job for _, _, job in sorted(self._heap)]
+            self._heap.clear()
+            self._waiting.clear()
+        return jobs
+
+
+class Quarantine:
+    """把无法打印的文件按原来的相对路径移到隔离目录，并在“隔离原因.txt”中记录原因"""
+
+    REASON_FILE = "隔离原因.txt"
+
+    def __init__(self, source_root: str, root: str, logger: Optional[logging.Logger] = None):
+        self.source_root = source_root
+        self.root = root
+        self.logger = logger or logging.getLogger("PrinterCore")
+        self._lock = threading.Lock()
+
+    def move(self, path: str, reason: str) -> Optional[str]:
+        """移动文件，返回隔离后的路径；移动失败时返回 None，文件留在源目录"""
+        rel_path = os.path.relpath(path, self.source_root)
+        dest = os.path.join(self.root, rel_path)
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                if os.path.exists(dest):
+                    stem, ext = os.path.splitext(dest)
+                    dest = f"{stem}_{datetime.now():%H%M%S}{ext}"
+                shutil.move(path, dest)
+                with open(os.path.join(self.root, self.REASON_FILE), "a", encoding="utf-8") as f:
+                    f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S}\t{rel_path}\t{reason}\n")
+            except OSError as e:
+                self.logger.error(f"❌ 移动到隔离目录失败: {path} - {e}")
+                return None
+        return dest
+
+
+class RetryReport:
+    """记录本轮失败过的文件及其最终结果，运行结束时输出报告"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, job: PrintJob, outcome: str, error_class: str = "", error: str = "", dest: str = ""):
+        with self._lock:
+            for f in job.files:
+                entry = self._entries.setdefault(f.path, {"path": f.path, "printer": f.printer})
+                entry["outcome"] = outcome
+                entry["attempts"] = job.attempts
+                if error_class:
+                    entry["error_class"] = error_class
+                    entry["error"] = error
+                if dest:
+                    entry["quarantined_to"] = dest
+
+    def resolved(self, job: PrintJob):
+        """之前失败过的文件重试成功"""
+        with self._lock:
+            for f in job.files:
+                entry = self._entries.get(f.path)
+                if entry is not None:
+                    entry["outcome"] = OUTCOME_RECOVERED
+                    entry["attempts"] = job.attempts
+
+    def entries(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def counts(self) -> Dict[str, int]:
+        counts = {outcome: 0 for outcome in OUTCOME_NAMES}
+        for entry in self.entries():
+            counts[entry["outcome"]] += 1
+        return counts
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,165 @@
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from core.jobs import PrintJob
+from core.planner import natural_key
+
+# 诊所目录之间的排序策略
+POLICY_SCAN = "scan"                      # 扫描顺序（子目录在前，同级按自然顺序）
+POLICY_CLINIC_ID = "clinic_id"            # 按诊所编号从小到大
+POLICY_SMALLEST_FIRST = "smallest_first"  # 文件少、体积小的诊所先打印，缩短各诊所的平均等待
+POLICY_MONTHLY_FIRST = "monthly_first"    # 各诊所内月结单排在前面（可与其他策略组合）
+
+POLICY_NAMES = {
+    POLICY_SCAN: "扫描顺序",
+    POLICY_CLINIC_ID: "诊所编号",
+    POLICY_SMALLEST_FIRST: "小诊所优先",
+    POLICY_MONTHLY_FIRST: "月结单优先",
+}
+
+# 估算诊所打印耗时：每个文件的固定开销（提交、节奏控制）折算为字节数，Excel 还要打开工作簿
+FILE_OVERHEAD_BYTES = {"pdf": 256 * 1024, "excel": 1024 * 1024}
+
+
+class ClinicGroup:
+    """同一目录下的待打印文件，调度时作为整体排序，诊所完成提示仍在目录边界触发"""
+
+    def __init__(self, root: str, index: int):
+        self.root = root
+        self.name = os.path.basename(root)
+        # 在扫描顺序中的位置，排序键相同时保持原有顺序
+        self.index = index
+        self.jobs: List[PrintJob] = []
+
+    @property
+    def cost(self) -> int:
+        return sum(job.size + FILE_OVERHEAD_BYTES.get(job.kind, 0) for job in self.jobs)
+
+
+class SchedulingPolicy:
+    """排序策略：group_key 决定诊所之间的顺序，job_key 决定诊所内文件的顺序，返回 None 表示不参与排序"""
+
+    name = POLICY_SCAN
+
+    def group_key(self, group: ClinicGroup):
+        return None
+
+    def job_key(self, job: PrintJob):
+        return None
+
+
+class ClinicIdPolicy(SchedulingPolicy):
+    name = POLICY_CLINIC_ID
+
+    def group_key(self, group: ClinicGroup):
+        # 数字目录按编号排序，其他目录排在后面
+        return (0 if group.name.isdigit() else 1, natural_key(group.name))
+
+
+class SmallestFirstPolicy(SchedulingPolicy):
+    name = POLICY_SMALLEST_FIRST
+
+    def group_key(self, group: ClinicGroup):
+        return group.cost
+
+
+class MonthlyFirstPolicy(SchedulingPolicy):
+    name = POLICY_MONTHLY_FIRST
+
+    def job_key(self, job: PrintJob):
+        return 0 if job.is_monthly else 1
+
+
+POLICIES: Dict[str, Callable[[], SchedulingPolicy]] = {
+    POLICY_SCAN: SchedulingPolicy,
+    POLICY_CLINIC_ID: ClinicIdPolicy,
+    POLICY_SMALLEST_FIRST: SmallestFirstPolicy,
+    POLICY_MONTHLY_FIRST: MonthlyFirstPolicy,
+}
+
+
+def parse_policies(spec: Union[str, Sequence[str], None]) -> List[SchedulingPolicy]:
+    """把 "clinic_id,monthly_first" 或列表解析为策略，排在前面的优先；未知名称抛出 ValueError"""
+    if not spec:
+        return []
+    names = spec.split(",") if isinstance(spec, str) else list(spec)
+    policies = []
+    for name in names:
+        name = name.strip()
+        if not name:
+            continue
+        factory = POLICIES.get(name)
+        if factory is None:
+            raise ValueError(f"未知的打印顺序策略: {name}（可选: {', '.join(POLICIES)}）")
+        policies.append(factory())
+    return policies
+
+
+class PrintScheduler:
+    """
+    按策略对打印计划排序。
+
+    文件先按目录分组，同一诊所的文件始终连续，因此顺序调整后每台打印机上的诊所边界不变，
+    诊所完成提示和空目录清理照常触发。clinic_priority 中配置的诊所排在最前面，
+    不受策略影响：字典形式为 {诊所: 优先级}，数值大的先打印；列表形式按列表顺序打印。
+    """
+
+    def __init__(self, policies: Union[str, Sequence[str], None] = POLICY_SCAN,
+                 clinic_priority: Union[Dict[str, int], Sequence[str], None] = None):
+        self.policies = parse_policies(policies)
+        self.priority = self._parse_priority(clinic_priority)
+
+    @staticmethod
+    def _parse_priority(priority) -> Dict[str, int]:
+        if not priority:
+            return {}
+        if isinstance(priority, dict):
+            return {str(name): int(value) for name, value in priority.items()}
+        # 列表：第一个优先级最高
+        return {str(name): len(priority) - i for i, name in enumerate(priority)}
+
+    @property
+    def description(self) -> str:
+        names = [POLICY_NAMES.get(p.name, p.name) for p in self.policies if p.name != POLICY_SCAN]
+        text = " + ".join(names) or POLICY_NAMES[POLICY_SCAN]
+        if self.priority:
+            text += f"（{len(self.priority)} 个诊所指定优先级）"
+        return text
+
+    def _priority_of(self, group: ClinicGroup, source_root: Optional[str]) -> int:
+        if not self.priority:
+            return 0
+        value = self.priority.get(group.name)
+        if value is None and source_root:
+            # 也可以按相对源目录的路径配置，如 "华东/101"
+            rel = os.path.relpath(group.root, source_root).replace(os.sep, "/")
+            value = self.priority.get(rel)
+        return value or 0
+
+    def _group_sort_key(self, group: ClinicGroup, source_root: Optional[str]) -> Tuple:
+        keys = [-self._priority_of(group, source_root)]
+        for policy in self.policies:
+            key = policy.group_key(group)
+            if key is not None:
+                keys.append(key)
+        keys.append(group.index)
+        return tuple(keys)
+
+    def order(self, jobs: List[PrintJob], source_root: Optional[str] = None) -> List[PrintJob]:
+        """返回排序后的新列表；同一诊所的文件保持连续"""
+        groups: "OrderedDict[str, ClinicGroup]" = OrderedDict()
+        for job in jobs:
+            group = groups.get(job.root)
+            if group is None:
+                group = groups[job.root] = ClinicGroup(job.root, len(groups))
+            group.jobs.append(job)
+
+        job_policies = [p for p in self.policies if type(p).job_key is not SchedulingPolicy.job_key]
+        ordered = []
+        for group in sorted(groups.values(), key=lambda g: self._group_sort_key(g, source_root)):
+            if job_policies:
+                # sort 是稳定的，键相同的文件保持扫描顺序
+                group.jobs.sort(key=lambda job: tuple(p.job_key(job) for p in job_policies))
+            ordered.extend(group.jobs)
+        return ordered
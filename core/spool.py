@@ -0,0 +1,137 @@
+import os
+import time
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+from core.printer_status import (JOB_BLOCKING_STATUS, JOB_STATUS_COMPLETE, JOB_STATUS_PRINTED,
+                                 JOB_STATUS_SPOOLING)
+
+# 打印任务的状态，按先后顺序排列
+JOB_SUBMITTED = "submitted"  # 已提交，打印队列中还没有出现
+JOB_SPOOLED = "spooled"      # 打印队列已接收完整的任务
+JOB_COMPLETED = "completed"  # 已打印完成并离开队列
+JOB_FAILED = "failed"
+
+_JOB_STATE_ORDER = {JOB_SUBMITTED: 0, JOB_SPOOLED: 1, JOB_COMPLETED: 2}
+
+
+class PrintJobHandle:
+    """已提交的打印任务，可轮询或阻塞等待打印队列接收 / 打印完成"""
+
+    def __init__(self, printer_name: str, document: str, state: str = JOB_SUBMITTED):
+        self.printer_name = printer_name
+        self.document = document
+        self.state = state
+        self.job_id: Optional[int] = None
+        self.error = ""
+        self.submitted_at = time.monotonic()
+
+    def poll(self) -> str:
+        """刷新并返回当前状态"""
+        return self.state
+
+    def reached(self, state: str) -> bool:
+        if self.state == JOB_FAILED:
+            return False
+        return _JOB_STATE_ORDER[self.state] >= _JOB_STATE_ORDER[state]
+
+    def wait(self, state: str = JOB_SPOOLED, timeout: float = 60.0, poll_interval: float = 0.2,
+             should_continue: Callable[[], bool] = lambda: True) -> bool:
+        """阻塞到任务达到指定状态；失败、超时或被中断时返回 False"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll()
+            if self.state == JOB_FAILED:
+                return False
+            if self.reached(state):
+                return True
+            if time.monotonic() >= deadline or not should_continue():
+                return False
+            time.sleep(poll_interval)
+
+    def __repr__(self):
+        return f"PrintJobHandle({os.path.basename(self.document)!r}, {self.printer_name!r}, {self.state}, id={self.job_id})"
+
+
+def enum_jobs(printer_name: str) -> List[Dict]:
+    """打印队列中的所有任务（EnumJobs level 1）"""
+    import win32print
+    hprinter = win32print.OpenPrinter(printer_name)
+    try:
+        count = win32print.GetPrinter(hprinter, 2)["cJobs"]
+        return list(win32print.EnumJobs(hprinter, 0, count, 1)) if count else []
+    finally:
+        win32print.ClosePrinter(hprinter)
+
+
+def queue_job_ids(printer_name: str) -> Optional[FrozenSet[int]]:
+    """提交前队列中已有任务的 JobId，读取失败时返回 None"""
+    try:
+        return frozenset(job["JobId"] for job in enum_jobs(printer_name))
+    except Exception:
+        return None
+
+
+class Win32SpoolHandle(PrintJobHandle):
+    """
+    通过 EnumJobs 跟踪 Windows 打印队列中的任务。
+
+    已知 job_id 时按 id 查找，否则按文档名匹配，并且只接受提交前队列中没有的任务（existing_ids），
+    避免各诊所目录中同名的送货单被队列中更早的同名任务“确认”。任务在队列中出现过之后消失，
+    或在宽限时间内始终没有出现（打印太快，在两次轮询之间出现又消失）都视为打印完成：
+    提交方已确认接收（spooled）时为 vanish_grace 秒，交给阅读器异步提交（submitted）时为 submit_grace 秒。
+    """
+
+    def __init__(self, printer_name: str, document: str, state: str = JOB_SUBMITTED,
+                 job_id: Optional[int] = None, vanish_grace: float = 3.0, submit_grace: float = 15.0,
+                 existing_ids: Optional[FrozenSet[int]] = None, clock: Callable[[], float] = time.monotonic):
+        super().__init__(printer_name, document, state)
+        self.job_id = job_id
+        self.vanish_grace = vanish_grace
+        self.submit_grace = max(vanish_grace, submit_grace)
+        self.existing_ids = existing_ids or frozenset()
+        self._clock = clock
+        self.submitted_at = clock()
+        self._seen = False
+        self._document_name = os.path.basename(document).lower()
+
+    def _list_jobs(self) -> List[Dict]:
+        return enum_jobs(self.printer_name)
+
+    def _find_job(self):
+        for job in self._list_jobs():
+            if self.job_id is not None:
+                if job["JobId"] == self.job_id:
+                    return job
+            elif (job["JobId"] not in self.existing_ids
+                  and self._document_name in (job.get("pDocument") or "").lower()):
+                self.job_id = job["JobId"]
+                return job
+        return None
+
+    def poll(self) -> str:
+        if self.state in (JOB_COMPLETED, JOB_FAILED):
+            return self.state
+        try:
+            job = self._find_job()
+        except Exception as e:
+            self.error = str(e)
+            return self.state
+
+        if job is not None:
+            self._seen = True
+            status = job.get("Status", 0)
+            if status & (JOB_STATUS_PRINTED | JOB_STATUS_COMPLETE):
+                self.state = JOB_COMPLETED
+            elif status & JOB_STATUS_SPOOLING:
+                self.state = JOB_SUBMITTED
+            else:
+                self.state = JOB_SPOOLED
+            if status & JOB_BLOCKING_STATUS:
+                self.error = f"打印任务状态异常 (0x{status:x})"
+        elif self._seen:
+            self.state = JOB_COMPLETED
+        else:
+            grace = self.vanish_grace if self.state == JOB_SPOOLED else self.submit_grace
+            if self._clock() - self.submitted_at > grace:
+                self.state = JOB_COMPLETED
+        return self.state
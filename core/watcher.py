@@ -0,0 +1,192 @@
+import os
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from core.planner import DirectoryIndex
+
+FileSignature = Tuple[int, int]  # (大小, 修改时间)
+
+
+class ChangeSource:
+    """目录变化来源：返回可能有变化的文件路径"""
+
+    def wait_changes(self, timeout: float) -> Set[str]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PollingChangeSource(ChangeSource):
+    """
+    轮询方式：复用 DirectoryIndex，只重新列举修改时间变化了的目录。
+
+    第一次调用返回目录中已有的全部文件，之后只返回变化目录中的文件。
+    """
+
+    def __init__(self, root: str, index: Optional[DirectoryIndex] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.root = root
+        self.index = index or DirectoryIndex()
+        self._sleep = sleep
+        self._first = True
+
+    def wait_changes(self, timeout: float) -> Set[str]:
+        if not self._first:
+            self._sleep(timeout)
+        self._first = False
+        entries = self.index.scan(self.root)
+        changed = set(self.index.changed_dirs)
+        return {os.path.join(root, entry.name) for root, entry in entries if root in changed}
+
+
+class Win32ChangeSource(ChangeSource):
+    """通过 ReadDirectoryChangesW 接收文件变化通知，第一次调用时返回已有的全部文件"""
+
+    FILE_LIST_DIRECTORY = 0x0001
+
+    def __init__(self, root: str):
+        import win32con
+        import win32event
+        import win32file
+        import pywintypes
+
+        self.root = root
+        self._win32event = win32event
+        self._win32file = win32file
+        self._handle = win32file.CreateFile(
+            root,
+            self.FILE_LIST_DIRECTORY,
+            win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+            None,
+            win32con.OPEN_EXISTING,
+            win32con.FILE_FLAG_BACKUP_SEMANTICS | win32con.FILE_FLAG_OVERLAPPED,
+            None,
+        )
+        self._flags = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+                       | win32con.FILE_NOTIFY_CHANGE_DIR_NAME
+                       | win32con.FILE_NOTIFY_CHANGE_SIZE
+                       | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        self._overlapped = pywintypes.OVERLAPPED()
+        self._overlapped.hEvent = win32event.CreateEvent(None, True, 0, None)
+        self._buffer = win32file.AllocateReadBuffer(64 * 1024)
+        self._pending = False
+        self._first = True
+
+    def _arm(self):
+        if not self._pending:
+            self._win32file.ReadDirectoryChangesW(self._handle, self._buffer, True, self._flags, self._overlapped)
+            self._pending = True
+
+    def wait_changes(self, timeout: float) -> Set[str]:
+        if self._first:
+            # 先开始监听再列举，避免漏掉列举期间新增的文件
+            self._first = False
+            self._arm()
+            return {os.path.join(root, name) for root, _, files in os.walk(self.root) for name in files}
+
+        self._arm()
+        rc = self._win32event.WaitForSingleObject(self._overlapped.hEvent, int(timeout * 1000))
+        if rc != self._win32event.WAIT_OBJECT_0:
+            return set()
+        self._pending = False
+        self._win32event.ResetEvent(self._overlapped.hEvent)
+        nbytes = self._win32file.GetOverlappedResult(self._handle, self._overlapped, True)
+        if not nbytes:
+            # 缓冲区溢出时无法得知具体文件，退化为完整列举
+            return {os.path.join(root, name) for root, _, files in os.walk(self.root) for name in files}
+        changes = self._win32file.FILE_NOTIFY_INFORMATION(self._buffer, nbytes)
+        return {os.path.join(self.root, rel_path) for _, rel_path in changes}
+
+    def close(self):
+        try:
+            self._win32file.CancelIo(self._handle)
+            self._handle.Close()
+        except Exception:
+            pass
+
+
+def create_change_source(root: str, use_notifications: bool = True,
+                         logger: Optional[logging.Logger] = None,
+                         sleep: Callable[[float], None] = time.sleep) -> ChangeSource:
+    """优先使用系统通知，不可用时退化为轮询；sleep 为轮询间隔的等待函数（可被停止打印提前唤醒）"""
+    if use_notifications:
+        try:
+            return Win32ChangeSource(root)
+        except Exception as e:
+            (logger or logging.getLogger("PrinterCore")).info(f"ℹ️ 系统文件通知不可用，使用轮询: {e}")
+    return PollingChangeSource(root, sleep=sleep)
+
+
+class HotFolderWatcher:
+    """
+    监控源目录，返回已经写完的新文件。
+
+    文件在 settle_seconds 内大小和修改时间都没有变化，且 Excel 没有打开它（没有 ~$ 锁文件），
+    才认为写入完成。每个文件只返回一次，打印并移动后调用 forget()，同名文件再次出现时会重新返回。
+    """
+
+    def __init__(self, source: ChangeSource, is_printable: Callable[[str], bool],
+                 settle_seconds: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.source = source
+        self.is_printable = is_printable
+        self.settle_seconds = settle_seconds
+        self._clock = clock
+        # 等待写入完成的文件: 路径 -> (签名, 签名最后变化的时间)
+        self._candidates: Dict[str, Tuple[FileSignature, float]] = {}
+        # 已经返回过的文件
+        self._emitted: Dict[str, FileSignature] = {}
+
+    def _signature(self, path: str) -> Optional[FileSignature]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def _is_locked(path: str) -> bool:
+        root, name = os.path.split(path)
+        return os.path.exists(os.path.join(root, "~$" + name))
+
+    def poll(self, timeout: float) -> List[Tuple[str, int, int]]:
+        """等待最多 timeout 秒，返回写入完成的文件 [(路径, 大小, 修改时间)]"""
+        now = self._clock()
+        for path in self.source.wait_changes(timeout):
+            name = os.path.basename(path)
+            if name.startswith("~$") or not self.is_printable(name):
+                continue
+            if path not in self._candidates:
+                self._candidates[path] = ((-1, -1), now)
+
+        now = self._clock()
+        ready = []
+        for path, (last_sig, since) in list(self._candidates.items()):
+            sig = self._signature(path)
+            if sig is None:
+                # 文件已被删除或移走
+                del self._candidates[path]
+                self._emitted.pop(path, None)
+                continue
+            if sig != last_sig:
+                self._candidates[path] = (sig, now)
+                continue
+            if self._emitted.get(path) == sig:
+                del self._candidates[path]
+                continue
+            if now - since >= self.settle_seconds and sig[0] > 0 and not self._is_locked(path):
+                del self._candidates[path]
+                self._emitted[path] = sig
+                ready.append((path, sig[0], sig[1]))
+        return ready
+
+    @property
+    def pending(self) -> int:
+        return len(self._candidates)
+
+    def forget(self, path: str):
+        self._emitted.pop(path, None)
+
+    def close(self):
+        self.source.close()
@@ -1,38 +1,202 @@
 import os
 import sys
+import json
 import time
-import shutil
-import win32api
-import win32print
-import pythoncom
-import win32com.client
 import logging
+import tempfile
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
 from datetime import datetime
-import ctypes
-import ctypes.wintypes
 from utils.path_utils import get_app_path, ensure_directory_exists
-from typing import Callable, Dict, Any
+from core.excel_session import ExcelSessionPool
+from core.page_setup import PageSetupApplier
+from core.prerender import CachingConverter, ExcelConverter, LibreOfficeConverter, PrerenderPipeline
+from core.render_cache import RenderCache
+from core.printer_backend import PrinterBackend, SpoolerError, create_backend
+from core.pacer import AdaptivePacer
+from core.health import BREAKER_OPEN, PrinterHealthMonitor
+from core.jobs import PrintBatch, PrintJob, job_kind
+from core.merge import group_jobs, merge_available, merge_pdfs
+from core.watcher import HotFolderWatcher, Win32ChangeSource, create_change_source
+from core.planner import PrintPlan, PrintPlanner, ProgressTracker, format_eta
+from core.scheduler import POLICY_SCAN, PrintScheduler
+from core.preflight import PREFLIGHT_NAMES, PREFLIGHT_UNREADABLE, PreflightAnalyzer
+from core.dispatcher import PrintDispatcher
+from core.metrics import MetricsRegistry, MetricsServer
+from core.mover import FileMover
+from core.pause import PAUSE_SKIPPED, PAUSE_STOPPED, PauseBoard
+from core.cancel import CancelToken, Cancelled
+from core.retry import (ERROR_NAMES, ERROR_PERMANENT, OUTCOME_FAILED, OUTCOME_NAMES, OUTCOME_QUARANTINED,
+                        OUTCOME_RETRYING, STAGE_OPEN, STAGE_SPOOL, STAGE_START, STAGE_SUBMIT, Quarantine,
+                        RetryQueue, RetryReport, classify_error, load_retry_policies)
+from core.spool import JOB_FAILED, JOB_SPOOLED
+from core.journal import (JobJournal, SENT_STATES, STATE_DISCOVERED, STATE_FAILED, STATE_MOVED,
+                          STATE_SPOOLED, STATE_STARTED, STATE_SUBMITTED)
+from typing import Callable, Dict, Any, List, Optional
 
 
 class PrinterCore:
-    def __init__(self, config: dict, parent, log_callback: Callable[[str], None] = print):
-        self._is_running = True  # 新增
+    def __init__(self, config: dict, parent, log_callback: Callable[[str], None] = print,
+                 backend: Optional[PrinterBackend] = None,
+                 progress_callback: Optional[Callable[[int, int, float], None]] = None,
+                 pause_callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        # 停止请求：stop() 立即停止，stop(drain=True) 打印完正在打印的文件后停止
+        self.cancel_token = CancelToken()
         self.config = config
         self.parent = parent
         self.log_callback = log_callback
+        # 进度回调: (已完成数, 总数, 预计剩余秒数)
+        self.progress_callback = progress_callback
+        # 诊所边界暂停变化时的回调: (当前所有暂停)，界面据此显示倒计时
+        self.pause_callback = pause_callback
+        # 打印后端：默认按配置创建（win32 / simulated）
+        self.backend = backend or create_backend(config)
         self._setup_logging()
 
         self.source_root = config.get("source_dir")
         today_str = datetime.now().strftime("%Y-%m-%d")
         self.target_root = f"{self.source_root}_打印备份_{today_str}"
 
-        self.DEFAULT_PRINTER = win32print.GetDefaultPrinter()
+        self.DEFAULT_PRINTER = self.backend.get_default_printer()
         self.MONTHLY_PRINTER_NAME = config.get("monthly_printer_name", "")
         self.DEFAULT_PAPER_SIZE = int(config.get("default_paper_size", 132))
         self.DEFAULT_PAPER_ZOOM = int(config.get("default_paper_zoom", 75))
         self.DELAY_SECONDS = float(config.get("delay_seconds", 5))
+        # adaptive: 根据打印队列状态提交下一个文件；fixed: 每个文件后固定等待 DELAY_SECONDS
+        self.PACING_MODE = config.get("pacing_mode", "adaptive")
+        self.MIN_DELAY_SECONDS = min(float(config.get("min_delay_seconds", 0.5)), self.DELAY_SECONDS)
+        self.QUEUE_HIGH_WATER = int(config.get("queue_high_water", 2))
+        # 月结单和出货单打印机各自一个工作线程同时打印
+        self.PARALLEL_DISPATCH = bool(config.get("parallel_dispatch", True))
+        # 兼容不支持 printto 的 PDF 阅读器：本轮开始时切换一次系统默认打印机，结束后恢复
+        self.SWITCH_DEFAULT_PRINTER = bool(config.get("switch_default_printer", False))
+        # 监控模式：新文件写完（大小稳定 WATCH_SETTLE_SECONDS 秒）后自动打印
+        self.WATCH_MODE = bool(config.get("watch_mode", False))
+        self.WATCH_SETTLE_SECONDS = float(config.get("watch_settle_seconds", 2))
+        self.WATCH_POLL_INTERVAL = float(config.get("watch_poll_interval", 0.5))
+        self.WATCH_USE_NOTIFICATIONS = bool(config.get("watch_use_notifications", True))
+        # PDF 提交后等待到什么状态: spooled（队列已接收）/ completed（打印完成）/ none（不等待）
+        self.PDF_WAIT_FOR = config.get("pdf_wait_for", JOB_SPOOLED)
+        self.PDF_WAIT_TIMEOUT = float(config.get("pdf_wait_timeout", 60))
+        # 打印任务日志：崩溃或强制终止后恢复时不重复打印
+        self.ENABLE_JOURNAL = bool(config.get("enable_journal", True))
+        self.JOURNAL_PATH = config.get("journal_path") or get_app_path("journal", "print_journal.db")
+        self.journal: Optional[JobJournal] = None
+        self._previous_default_printer = None
         self.ENABLE_WAIT_PROMPT = bool(config.get("enable_wait_prompt", True))
         self.WAIT_PROMPT_SLEEP = float(config.get("wait_prompt_sleep", 30))
+        # 诊所打印完后需要暂停的打印机（如针式打印机换纸），为空时只暂停默认打印机
+        self.WAIT_PROMPT_PRINTERS = list(config.get("wait_prompt_printers") or [])
+        self.EXCEL_POOL_SIZE = int(config.get("excel_pool_size", 1))
+        self.EXCEL_RECYCLE_AFTER = int(config.get("excel_recycle_after", 50))
+        # 页面设置批量提交（PrintCommunication=False），已一致的属性不再赋值
+        self.EXCEL_BATCH_PAGE_SETUP = bool(config.get("excel_batch_page_setup", True))
+        # Excel 预渲染：后台线程提前把工作簿导出为 PDF，打印时只提交 PDF
+        self.EXCEL_PRERENDER = bool(config.get("excel_prerender", False))
+        self.PRERENDER_CONVERTER = config.get("prerender_converter", "excel")
+        self.PRERENDER_WORKERS = int(config.get("prerender_workers", 1))
+        self.PRERENDER_LOOKAHEAD = int(config.get("prerender_lookahead", 4))
+        self.PRERENDER_DIR = config.get("prerender_dir") or get_app_path("cache", "prerender")
+        self.prerender: Optional[PrerenderPipeline] = None
+        # 渲染缓存：相同内容 + 相同打印设置的工作簿只渲染一次
+        self.ENABLE_RENDER_CACHE = bool(config.get("render_cache", True))
+        self.RENDER_CACHE_DIR = config.get("render_cache_dir") or get_app_path("cache", "render")
+        self.RENDER_CACHE_MAX_MB = float(config.get("render_cache_max_mb", 512))
+        self.render_cache: Optional[RenderCache] = None
+        # 指标：各阶段耗时、计数和队列长度，可写入 Prometheus 文本文件或通过本机端口提供
+        self.METRICS_TEXTFILE = config.get("metrics_textfile", "")
+        self.METRICS_PORT = int(config.get("metrics_port", 0))
+        self.METRICS_SUMMARY = bool(config.get("metrics_summary", True))
+        self.metrics = MetricsRegistry()
+        self._metrics_server: Optional[MetricsServer] = None
+        self._metrics_written_at = 0.0
+        # 文件移动和空目录清理在单独的 I/O 线程中进行，打印线程不等待
+        self.ASYNC_MOVE = bool(config.get("async_move", True))
+        self.mover = FileMover(self.source_root, self.target_root, async_io=self.ASYNC_MOVE,
+                               logger=self.logger, observe=self.metrics.observe)
+        # 文件移动完成后的通知（监控模式下用于让 HotFolderWatcher 忘记该文件）
+        self._on_file_moved: Optional[Callable[[PrintJob], None]] = None
+
+        # Excel 会话池，在 run() 期间保持 Excel 常驻；COM 对象不能跨线程，每个线程各自一个池
+        self.excel_factory = self.backend.excel_factory()
+        self._excel_pools = threading.local()
+        self.pauses = PauseBoard(pause_callback)
+        self.cancel_token.on_cancel(self.pauses.stop_all)
+        self.page_setup = PageSetupApplier(batch=self.EXCEL_BATCH_PAGE_SETUP, logger=self.logger)
+        if self.ENABLE_RENDER_CACHE:
+            try:
+                self.render_cache = RenderCache(self.RENDER_CACHE_DIR, int(self.RENDER_CACHE_MAX_MB * 1024 * 1024),
+                                                logger=self.logger)
+            except OSError as e:
+                self.logger.warning(f"⚠️ 渲染缓存目录不可用，不使用缓存: {e}")
+
+        self.pacer = self._create_pacer()
+
+        # 打印计划：先扫描生成计划，执行阶段不再遍历目录
+        self.planner = PrintPlanner(self.printer_for, self.is_monthly_file)
+        self.plan: Optional[PrintPlan] = None
+        # 打印顺序：scan / clinic_id / smallest_first / monthly_first，可用逗号组合；clinic_priority 指定优先的诊所
+        self.SCHEDULE_POLICY = config.get("schedule_policy", POLICY_SCAN)
+        self.CLINIC_PRIORITY = config.get("clinic_priority") or {}
+        try:
+            self.scheduler = PrintScheduler(self.SCHEDULE_POLICY, self.CLINIC_PRIORITY)
+        except ValueError as e:
+            self.logger.warning(f"⚠️ {e}，使用扫描顺序")
+            self.scheduler = PrintScheduler(POLICY_SCAN, self.CLINIC_PRIORITY)
+        self.progress: Optional[ProgressTracker] = None
+        # 打印前检查：不启动 Office 读取页数并估算打印时间，损坏或有打开密码的文件不打印
+        self.PREFLIGHT = bool(config.get("preflight", True))
+        self.PREFLIGHT_WORKERS = int(config.get("preflight_workers", 4))
+        # 估算打印时间用的打印速度（页/分钟），printer_pages_per_minute 可按打印机配置
+        self.PAGES_PER_MINUTE = float(config.get("pages_per_minute", 10))
+        self.PRINTER_PAGES_PER_MINUTE = dict(config.get("printer_pages_per_minute") or {})
+        self.preflight_analyzer = PreflightAnalyzer(self.DEFAULT_PAPER_SIZE, self.DEFAULT_PAPER_ZOOM,
+                                                    bool(config.get("print_firstPage", False)),
+                                                    workers=self.PREFLIGHT_WORKERS, logger=self.logger)
+        # 合并打印：同一诊所、同一打印机上相邻的文件合并为一个 PDF，只提交一个打印任务，
+        # 省去每个任务的阅读器启动、任务创建和走纸；Excel 文件按打印时的页面设置导出为 PDF 后合并
+        self.MERGE_CLINIC_JOBS = bool(config.get("merge_clinic_jobs", False))
+        self.MERGE_MAX_FILES = int(config.get("merge_max_files", 50))
+        self.MERGE_DIR = config.get("merge_dir") or get_app_path("cache", "merged")
+        # 合并文件写在 MERGE_DIR 下每轮新建的子目录中，清理时只删除这些子目录中的 PDF，不动 MERGE_DIR 中的其他文件
+        self._merge_run_dir: Optional[str] = None
+        if self.MERGE_CLINIC_JOBS and not merge_available():
+            self.logger.warning("⚠️ 未安装 pypdf，不能合并打印，将逐个文件打印")
+            self.MERGE_CLINIC_JOBS = False
+        # 打印机健康监控：后台读取打印机状态位，缺纸、卡纸、脱机时熔断，只暂停该打印机的队列，
+        # 可切换到 printer_failover 中配置的同类备用打印机（printer_classes 相同），恢复后自动继续
+        self.HEALTH_MONITOR = bool(config.get("health_monitor", True))
+        self.HEALTH_RETRY_LIMIT = int(config.get("health_retry_limit", 3))
+        self.PRINTER_CLASSES = dict(config.get("printer_classes") or {})
+        self.PRINTER_FAILOVER = self._failover_config(config.get("printer_failover") or {})
+        self.health: Optional[PrinterHealthMonitor] = None
+        if self.HEALTH_MONITOR:
+            self.health = PrinterHealthMonitor(
+                self.backend.get_queue_state,
+                interval=float(config.get("health_check_interval", 2)),
+                recovery_checks=int(config.get("health_recovery_checks", 2)),
+                cooldown=float(config.get("health_cooldown_seconds", 30)),
+                failover=self.PRINTER_FAILOVER,
+                listener=self._on_breaker_changed,
+                logger=self.logger,
+            )
+            self.cancel_token.on_cancel(self.health.wake)
+        # 失败重试：失败的文件进入重试队列，按错误类别的策略（retry_policies）指数退避后重试，其他文件照常打印；
+        # 文件本身有问题（损坏、有打开密码）时移到隔离目录。retry_failed=False 时出错后停止该打印机的队列
+        self.RETRY_FAILED = bool(config.get("retry_failed", True))
+        self.retry_policies = load_retry_policies(config.get("retry_policies") or {})
+        self.retry_queue = RetryQueue()
+        self.retry_report = RetryReport()
+        self.QUARANTINE_FAILED = bool(config.get("quarantine_failed", True))
+        self.QUARANTINE_DIR = config.get("quarantine_dir") or f"{self.source_root}_打印隔离_{today_str}"
+        # 预检发现的问题文件默认只跳过、留在源目录；quarantine_preflight=True 时同样移到隔离目录
+        self.QUARANTINE_PREFLIGHT = bool(config.get("quarantine_preflight", False))
+        self.quarantine = Quarantine(self.source_root, self.QUARANTINE_DIR, logger=self.logger)
+        # 本线程最近一次打印失败的异常和阶段，用于判断错误类别
+        self._failures = threading.local()
+        # 本线程正在打印的文件，提交给打印机后在打印任务日志中记为“已提交”
+        self._printing = threading.local()
 
         self._log_config()
 
@@ -68,59 +232,143 @@ class PrinterCore:
     def _log_config(self):
         self.logger.info("-------------------------")
         self.logger.info("⚙️ 配置信息:")
+        self.logger.info(f"🔌 打印后端: {self.backend.name}")
         self.logger.info(f"📂 源目录: {self.source_root}")
         self.logger.info(f"📂 保存目录: {self.target_root}")
         self.logger.info(f"🖨️ 月结单使用的打印机名称️: {self.MONTHLY_PRINTER_NAME}")
         self.logger.info(f"📄 针式打印机纸张编号: {self.DEFAULT_PAPER_SIZE}")
         self.logger.info(f"📄 针式打印机打印缩放比例: {self.DEFAULT_PAPER_ZOOM}")
         self.logger.info(f"📄 打印间隔: {self.DELAY_SECONDS}")
+        if self.PACING_MODE == "adaptive":
+            self.logger.info(f"⏱️ 自适应节奏: 最短 {self.MIN_DELAY_SECONDS} 秒, 队列上限 {self.QUEUE_HIGH_WATER} 个任务")
         self.logger.info(f"🔔 打印完目录是否弹窗并等待: {self.ENABLE_WAIT_PROMPT}")
+        self.logger.info(f"🖨️ 多打印机并行打印: {self.PARALLEL_DISPATCH}")
+        self.logger.info(f"🔢 打印顺序: {self.scheduler.description}")
+        self.logger.info(f"🔎 打印前检查: {self.PREFLIGHT}")
+        if self.MERGE_CLINIC_JOBS:
+            self.logger.info(f"📚 合并打印: 每个任务最多 {self.MERGE_MAX_FILES} 个文件")
+        self.logger.info(f"🩺 打印机健康监控: {self.HEALTH_MONITOR}")
+        self.logger.info(f"🔁 失败重试: {self.RETRY_FAILED}, 隔离无法打开的文件: {self.QUARANTINE_FAILED}")
+        for printer, backups in self.PRINTER_FAILOVER.items():
+            self.logger.info(f"🔀 备用打印机: {printer} -> {', '.join(backups)}")
+        self.logger.info(f"📊 Excel 实例数/回收阈值: {self.EXCEL_POOL_SIZE}/{self.EXCEL_RECYCLE_AFTER}")
+        self.logger.info(f"📊 Excel 页面设置批量提交: {self.EXCEL_BATCH_PAGE_SETUP}")
+        if self.EXCEL_PRERENDER:
+            self.logger.info(f"🧾 Excel 预渲染: {self.PRERENDER_CONVERTER}, {self.PRERENDER_WORKERS} 个线程, "
+                             f"最多提前 {self.PRERENDER_LOOKAHEAD} 个文件")
         self.logger.info("-------------------------")
 
+    def get_run_default_printer(self):
+        """
+        本轮打印使用的默认打印机：配置中的 selected_printer，没有时用系统默认打印机。
+
+        主窗口开始打印前把标记为默认的打印机保存到 selected_printer；这里不再从打印线程读取界面控件。
+        """
+        return self.config.get("selected_printer") or self.DEFAULT_PRINTER
+
+    def _create_pacer(self) -> AdaptivePacer:
+        """创建打印节奏控制器；fixed 模式下上下限都等于 DELAY_SECONDS"""
+        if self.PACING_MODE == "fixed":
+            return AdaptivePacer(lambda name: None, min_delay=self.DELAY_SECONDS,
+                                 max_delay=self.DELAY_SECONDS, logger=self.logger, sleep=self.cancel_token.sleep)
+        return AdaptivePacer(
+            self.backend.get_queue_state,
+            high_water=self.QUEUE_HIGH_WATER,
+            min_delay=self.MIN_DELAY_SECONDS,
+            max_delay=self.DELAY_SECONDS,
+            poll_interval=float(self.config.get("pacing_poll_interval", 0.25)),
+            backoff_max=float(self.config.get("printer_error_backoff_max", 60)),
+            max_error_wait=float(self.config.get("printer_error_max_wait", 600)),
+            # 启用健康监控时由熔断器处理打印机异常，节奏控制不再等待
+            pause_on_error=not self.config.get("health_monitor", True),
+            logger=self.logger,
+            # 停止打印时立即结束等待
+            sleep=self.cancel_token.sleep,
+        )
+
+    def _failover_config(self, failover: Dict[str, Any]) -> Dict[str, List[str]]:
+        """备用打印机必须与原打印机同类（printer_classes 中的类别相同），否则忽略"""
+        result = {}
+        for printer, backups in failover.items():
+            if isinstance(backups, str):
+                backups = [backups]
+            valid = []
+            for backup in backups:
+                if backup == printer:
+                    continue
+                if self.PRINTER_CLASSES.get(backup) != self.PRINTER_CLASSES.get(printer):
+                    self.logger.warning(f"⚠️ 备用打印机 [{backup}] 与 [{printer}] 类别不同，不作为备用打印机")
+                    continue
+                valid.append(backup)
+            if valid:
+                result[printer] = valid
+        return result
+
+    def _on_breaker_changed(self, printer: str, state: str, reason: str):
+        self.metrics.inc("breaker_transitions_total", printer=printer, state=state)
+        self.metrics.set_gauge("printer_breaker_open", 1 if state == BREAKER_OPEN else 0, printer=printer)
+
     def is_monthly_file(self, filename):
         return "月结单" in filename
 
-    def get_printer(self, is_monthly=False):
-        """获取当前选择的打印机"""
-        printer_name = self.DEFAULT_PRINTER
-        if is_monthly and hasattr(self, 'MONTHLY_PRINTER_NAME'):
-            printer_name = self.MONTHLY_PRINTER_NAME
-
-        # 尝试设置默认打印机
-        win32print.SetDefaultPrinter(printer_name)
+    def printer_for(self, is_monthly=False):
+        """文件对应的目标打印机名称"""
+        if is_monthly and self.MONTHLY_PRINTER_NAME:
+            return self.MONTHLY_PRINTER_NAME
+        return self.DEFAULT_PRINTER
 
-        return printer_name
+    def get_printer(self, is_monthly=False):
+        """获取当前选择的打印机（任务直接发送到该打印机，不再逐个切换系统默认打印机）"""
+        return self.printer_for(is_monthly)
 
-    def print_pdf(self, path, use_alt=False):
+    def print_pdf(self, path, use_alt=False, first_page_only=None, printer=None):
 
         # printer = self.DEFAULT_PRINTER
         # 使用主窗口选择的打印机
         # printer = self.config.get("selected_printer", win32print.GetDefaultPrinter())
-        printer = self.get_printer(use_alt)
+        printer = printer or self.get_printer(use_alt)
         is_bw = self.config.get("bw_print", False)
-        is_print_firstPage = self.config.get("print_firstPage", False)
+        is_print_firstPage = self.config.get("print_firstPage", False) if first_page_only is None else first_page_only
 
         self.logger.info(f"📄 打印 PDF: {path}")
         self.logger.info(f"🖨️ 打印机: {printer}")
 
-        try:
-            # 构造打印命令
-            params = f'/d:"{printer}"'
-            if is_bw:
-                params += ' /p "Color=Monochrome"'  # Adobe Reader参数
+        if (is_bw or is_print_firstPage) and not self.backend.supports_pdf_options():
+            self.logger.warning("⚠️ 当前 PDF 打印方式不支持黑白/只打印首页设置，将按阅读器默认设置打印")
 
-            win32api.ShellExecute(0, "print", path, params, ".", 0)
-            self.logger.info(f"✅ 打印成功 (PDF)")
-            return True
+        self.cancel_token.check("提交 PDF")
+        try:
+            with self.metrics.time("spool_submit"):
+                handle = self.backend.print_pdf(path, printer, bw=is_bw, first_page_only=is_print_firstPage)
         except Exception as e:
+            self._note_failure(e, STAGE_SUBMIT)
             self.logger.error(f"❌ 打印失败 (PDF): {e}")
             return False
+        self._note_submitted()
+
+        # 等待打印队列接收（或打印完成），不再假设 ShellExecute 返回即打印成功
+        if self.PDF_WAIT_FOR != "none":
+            with self.metrics.time("spool_wait") as timing:
+                confirmed = handle.wait(self.PDF_WAIT_FOR, timeout=self.PDF_WAIT_TIMEOUT,
+                                        should_continue=self.cancel_token.job_should_continue)
+                timing.failed = not confirmed
+            # 已经提交给打印机，日志中保持“已提交”，下次运行时只补做移动
+            self.cancel_token.check("等待打印队列", submitted=True)
+            if not confirmed:
+                if handle.state == JOB_FAILED:
+                    self._note_failure(SpoolerError(handle.error), STAGE_SPOOL)
+                    self.logger.error(f"❌ 打印失败 (PDF): {handle.error}")
+                    return False
+                self.logger.warning(f"⚠️ 未能确认打印队列状态 ({handle.state}): {path}")
+
+        self.logger.info(f"✅ 打印成功 (PDF, {handle.state})")
+        return True
 
-    def print_excel(self, path, use_alt=False):
+    def print_excel(self, path, use_alt=False, printer=None):
         # printer = self.DEFAULT_PRINTER
         # 使用主窗口选择的打印机
         # printer = self.config.get("selected_printer", win32print.GetDefaultPrinter())
-        printer = self.get_printer(use_alt)
+        printer = printer or self.get_printer(use_alt)
         is_pdf_printer = "Microsoft Print to PDF" in printer
 
         self.logger.info(f"✅ Excel已导出为PDF: {is_pdf_printer}")
@@ -131,131 +379,306 @@ class PrinterCore:
         self.logger.info(f"📊 打印 Excel: {path}")
         self.logger.info(f"🖨️ 打印机: {printer}")
 
-        pythoncom.CoInitialize()
-        excel = win32com.client.Dispatch("Excel.Application")
-        excel.Visible = False
-        excel.DisplayAlerts = False
+        if self.prerender is not None and not is_pdf_printer:
+            try:
+                pdf_path = self.prerender.take(path, self.cancel_token.job_should_continue)
+                if pdf_path:
+                    # 已在后台渲染为 PDF，只需提交打印
+                    return self.print_pdf(pdf_path, use_alt, printer=printer)
+            finally:
+                self.prerender.release(path)
+
+            # 还没有预渲染：相同内容的工作簿以前渲染过时直接打印缓存的 PDF
+            key = self._render_key(path, use_alt, self.PRERENDER_CONVERTER, is_print_firstPage)
+            if key is not None:
+                with self.render_cache.checkout(key) as cached:
+                    if cached:
+                        self.logger.info(f"♻️ 使用渲染缓存: {os.path.basename(path)}")
+                        return self.print_pdf(cached, use_alt, printer=printer)
+
+        export_key = None
+        if is_pdf_printer:
+            export_key = self._render_key(path, use_alt, "excel", False)
+            output_path = self._pdf_output_path(path)
+            if export_key is not None and self.render_cache.copy_to(export_key, output_path):
+                self.logger.info(f"✅ Excel已导出为PDF (渲染缓存): {output_path}")
+                return True
+
+        self.cancel_token.check("打开 Excel")
+        pool = self._get_excel_pool()
+        session = None
+        wb = None
+        failed = False
+        stage = STAGE_START
 
         try:
-            wb = excel.Workbooks.Open(path, ReadOnly=True)
-            for sheet in wb.Sheets:
-                if use_alt:
-                    sheet.PageSetup.PaperSize = 9  # A4
-                    sheet.PageSetup.Zoom = False
-                    sheet.PageSetup.FitToPagesWide = 1
-                    sheet.PageSetup.FitToPagesTall = 1
-                    sheet.PageSetup.Orientation = 1
-                else:
-                    try:
-                        sheet.PageSetup.PaperSize = self.DEFAULT_PAPER_SIZE
-                    except:
-                        sheet.PageSetup.PaperSize = 9  # A4
-                    sheet.PageSetup.Zoom = self.DEFAULT_PAPER_ZOOM
-                    sheet.PageSetup.FitToPagesWide = False
-                    sheet.PageSetup.FitToPagesTall = False
-                    sheet.PageSetup.Orientation = 1
-
-                # 黑白打印设置
-                if is_bw:
-                    sheet.PageSetup.BlackAndWhite = True  # Excel黑白打印属性
+            # Excel 启动失败（如 DispatchEx 时 RPC 忙）也按错误类别进入重试队列，不中断该打印机的队列
+            with self.metrics.time("excel_acquire"):
+                session = pool.acquire()
+            excel = session.app
+            stage = STAGE_OPEN
+            with self.metrics.time("excel_open"):
+                wb = excel.Workbooks.Open(path, ReadOnly=True)
+            stage = STAGE_SUBMIT
+            profile = self.page_setup.profile(printer, use_alt, self.DEFAULT_PAPER_SIZE, self.DEFAULT_PAPER_ZOOM, is_bw)
+            with self.metrics.time("page_setup"):
+                calls = self.page_setup.apply(excel, wb, profile, self.cancel_token.job_should_continue)
+            self.metrics.inc("page_setup_com_calls_total", calls.total)
+            self.logger.info(f"📊 页面设置 COM 调用: {calls}")
 
             if is_pdf_printer:
                 # 直接导出为PDF
-                return self.export_excel_to_pdf(excel, wb, path)
+                exported = self.export_excel_to_pdf(excel, wb, path)
+                if exported:
+                    self._note_submitted()
+                    if export_key is not None:
+                        self.save_render(export_key, self._pdf_output_path(path))
+                return exported
             else:
-                if is_print_firstPage:
-                    wb.PrintOut(From=1, To=1, ActivePrinter=printer)
-                else:
-                    wb.PrintOut(ActivePrinter=printer)
+                self.cancel_token.check("提交 Excel")
+                with self.metrics.time("excel_printout"):
+                    if is_print_firstPage:
+                        wb.PrintOut(From=1, To=1, ActivePrinter=printer)
+                    else:
+                        wb.PrintOut(ActivePrinter=printer)
+                self._note_submitted()
 
             self.logger.info(f"✅ 打印成功 (Excel)")
             return True
+        except Cancelled:
+            raise
         except Exception as e:
+            failed = True
+            self._note_failure(e, stage)
             self.logger.error(f"❌ 打印失败 (Excel): {e}")
             return False
         finally:
             try:
-                wb.Close(False)
+                if wb is not None:
+                    wb.Close(False)
             except:
                 pass
+            # 归还 Excel 实例，出错时由会话池回收
+            if session is not None:
+                pool.release(session, failed=failed)
+
+    def _get_excel_pool(self) -> ExcelSessionPool:
+        """获取当前线程的 Excel 会话池，不存在时创建"""
+        pool = getattr(self._excel_pools, "pool", None)
+        if pool is None:
+            pool = ExcelSessionPool(
+                self.excel_factory,
+                size=self.EXCEL_POOL_SIZE,
+                recycle_after=self.EXCEL_RECYCLE_AFTER,
+                logger=self.logger,
+            )
+            self._excel_pools.pool = pool
+        return pool
+
+    def shutdown_excel_pool(self):
+        """关闭当前线程 Excel 会话池中的所有实例"""
+        pool = getattr(self._excel_pools, "pool", None)
+        if pool is not None:
+            pool.shutdown()
+            self._excel_pools.pool = None
+
+    def render_excel_to_pdf(self, path, pdf_path, use_alt=False):
+        """按打印时的页面设置把 Excel 渲染为 PDF（预渲染线程调用，使用本线程的 Excel 会话池）"""
+        printer = self.get_printer(use_alt)
+        is_bw = self.config.get("bw_print", False)
+        is_print_firstPage = self.config.get("print_firstPage", False)
+
+        pool = self._get_excel_pool()
+        session = None
+        wb = None
+        failed = True
+
+        try:
+            with self.metrics.time("excel_acquire"):
+                session = pool.acquire()
+            excel = session.app
+            with self.metrics.time("excel_open"):
+                wb = excel.Workbooks.Open(path, ReadOnly=True)
+            profile = self.page_setup.profile(printer, use_alt, self.DEFAULT_PAPER_SIZE, self.DEFAULT_PAPER_ZOOM, is_bw)
+            with self.metrics.time("page_setup"):
+                calls = self.page_setup.apply(excel, wb, profile)
+            self.metrics.inc("page_setup_com_calls_total", calls.total)
+            failed = not self.export_excel_to_pdf(excel, wb, path, pdf_path=pdf_path,
+                                                  first_page_only=is_print_firstPage)
+            return not failed
+        finally:
             try:
-                excel.Quit()
+                if wb is not None:
+                    wb.Close(False)
             except:
                 pass
-            pythoncom.CoUninitialize()
+            if session is not None:
+                pool.release(session, failed=failed)
+
+    def _pdf_output_path(self, original_path):
+        """导出到 PDF 打印机时的输出文件路径"""
+        # 获取输出目录和文件名
+        output_dir = self.config.get("pdf_output_dir", "")
+        if not output_dir:
+            # 默认使用原文件所在目录
+            output_dir = os.path.dirname(original_path)
 
-    def export_excel_to_pdf(self, excel, wb, original_path):
-        """将Excel直接导出为PDF"""
+        # 生成PDF文件名
+        original_name = os.path.splitext(os.path.basename(original_path))[0]
+        pdf_filename = f"{original_name}.pdf"
+        return os.path.join(output_dir, pdf_filename)
+
+    def _render_key(self, path, use_alt, converter, first_page_only) -> Optional[str]:
+        """渲染缓存键：文件内容 + 转换方式 + 打印机 + 页面设置 + 是否只打印首页；不使用缓存时为 None"""
+        if self.render_cache is None:
+            return None
+        printer = self.get_printer(use_alt)
+        is_bw = self.config.get("bw_print", False)
+        profile = self.page_setup.profile(printer, use_alt, self.DEFAULT_PAPER_SIZE, self.DEFAULT_PAPER_ZOOM, is_bw)
         try:
-            # 获取输出目录和文件名
-            output_dir = self.config.get("pdf_output_dir", "")
-            if not output_dir:
-                # 默认使用原文件所在目录
-                output_dir = os.path.dirname(original_path)
+            return self.render_cache.key_for(path, (converter, printer, tuple(profile.fields.items()),
+                                                    bool(first_page_only)))
+        except OSError as e:
+            self.logger.warning(f"⚠️ 无法读取文件内容，不使用渲染缓存: {e}")
+            return None
 
-            # 生成PDF文件名
-            original_name = os.path.splitext(os.path.basename(original_path))[0]
-            pdf_filename = f"{original_name}.pdf"
-            pdf_path = os.path.join(output_dir, pdf_filename)
+    def save_render(self, key, pdf_path):
+        """把渲染好的 PDF 存入渲染缓存"""
+        try:
+            self.render_cache.put(key, pdf_path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ 保存渲染缓存失败: {e}")
+
+    def export_excel_to_pdf(self, excel, wb, original_path, pdf_path=None, first_page_only=False):
+        """将Excel直接导出为PDF，pdf_path 为空时按 pdf_output_dir 配置生成文件名"""
+        try:
+            if pdf_path is None:
+                pdf_path = self._pdf_output_path(original_path)
 
             # 确保目录存在
-            os.makedirs(output_dir, exist_ok=True)
+            os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
 
             # 导出为PDF
-            wb.ExportAsFixedFormat(0, pdf_path)  # 0 = PDF格式
+            with self.metrics.time("export_pdf"):
+                if first_page_only:
+                    wb.ExportAsFixedFormat(0, pdf_path, From=1, To=1)
+                else:
+                    wb.ExportAsFixedFormat(0, pdf_path)  # 0 = PDF格式
             self.logger.info(f"✅ Excel已导出为PDF: {pdf_path}")
             return True
 
         except Exception as e:
+            self._note_failure(e, STAGE_SUBMIT)
             self.logger.error(f"❌ 导出PDF失败: {str(e)}")
             return False
 
     def move_and_cleanup(self, src_file, src_root, target_root):
-        rel_path = os.path.relpath(src_file, src_root)
-        dest_file = os.path.join(target_root, rel_path)
-        os.makedirs(os.path.dirname(dest_file), exist_ok=True)
-        shutil.move(src_file, dest_file)
-        self.logger.info(f"📁 已移动文件: {dest_file}")
+        """立即移动一个文件并删除它所在的空目录（不经过 I/O 线程）"""
+        mover = FileMover(src_root, target_root, async_io=False, logger=self.logger)
+        mover.relocate(src_file)
+        mover.sweep(os.path.dirname(src_file))
 
-        src_dir = os.path.dirname(src_file)
+    def move_job(self, job: PrintJob):
+        """把打印完的文件交给 I/O 线程移动，移动完成后记录到打印任务日志"""
+        def moved(ok, error):
+            if not ok:
+                # 日志中保持“已送到打印机”状态，下次运行时只补做移动，不会重复打印
+                return
+            self._journal(job, STATE_MOVED)
+            if self._on_file_moved is not None:
+                self._on_file_moved(job)
+        self.mover.move(job.path, on_done=moved)
 
-        # 删除空目录，根目录（源目录）不删除
-        if src_dir != src_root:
-            if not any(f for f in os.listdir(src_dir) if not f.startswith("~$")):
-                try:
-                    os.rmdir(src_dir)
-                    logging.info(f"🗑️ 删除空目录: {src_dir}")
-                except Exception as e:
-                    logging.warning(f"⚠️ 删除目录失败: {src_dir} - {e}")
+    def sweep_clinic(self, root):
+        """诊所目录的文件全部打印完：在该目录的移动完成后清理空目录"""
+        self.mover.sweep(root)
 
     def show_message_box_with_timeout(self, text, caption, timeout_ms):
-        MB_OK = 0x00
-        MB_ICONINFORMATION = 0x40
-        IDYES = 6
-        IDNO = 7
-
-        MessageBoxTimeoutW = ctypes.windll.user32.MessageBoxTimeoutW
-        MessageBoxTimeoutW.restype = ctypes.c_int
-        MessageBoxTimeoutW.argtypes = [
-            ctypes.wintypes.HWND,
-            ctypes.wintypes.LPCWSTR,
-            ctypes.wintypes.LPCWSTR,
-            ctypes.wintypes.UINT,
-            ctypes.wintypes.WORD,
-            ctypes.wintypes.DWORD
-        ]
-
-        return MessageBoxTimeoutW(
-            0,  # hWnd
-            text,
-            caption,
-            MB_OK | MB_ICONINFORMATION,
-            0,  # Default button (0 = first button)
-            timeout_ms  # Timeout in milliseconds
-        )
+        return self.backend.show_message(text, caption, timeout_ms)
+
+    def switch_default_printer(self, printer_name):
+        """本轮打印开始时切换一次系统默认打印机，run() 结束后恢复"""
+        try:
+            current = self.backend.get_default_printer()
+            if current == printer_name:
+                return
+            start = time.perf_counter()
+            self.backend.set_default_printer(printer_name)
+            self._previous_default_printer = current
+            self.logger.info(f"🖨️ 已切换默认打印机: {current} -> {printer_name} "
+                             f"(耗时 {(time.perf_counter() - start) * 1000:.0f} 毫秒)")
+        except Exception as e:
+            self.logger.error(f"❌ 设置默认打印机失败: {str(e)}")
+            # 尝试使用管理员权限
+            if "Access is denied" in str(e):
+                self.logger.error("⚠️ 需要管理员权限，正在尝试获取权限...")
+
+    def restore_default_printer(self):
+        """恢复 run() 开始前的系统默认打印机"""
+        if not self._previous_default_printer:
+            return
+        try:
+            self.backend.set_default_printer(self._previous_default_printer)
+            self.logger.info(f"🖨️ 已恢复默认打印机: {self._previous_default_printer}")
+        except Exception as e:
+            self.logger.error(f"❌ 恢复默认打印机失败: {str(e)}")
+        self._previous_default_printer = None
+
+    @property
+    def _is_running(self) -> bool:
+        return self.cancel_token.should_continue()
+
+    def stop(self, drain=False):
+        """
+        请求停止打印。
+
+        drain=False 时立即停止：各种等待在 0.25 秒内返回，正在打印的文件在下一个检查点放弃，
+        已提交给打印机的文件下次运行时只补做移动；drain=True 时打印完正在打印的文件后停止。
+        """
+        self.logger.info("🛑 打印完当前文件后停止..." if drain else "🛑 正在停止打印...")
+        self.cancel_token.cancel(drain)
 
     # 返回 False 状态表示打印完成或打印出错，不再打印
     def run(self) -> bool:
+        try:
+            with self.metrics.time("run"):
+                return self._run()
+        finally:
+            self._finish_run()
+
+    def run_watch(self) -> bool:
+        """监控模式：持续监控源目录，新文件写完后立即打印，直到 stop()"""
+        try:
+            return self._run_watch()
+        finally:
+            self._finish_run()
+
+    def _finish_run(self):
+        # 本轮结束（完成、出错或被中断）后关闭常驻的 Excel 实例
+        self.stop_prerender()
+        if self.health is not None:
+            self.health.stop()
+        self.shutdown_excel_pool()
+        # 等待剩余的文件移动完成（移动完成时会写入打印任务日志）
+        self.mover.close()
+        self._on_file_moved = None
+        self.restore_default_printer()
+        if self._merge_run_dir is not None:
+            # 合并文件打印后已逐个删除，只剩空目录；不等待确认（pdf_wait_for=none）时留到下一轮开始时清理
+            try:
+                os.rmdir(self._merge_run_dir)
+            except OSError:
+                pass
+        self.log_retry_report()
+        self.close_journal()
+        self.publish_metrics()
+
+    def _prepare_run(self) -> bool:
+        """检查源目录并确定本轮使用的打印机"""
+        self.metrics.begin_run()
+        self.start_metrics_server()
+        self.retry_queue.drain()
+        self.retry_report.clear()
         if not self._is_running:
             return False
 
@@ -264,71 +687,713 @@ class PrinterCore:
             return False
 
         try:
-            default_printer = self.parent.get_default_printer_by_default_name()
-            # 尝试设置默认打印机
-            win32print.SetDefaultPrinter(default_printer)
+            # 出货单打印机：主窗口中选中的默认打印机；每个任务直接指定打印机，不修改系统默认打印机
+            self.DEFAULT_PRINTER = self.get_run_default_printer()
         except Exception as e:
-            self.logger.error(f"❌ 设置默认打印机失败111: {str(e)}")
-            # 尝试使用管理员权限
-            if "Access is denied" in str(e):
-                self.logger.error("⚠️ 需要管理员权限，正在尝试获取权限...")
+            self.logger.error(f"❌ 获取默认打印机失败: {str(e)}")
 
-        for root, _, files in os.walk(self.source_root, topdown=False):
+        if self.SWITCH_DEFAULT_PRINTER:
+            self.switch_default_printer(self.DEFAULT_PRINTER)
 
-            if not self._is_running:  # 添加中断检查
-                self.logger.info("🛑 打印被用户中断")
-                return False
+        if self.health is not None:
+            self.health.watch(name for name in (self.DEFAULT_PRINTER, self.MONTHLY_PRINTER_NAME) if name)
+            self.health.start()
 
-            total_files = [f for f in files if not f.startswith("~$")]
-            remaining = len(total_files)
+        if self.ENABLE_JOURNAL:
+            self.open_journal()
+        if self.EXCEL_PRERENDER:
+            self.start_prerender()
+        self.mover.start()
+        return True
 
-            for name in files:
-                if name.startswith("~$"):
-                    continue
-                full_path = os.path.join(root, name)
-                is_monthly = self.is_monthly_file(name)
+    def start_prerender(self):
+        """启动 Excel 预渲染线程；转换器不可用时直接打印 Excel"""
+        try:
+            if self.PRERENDER_CONVERTER == "libreoffice":
+                converter = LibreOfficeConverter(self.config.get("libreoffice_path", ""))
+            else:
+                converter = ExcelConverter(self)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 无法启动 Excel 预渲染，将直接打印: {e}")
+            return
+        if self.render_cache is not None:
+            is_print_firstPage = self.config.get("print_firstPage", False)
+            converter = CachingConverter(
+                converter, self.render_cache,
+                lambda path, use_alt: self._render_key(path, use_alt, self.PRERENDER_CONVERTER, is_print_firstPage),
+            )
+        self.prerender = PrerenderPipeline(converter, self.PRERENDER_DIR, workers=self.PRERENDER_WORKERS,
+                                           lookahead=self.PRERENDER_LOOKAHEAD, logger=self.logger)
+        self.prerender.start()
 
-                success = False
+    def schedule_prerender(self, jobs: List[PrintJob]):
+        """按打印顺序把 Excel 文件加入预渲染队列（导出到 PDF 打印机的文件不需要预渲染）"""
+        if self.prerender is None:
+            return
+        for job in jobs:
+            if job.kind == "excel" and "Microsoft Print to PDF" not in job.printer:
+                self.prerender.schedule(job.path, job.is_monthly)
 
-                if name.lower().endswith(".pdf"):
-                    success = self.print_pdf(full_path, use_alt=is_monthly)
-                elif name.lower().endswith((".xls", ".xlsx")):
-                    success = self.print_excel(full_path, use_alt=is_monthly)
+    def can_merge(self, job: PrintJob) -> bool:
+        """PDF 直接合并，Excel 导出为 PDF 后合并；导出到 PDF 打印机的文件不需要打印"""
+        if job.kind == "pdf":
+            return True
+        return job.kind == "excel" and "Microsoft Print to PDF" not in job.printer
 
-                if success:
-                    self.move_and_cleanup(full_path, self.source_root, self.target_root)
-                else:
-                    return False
+    def merge_jobs(self, jobs: List[PrintJob]) -> List[PrintJob]:
+        """把各打印机上同一诊所的相邻文件合并为打印批次"""
+        items = group_jobs(jobs, self.can_merge, self.MERGE_MAX_FILES)
+        batches = [item for item in items if isinstance(item, PrintBatch)]
+        if batches:
+            self.logger.info(f"📚 合并打印: {sum(len(b.jobs) for b in batches)} 个文件合并为 {len(batches)} 个打印任务, "
+                             f"共 {len(items)} 个打印任务")
+        # 清理上次运行留下的合并文件
+        self.cleanup_merge_dirs()
+        if batches:
+            os.makedirs(self.MERGE_DIR, exist_ok=True)
+            self._merge_run_dir = tempfile.mkdtemp(prefix=self.MERGE_RUN_PREFIX, dir=self.MERGE_DIR)
+        return items
 
-                remaining -= 1
-                self.logger.info(f"📄 剩余待打印文件数:  {remaining}")
+    # 每轮合并文件子目录的前缀
+    MERGE_RUN_PREFIX = "pyautoprint_merge_"
 
-                time.sleep(self.DELAY_SECONDS)
+    def cleanup_merge_dirs(self):
+        """删除以前各轮合并文件子目录中的 PDF 和空的子目录；merge_dir 中的其他文件和目录不受影响"""
+        self._merge_run_dir = None
+        try:
+            names = os.listdir(self.MERGE_DIR)
+        except OSError:
+            return
+        for name in names:
+            run_dir = os.path.join(self.MERGE_DIR, name)
+            if not name.startswith(self.MERGE_RUN_PREFIX) or not os.path.isdir(run_dir):
+                continue
+            try:
+                for pdf in os.listdir(run_dir):
+                    if pdf.lower().endswith(".pdf"):
+                        os.remove(os.path.join(run_dir, pdf))
+                os.rmdir(run_dir)
+            except OSError as e:
+                self.logger.warning(f"⚠️ 清理合并文件失败: {run_dir} - {e}")
 
-            # 如果诊所目录文件全部打印完后，提示用户等待30秒
-            if self.ENABLE_WAIT_PROMPT and os.path.basename(root).isdigit():
-                msg = (
-                    f"📁 当前诊所打印完成: {os.path.basename(root)}\n📢 将在 {self.WAIT_PROMPT_SLEEP} 秒后继续打印下一个诊所...\n"
-                    "\n"
-                    "【确定】 = 不等待，立即打印"
-                )
-                self.logger.info(f"📁 当前诊所打印完成: {os.path.basename(root)}")
-                self.logger.info(f"📢 将在 {self.WAIT_PROMPT_SLEEP} 秒后继续打印下一个诊所...")
+    def stop_prerender(self):
+        if self.prerender is not None:
+            self.prerender.close()
+            self.prerender = None
+        if self.render_cache is not None:
+            stats = self.render_cache.stats()
+            if stats["hits"] or stats["misses"]:
+                self.logger.info(f"📊 渲染缓存: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+                                 f"{stats['entries']} 个文件 {stats['bytes'] / 1024 / 1024:.1f} MB, "
+                                 f"淘汰 {stats['evictions']} 个")
 
-                response = self.show_message_box_with_timeout(
-                    msg,
-                    "📢 打印完成",
-                    int(self.WAIT_PROMPT_SLEEP * 1000)
-                )
+    def _run(self) -> bool:
+        if not self._prepare_run():
+            return False
+        try:
+            return self._run_jobs()
+        except Cancelled:
+            self.logger.info("🛑 打印被用户中断")
+            return False
 
-                # if response == 6:  # IDYES
-                #     self.logger.info(f"✅ 用户选择等待，等待 {self.WAIT_PROMPT_SLEEP} 秒...")
-                #     time.sleep(self.WAIT_PROMPT_SLEEP)
-                # else:
-                #     self.logger.info("⏩ 用户选择跳过等待")
+    def _run_jobs(self) -> bool:
+        jobs = self.collect_jobs()
+        jobs = self.replay_journal(jobs)
+        jobs = self.preflight(jobs)
+        self.logger.info(f"📄 待打印文件数: {len(jobs)}")
+        self.progress = ProgressTracker(len(jobs), self.progress_callback)
+        self.schedule_prerender(jobs)
+        if self.MERGE_CLINIC_JOBS:
+            jobs = self.merge_jobs(jobs)
 
-                # 只显示一个按钮，点击继续打印
-                self.logger.info("⏩ 用户选择跳过等待")
+        if self.PARALLEL_DISPATCH:
+            # 每台打印机一个工作队列，同时打印
+            PrintDispatcher(self).run(jobs)
+        else:
+            self._run_sequential(jobs)
 
         # 所有文件打印完成，打印终止， 返回 False 状态 = 不再打印
         return False
+
+    def _run_watch(self) -> bool:
+        if not self._prepare_run():
+            return False
+
+        source = create_change_source(self.source_root, self.WATCH_USE_NOTIFICATIONS, self.logger,
+                                      sleep=self.cancel_token.sleep)
+        # 系统通知的等待不能被唤醒，分段等待以便及时响应停止
+        poll_timeout = self.WATCH_POLL_INTERVAL
+        if isinstance(source, Win32ChangeSource):
+            poll_timeout = min(poll_timeout, 0.25)
+        watcher = HotFolderWatcher(source, lambda name: job_kind(name) is not None, self.WATCH_SETTLE_SECONDS)
+        # 监控模式下文件陆续到达，无法判断诊所目录何时打印完，不弹出诊所完成提示
+        dispatcher = PrintDispatcher(self, clinic_prompts=False)
+        # 文件移走后才让 watcher 忘记它，避免移动前被当成新文件再次打印
+        self._on_file_moved = lambda job: watcher.forget(job.path)
+        self.progress = ProgressTracker(0, self.progress_callback)
+        self.logger.info(f"👀 开始监控源目录: {self.source_root} ({type(source).__name__})")
+
+        dispatcher.start()
+        started = time.monotonic()
+        try:
+            while self._is_running:
+                ready = watcher.poll(poll_timeout)
+                if not ready:
+                    continue
+                jobs = []
+                for path, size, mtime_ns in ready:
+                    is_monthly = self.is_monthly_file(os.path.basename(path))
+                    jobs.append(PrintJob(path, self.printer_for(is_monthly), is_monthly,
+                                         size=size, mtime_ns=mtime_ns))
+                jobs = self.replay_journal(self.scheduler.order(jobs, self.source_root))
+                jobs = self.preflight(jobs, summary=False)
+                self.progress.add(len(jobs))
+                self.schedule_prerender(jobs)
+                for job in jobs:
+                    self.logger.info(f"📥 新文件: {job.path}")
+                    dispatcher.submit(job)
+        finally:
+            watcher.close()
+            dispatcher.close()
+            dispatcher.join()
+            dispatcher.log_summary(time.monotonic() - started)
+            self.logger.info("👀 已停止监控源目录")
+        return False
+
+    def build_plan(self) -> PrintPlan:
+        """扫描源目录生成打印计划；目录索引在多次 run() 之间复用，未变化的目录不再重新列举"""
+        start = time.perf_counter()
+        with self.metrics.time("scan"):
+            self.plan = self.planner.build(self.source_root, self.cancel_token.should_continue)
+            self.plan.jobs = self.scheduler.order(self.plan.jobs, self.source_root)
+        index = self.planner.index
+        self.logger.info(f"🗂️ 扫描完成: {self.plan.total} 个文件, {len(self.plan.clinics())} 个目录, "
+                         f"耗时 {(time.perf_counter() - start) * 1000:.0f} 毫秒 "
+                         f"(重新列举 {index.scanned_dirs} 个目录, 复用 {index.reused_dirs} 个)")
+        for printer, count in self.plan.by_printer().items():
+            self.logger.info(f"🖨️ [{printer}]: {count} 个文件")
+        return self.plan
+
+    def pages_per_minute(self, printer) -> float:
+        return float(self.PRINTER_PAGES_PER_MINUTE.get(printer, self.PAGES_PER_MINUTE))
+
+    def preflight(self, jobs: List[PrintJob], summary: bool = True) -> List[PrintJob]:
+        """
+        打印前检查所有文件，返回可以打印的文件。
+
+        确定无法打开的文件（格式不对、zip 损坏、有打开密码）和读取失败的文件记录为失败并跳过，
+        默认留在源目录（quarantine_preflight 时移到隔离目录，读取失败的除外）；估算不出页数的文件只警告，照常打印。
+        summary 时输出各打印机的页数和预计打印时间。
+        """
+        if not self.PREFLIGHT or not jobs:
+            return jobs
+        with self.metrics.time("preflight"):
+            report = self.preflight_analyzer.run(jobs, self.cancel_token.should_continue)
+
+        quarantined = 0
+        for problem in report.problems:
+            self.logger.error(f"❌ 无法打印（{PREFLIGHT_NAMES[problem.status]}）: {problem.job.path} - {problem.detail}")
+            self._journal(problem.job, STATE_FAILED, problem.detail)
+            self.metrics.inc("preflight_problems_total", status=problem.status)
+            if (self.QUARANTINE_PREFLIGHT and problem.status != PREFLIGHT_UNREADABLE
+                    and self.should_quarantine(ERROR_PERMANENT)):
+                reason = f"{PREFLIGHT_NAMES[problem.status]}: {problem.detail}"
+                quarantined += self.quarantine_job(problem.job, reason)
+        for item in report.ok:
+            if item.detail:
+                self.logger.warning(f"⚠️ {item.detail}: {item.job.path}")
+        self.metrics.inc("preflight_pages_total", report.pages)
+
+        if summary:
+            self.logger.info(f"🔎 打印前检查: {len(jobs)} 个文件, 约 {report.pages} 页, "
+                             f"耗时 {report.elapsed * 1000:.0f} 毫秒")
+            estimates = report.estimates(self.pages_per_minute)
+            for estimate in estimates.values():
+                self.logger.info(f"🖨️ [{estimate.printer}]: {estimate.files} 个文件, 约 {estimate.pages} 页, "
+                                 f"预计 {format_eta(estimate.seconds)}")
+            seconds = [estimate.seconds for estimate in estimates.values()]
+            if seconds:
+                # 多打印机并行时整批耗时取最长的一台
+                total = max(seconds) if self.PARALLEL_DISPATCH else sum(seconds)
+                self.logger.info(f"⏱️ 预计打印时间: {format_eta(total)}")
+            if quarantined:
+                self.logger.warning(f"⚠️ {quarantined} 个文件无法打印，已移到隔离目录: {self.QUARANTINE_DIR}")
+            if len(report.problems) > quarantined:
+                self.logger.warning(f"⚠️ {len(report.problems) - quarantined} 个文件无法打印，已跳过并保留在源目录")
+        return [item.job for item in report.ok]
+
+    def collect_jobs(self) -> List[PrintJob]:
+        """按计划顺序返回所有待打印文件"""
+        return self.build_plan().jobs
+
+    def open_journal(self):
+        """打开打印任务日志"""
+        try:
+            self.journal = JobJournal(self.JOURNAL_PATH, self.source_root)
+            self.journal.compact()
+        except Exception as e:
+            self.logger.warning(f"⚠️ 打开打印任务日志失败，本轮不记录: {e}")
+            self.journal = None
+
+    def replay_journal(self, jobs: List[PrintJob]) -> List[PrintJob]:
+        """读取打印任务日志：已送到打印机但未移动的文件只补做移动，返回仍需打印的文件"""
+        if self.journal is None or not jobs:
+            return jobs
+        try:
+            states = self.journal.latest_states()
+        except Exception as e:
+            self.logger.warning(f"⚠️ 读取打印任务日志失败: {e}")
+            return jobs
+
+        remaining = []
+        new_keys = []
+        for job in jobs:
+            job.journal_key = self.journal.key_for(job.path, job.size, job.mtime_ns)
+            state = states.get(job.journal_key)
+            if state in SENT_STATES:
+                # 上次已送到打印机，只补做移动
+                self.logger.info(f"♻️ 上次已打印（{state}），跳过打印: {job.path}")
+                self.move_job(job)
+                continue
+            if state is None:
+                new_keys.append(job.journal_key)
+            remaining.append(job)
+
+        try:
+            self.journal.record_many(new_keys, STATE_DISCOVERED)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 写入打印任务日志失败: {e}")
+        if len(remaining) < len(jobs):
+            self.logger.info(f"♻️ 从打印任务日志恢复: {len(jobs) - len(remaining)} 个文件无需重新打印")
+        return remaining
+
+    def start_metrics_server(self):
+        """metrics_port 不为 0 时在本机端口提供 /metrics"""
+        if self.METRICS_PORT and self._metrics_server is None:
+            try:
+                self._metrics_server = MetricsServer(self.metrics, self.METRICS_PORT, logger=self.logger)
+                self._metrics_server.start()
+            except OSError as e:
+                self._metrics_server = None
+                self.logger.warning(f"⚠️ 无法启动指标端口 {self.METRICS_PORT}: {e}")
+
+    def write_metrics_textfile(self, force=False):
+        """写入 Prometheus 文本文件，打印过程中最多每 5 秒写一次"""
+        if not self.METRICS_TEXTFILE:
+            return
+        now = time.monotonic()
+        if not force and now - self._metrics_written_at < 5:
+            return
+        self._metrics_written_at = now
+        try:
+            self.metrics.write_textfile(self.METRICS_TEXTFILE)
+        except OSError as e:
+            self.logger.warning(f"⚠️ 写入指标文件失败: {e}")
+
+    def publish_metrics(self):
+        """本轮结束：输出阶段耗时表，写入指标文件，关闭指标端口"""
+        if self.METRICS_SUMMARY:
+            lines = self.metrics.summary_lines()
+            if lines:
+                self.logger.info("📈 本轮各阶段耗时:")
+                for line in lines:
+                    self.logger.info(line)
+        self.write_metrics_textfile(force=True)
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+            self._metrics_server = None
+
+    def _journal(self, job: PrintJob, state: str, detail: str = ""):
+        """记录文件状态，日志写入失败不影响打印"""
+        if self.journal is None or job.journal_key is None:
+            return
+        try:
+            with self.metrics.time("journal"):
+                self.journal.record(job.journal_key, state, job.printer, detail)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 写入打印任务日志失败: {e}")
+
+    def log_retry_report(self):
+        """输出本轮失败过的文件（重试后成功、失败、隔离、停止时仍在等待重试），并保存为 JSON"""
+        unfinished = self.retry_queue.drain()
+        if unfinished:
+            self.logger.warning(f"⚠️ 停止时还有 {len(unfinished)} 个文件在等待重试，保留在源目录，下次运行时重新打印")
+        entries = self.retry_report.entries()
+        if not entries:
+            return
+        counts = self.retry_report.counts()
+        self.logger.info("📋 失败重试报告: " + ", ".join(f"{OUTCOME_NAMES[outcome]} {count} 个"
+                                                    for outcome, count in counts.items() if count))
+        for entry in entries:
+            error = ERROR_NAMES.get(entry.get("error_class"), "")
+            line = f"   - [{OUTCOME_NAMES[entry['outcome']]}] {entry['path']} (失败 {entry['attempts']} 次, {error})"
+            if entry.get("quarantined_to"):
+                line += f" -> {entry['quarantined_to']}"
+            self.logger.info(line)
+        if any(entry["outcome"] == OUTCOME_QUARANTINED for entry in entries):
+            self.logger.info(f"🚧 隔离目录: {self.QUARANTINE_DIR}")
+
+        try:
+            report_dir = ensure_directory_exists(get_app_path("logs"))
+            report_path = os.path.join(report_dir, datetime.now().strftime("retry_report_%Y-%m-%d_%H-%M-%S.json"))
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump({"source_dir": self.source_root, "counts": counts, "files": entries}, f,
+                          ensure_ascii=False, indent=2)
+            self.logger.info(f"📋 失败重试报告已保存: {report_path}")
+        except OSError as e:
+            self.logger.warning(f"⚠️ 保存失败重试报告失败: {e}")
+
+    def close_journal(self):
+        if self.journal is not None:
+            if self.journal.write_count:
+                self.logger.info(f"📒 打印任务日志: {self.journal.write_count} 次写入, "
+                                 f"平均 {self.journal.write_seconds * 1000 / self.journal.write_count:.2f} 毫秒")
+            try:
+                self.journal.close()
+            except Exception as e:
+                self.logger.warning(f"⚠️ 关闭打印任务日志失败: {e}")
+            self.journal = None
+
+    def process_job(self, job: PrintJob) -> bool:
+        """打印一个文件，成功后移动到备份目录"""
+        if isinstance(job, PrintBatch):
+            return self.process_batch(job)
+
+        # 提交给打印机之前只记为“开始打印”，此时中断的文件下次运行时重新打印
+        self._journal(job, STATE_STARTED)
+        self._take_failure()
+
+        try:
+            with self._submitting([job]):
+                success = self.print_with_health(job, self._print_job)
+        except Cancelled as e:
+            self._job_cancelled(job, e)
+            raise
+
+        if success:
+            self._job_finished(job, True)
+        else:
+            self._job_failed(job)
+        return success
+
+    def _print_job(self, job: PrintJob, printer: Optional[str]) -> bool:
+        if job.kind == "pdf":
+            with self.metrics.time("print_pdf") as timing:
+                success = self.print_pdf(job.path, use_alt=job.is_monthly, printer=printer)
+                timing.failed = not success
+            return success
+        if job.kind == "excel":
+            with self.metrics.time("print_excel") as timing:
+                success = self.print_excel(job.path, use_alt=job.is_monthly, printer=printer)
+                timing.failed = not success
+            return success
+        self.logger.error(f"❌ 不支持的文件类型: {job.path}")
+        return False
+
+    def print_with_health(self, job: PrintJob, print_func: Callable[[PrintJob, Optional[str]], Optional[bool]]):
+        """
+        通过健康监控选择打印机后调用 print_func(job, 打印机)。
+
+        打印机熔断时改用备用打印机或等待恢复；打印失败且打印机随即熔断（缺纸、脱机等）时，
+        恢复后重试该文件，最多 HEALTH_RETRY_LIMIT 次；其他失败照常返回 False。
+        """
+        if self.health is None:
+            return print_func(job, None)
+        attempts = 0
+        while True:
+            printer = self.health.acquire(job.printer, self.cancel_token.should_continue)
+            if printer is None:
+                raise Cancelled("等待打印机恢复")
+            job.spooled_to = printer
+            result = print_func(job, printer)
+            if result is not False:
+                if result:
+                    self.health.record_success(printer)
+                return result
+            if not self.health.record_failure(printer) or attempts >= self.HEALTH_RETRY_LIMIT:
+                return False
+            attempts += 1
+            self.metrics.inc("health_retries_total", printer=printer)
+            self.logger.warning(f"🔁 [{printer}] 打印机异常导致打印失败，恢复后重试 "
+                                f"({attempts}/{self.HEALTH_RETRY_LIMIT}): {job.path}")
+
+    def _job_cancelled(self, job: PrintJob, e: Cancelled):
+        if e.submitted:
+            self.logger.info(f"🛑 已取消，文件已提交给打印机，下次运行时只移动: {job.path}")
+        else:
+            # 还没有提交，下次运行时重新打印
+            self._journal(job, STATE_DISCOVERED)
+            self.logger.info(f"🛑 已取消: {job.path}")
+
+    @contextmanager
+    def _submitting(self, jobs: List[PrintJob]):
+        """在本线程打印 jobs：其间 _note_submitted() 把它们记为已提交"""
+        self._printing.jobs = jobs
+        try:
+            yield
+        finally:
+            self._printing.jobs = None
+
+    def _note_submitted(self):
+        """打印任务已交给打印机（阅读器 / PrintOut 返回）：记为已提交，下次运行时不再打印"""
+        for job in getattr(self._printing, "jobs", None) or []:
+            self._journal(job, STATE_SUBMITTED)
+
+    def _note_failure(self, error: BaseException, stage: str):
+        """记录本线程打印失败的原因，由 _job_failed() 判断错误类别"""
+        self._failures.last = (error, stage)
+
+    def _take_failure(self):
+        failure = getattr(self._failures, "last", None) or (None, "")
+        self._failures.last = None
+        return failure
+
+    def _job_failed(self, job: PrintJob):
+        """
+        打印失败：按错误类别的策略放入重试队列，或移到隔离目录，或记录为失败。
+
+        job 为 PrintBatch 时整批重试；重试用尽后各文件记录为失败（合并的批次不隔离）。
+        """
+        error, stage = self._take_failure()
+        error_class = classify_error(error, stage)
+        if not os.path.exists(job.path):
+            error_class = ERROR_PERMANENT
+        policy = self.retry_policies[error_class]
+        job.attempts += 1
+        message = str(error) if error is not None else ""
+
+        if self.RETRY_FAILED and job.attempts <= policy.retries and self._is_running:
+            delay = policy.delay_for(job.attempts)
+            for f in job.files:
+                # 还没有打印，中途退出时下次运行重新打印
+                self._journal(f, STATE_DISCOVERED, f"retry {job.attempts}: {message}")
+            self.retry_report.record(job, OUTCOME_RETRYING, error_class, message)
+            self.retry_queue.push(job, delay)
+            self.metrics.inc("retries_total", error_class=error_class, printer=job.printer)
+            self.logger.warning(f"🔁 {ERROR_NAMES[error_class]}，{delay:.0f} 秒后重试 "
+                                f"({job.attempts}/{policy.retries}): {job.path}")
+            return
+
+        reason = f"{ERROR_NAMES[error_class]}: {message}"
+        quarantined = (self.should_quarantine(error_class) and not isinstance(job, PrintBatch)
+                       and os.path.exists(job.path) and self.quarantine_job(job, reason, error_class))
+        if self.RETRY_FAILED and not quarantined:
+            self.retry_report.record(job, OUTCOME_FAILED, error_class, message)
+        for f in job.files:
+            self._job_finished(f, False, detail=reason)
+
+    def should_quarantine(self, error_class: str) -> bool:
+        return self.RETRY_FAILED and self.QUARANTINE_FAILED and self.retry_policies[error_class].quarantine
+
+    def quarantine_job(self, job: PrintJob, reason: str, error_class: str = ERROR_PERMANENT) -> bool:
+        """把无法打印的文件移到隔离目录，移动失败时返回 False（文件留在源目录）"""
+        dest = self.quarantine.move(job.path, reason)
+        if dest is None:
+            return False
+        self.logger.warning(f"🚧 已移到隔离目录（{reason}）: {job.path} -> {dest}")
+        self.retry_report.record(job, OUTCOME_QUARANTINED, error_class, reason, dest)
+        self.metrics.inc("quarantined_total", error_class=error_class)
+        if self._on_file_moved is not None:
+            self._on_file_moved(job)
+        return True
+
+    def _job_finished(self, job: PrintJob, success: bool, detail: str = ""):
+        """记录文件的打印结果，成功时移动到备份目录，并更新进度和指标"""
+        if success:
+            self._journal(job, STATE_SPOOLED)
+            self.move_job(job)
+            if job.attempts:
+                self.retry_report.resolved(job)
+        else:
+            self._journal(job, STATE_FAILED, detail)
+        self.metrics.inc("jobs_total", kind=job.kind or "unknown", printer=job.printer,
+                         result="ok" if success else "failed")
+
+        if self.progress is not None:
+            self.progress.job_finished(success)
+            self.logger.info(f"📊 进度: {self.progress.done}/{self.progress.total}, "
+                             f"预计剩余 {format_eta(self.progress.eta())}")
+            self.metrics.set_gauge("files_remaining", self.progress.total - self.progress.done - self.progress.failed)
+        self.metrics.set_gauge("move_queue_pending", self.mover.pending)
+        self.write_metrics_textfile()
+
+    def process_batch(self, batch: PrintBatch) -> bool:
+        """打印合并的文件：一个打印任务确认后各文件分别记录和移动；不能合并时逐个打印"""
+        for job in batch.jobs:
+            self._journal(job, STATE_STARTED)
+        try:
+            with self.metrics.time("print_batch") as timing, self._submitting(batch.jobs):
+                success = self.print_with_health(batch, self.print_batch)
+                timing.failed = success is False
+        except Cancelled as e:
+            for job in batch.jobs:
+                self._job_cancelled(job, e)
+            raise
+
+        if success is None:
+            return self._process_batch_separately(batch)
+        if success:
+            for job in batch.jobs:
+                job.attempts = batch.attempts
+                self._job_finished(job, True)
+        else:
+            self._job_failed(batch)
+        return success
+
+    def _process_batch_separately(self, batch: PrintBatch) -> bool:
+        pacer = self._create_pacer()
+        all_ok = True
+        for index, job in enumerate(batch.jobs):
+            if index:
+                previous = batch.jobs[index - 1]
+                self.metrics.observe("pacing_wait", pacer.wait(previous.spooled_to or job.printer,
+                                                               self.cancel_token.should_continue))
+            if not self.process_job(job):
+                all_ok = False
+                if not self.RETRY_FAILED:
+                    # 与逐个打印时相同：出错后不再打印该队列的后续文件
+                    return False
+        return all_ok
+
+    def render_for_merge(self, job: PrintJob, pdf_path: str) -> bool:
+        """把 Excel 按打印时的页面设置导出为 PDF（优先使用渲染缓存）"""
+        self.cancel_token.check("导出 Excel")
+        is_print_firstPage = self.config.get("print_firstPage", False)
+        key = self._render_key(job.path, job.is_monthly, "excel", is_print_firstPage)
+        if key is not None and self.render_cache.copy_to(key, pdf_path):
+            return True
+        try:
+            with self.metrics.time("excel_render"):
+                rendered = self.render_excel_to_pdf(job.path, pdf_path, job.is_monthly)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Excel 导出 PDF 失败，逐个打印: {job.path} - {e}")
+            return False
+        if rendered and key is not None:
+            self.save_render(key, pdf_path)
+        return rendered
+
+    def print_batch(self, batch: PrintBatch, printer: Optional[str] = None) -> Optional[bool]:
+        """
+        把批次中的文件合并为一个 PDF 并提交一个打印任务，返回是否成功；无法合并时返回 None。
+
+        Excel 文件使用预渲染的 PDF，还没有预渲染时在本线程导出；只打印首页时每个文件取第一页后再合并。
+        """
+        is_print_firstPage = self.config.get("print_firstPage", False)
+        pdf_paths = []
+        taken = []
+        rendered = []
+        try:
+            for index, job in enumerate(batch.jobs):
+                if job.kind == "pdf":
+                    pdf_paths.append(job.path)
+                    continue
+                pdf_path = None
+                if self.prerender is not None:
+                    taken.append(job.path)
+                    pdf_path = self.prerender.take(job.path, self.cancel_token.job_should_continue)
+                if not pdf_path:
+                    pdf_path = os.path.join(self._merge_run_dir, f"{batch.clinic}_{batch.id}_{index}.pdf")
+                    rendered.append(pdf_path)
+                    if not self.render_for_merge(job, pdf_path):
+                        return None
+                pdf_paths.append(pdf_path)
+
+            self.cancel_token.check("合并 PDF")
+            merged_path = os.path.join(self._merge_run_dir, f"{batch.clinic}_{batch.id}.pdf")
+            try:
+                with self.metrics.time("pdf_merge"):
+                    pages = merge_pdfs(pdf_paths, merged_path, first_page_only=is_print_firstPage)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 合并 PDF 失败，逐个打印: {batch.root} - {e}")
+                return None
+        finally:
+            for path in taken:
+                self.prerender.release(path)
+            for path in rendered:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self.logger.info(f"📚 合并打印 {len(batch.jobs)} 个文件, {pages} 页: {batch.root}")
+        for job in batch.jobs:
+            self.logger.info(f"   - {job.name}")
+        try:
+            # 合并时已按“只打印首页”取页，整个文件都要打印
+            return self.print_pdf(merged_path, batch.is_monthly, first_page_only=False, printer=printer)
+        finally:
+            if self.PDF_WAIT_FOR != "none":
+                # 已确认进入打印队列，合并文件不再需要；不等待确认时留到下一轮开始时清理
+                try:
+                    os.remove(merged_path)
+                except OSError:
+                    pass
+
+    def _run_sequential(self, jobs: List[PrintJob]) -> bool:
+        """单线程依次打印所有文件；失败的文件到期后插在下一个文件之前重试"""
+        pending = deque(jobs)
+        # 各诊所剩余的文件数（合并的批次按其中的文件计），用于判断诊所边界
+        remaining = Counter(f.root for job in jobs for f in job.files)
+        # 每台打印机上各诊所剩余的文件数，用于判断该打印机的诊所边界
+        printer_remaining = Counter((f.printer, f.root) for job in jobs for f in job.files)
+        while pending or self.retry_queue.pending():
+            if not self._is_running:  # 添加中断检查
+                self.logger.info("🛑 打印被用户中断")
+                return False
+
+            job = self.retry_queue.pop_due()
+            if job is None:
+                if not pending:
+                    # 只剩等待重试的文件
+                    self.cancel_token.sleep(self.retry_queue.wait_time() or 0)
+                    continue
+                job = pending.popleft()
+
+            if not self.process_job(job) and not self.RETRY_FAILED:
+                return False
+
+            settled = self.retry_queue.settled(job)
+            more = bool(pending or self.retry_queue.pending())
+            if settled:
+                remaining[job.root] -= settled
+                self.logger.info(f"📄 剩余待打印文件数:  {remaining[job.root]}")
+
+                printer_remaining[(job.printer, job.root)] -= settled
+                if remaining[job.root] == 0:
+                    self.sweep_clinic(job.root)
+                if printer_remaining[(job.printer, job.root)] == 0 and more:
+                    self.on_clinic_finished(job.root, job.printer)
+            if more:
+                # 等待打印队列有空位再提交下一个文件
+                self.metrics.observe("pacing_wait", self.pacer.wait(job.spooled_to or job.printer,
+                                                                    self.cancel_token.should_continue))
+        return True
+
+    def should_pause(self, printer) -> bool:
+        """诊所打印完后该打印机是否需要暂停"""
+        if self.WAIT_PROMPT_PRINTERS:
+            return printer in self.WAIT_PROMPT_PRINTERS
+        return printer == self.DEFAULT_PRINTER
+
+    def on_clinic_finished(self, root, printer=None):
+        """
+        诊所目录的文件在某台打印机上打印完后暂停该打印机 WAIT_PROMPT_SLEEP 秒（如换纸）。
+
+        只阻塞调用线程，即该打印机的队列；界面显示倒计时并可跳过，停止打印时立即结束。
+        """
+        clinic = os.path.basename(root)
+        if not (self.ENABLE_WAIT_PROMPT and clinic.isdigit()):
+            return
+        printer = printer or self.DEFAULT_PRINTER
+        if not self.should_pause(printer):
+            return
+
+        self.logger.info(f"📁 当前诊所打印完成: {clinic} [{printer}]")
+        self.logger.info(f"📢 [{printer}] 将在 {self.WAIT_PROMPT_SLEEP} 秒后继续打印下一个诊所...")
+        pause = self.pauses.begin(printer, clinic, self.WAIT_PROMPT_SLEEP)
+        with self.metrics.time("clinic_pause"):
+            reason = self.pauses.wait(pause, self.cancel_token.should_continue)
+        if reason == PAUSE_SKIPPED:
+            self.logger.info(f"⏩ [{printer}] 用户选择跳过等待")
+        elif reason == PAUSE_STOPPED:
+            self.logger.info(f"🛑 [{printer}] 停止打印，结束等待")
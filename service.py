@@ -0,0 +1,48 @@
+"""
+Windows 服务入口：以服务方式运行监控模式，不依赖界面，开机后无人值守自动打印。
+
+    python service.py install        # 安装服务（需要管理员权限），之后 python service.py start
+    python service.py stop / remove
+
+服务使用 config/settings.json 中的设置（与界面、cli.py 相同），日志写入 logs 目录；
+停止服务时打印完正在打印的文件后退出。
+"""
+import sys
+
+import servicemanager
+import win32service
+import win32serviceutil
+
+from cli import EXIT_OK, HeadlessRunner, load_config
+
+
+class AutoPrintService(win32serviceutil.ServiceFramework):
+    _svc_name_ = "PyAutoPrint"
+    _svc_display_name_ = "自动打印服务"
+    _svc_description_ = "监控源目录，按界面保存的设置自动打印出货单和月结单"
+
+    def __init__(self, args):
+        super().__init__(args)
+        self.runner = HeadlessRunner(load_config(overrides={"watch_mode": True}), quiet=True)
+
+    def SvcStop(self):
+        self.ReportServiceStatus(win32service.SERVICE_STOP_PENDING)
+        self.runner.stop(drain=True)
+
+    def SvcDoRun(self):
+        servicemanager.LogInfoMsg(f"{self._svc_display_name_} 已启动")
+        exit_code = self.runner.run(watch=True)
+        if exit_code == EXIT_OK:
+            servicemanager.LogInfoMsg(f"{self._svc_display_name_} 已停止")
+        else:
+            servicemanager.LogErrorMsg(f"{self._svc_display_name_} 异常退出，退出码 {exit_code}，详见 logs 目录")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        # 由服务控制管理器启动
+        servicemanager.Initialize()
+        servicemanager.PrepareToHostSingle(AutoPrintService)
+        servicemanager.StartServiceCtrlDispatcher()
+    else:
+        win32serviceutil.HandleCommandLine(AutoPrintService)
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+class FakeClock:
+    """可手动推进的时钟，代替 time.monotonic 注入到熔断器、重试队列等"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    sleep = advance
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def core_factory(tmp_path, monkeypatch):
+    """在临时目录中创建使用模拟后端的 PrinterCore（日志、打印任务日志、缓存都写到 tmp_path）"""
+    import printer_core
+
+    monkeypatch.setattr(printer_core, "get_app_path", lambda *paths: str(tmp_path.joinpath("app", *paths)))
+    source = tmp_path / "src"
+    source.mkdir()
+    cores = []
+
+    def create(backend=None, **overrides):
+        config = {
+            "source_dir": str(source),
+            "printer_backend": "simulated",
+            "selected_printer": "模拟针式打印机",
+            "monthly_printer_name": "模拟激光打印机",
+            "delay_seconds": 0,
+            "pacing_mode": "fixed",
+            "enable_wait_prompt": False,
+            "health_monitor": False,
+            "async_move": False,
+        }
+        config.update(overrides)
+        core = printer_core.PrinterCore(config, None, lambda message: None, backend=backend)
+        cores.append(core)
+        return core
+
+    create.source = source
+    yield create
+    for core in cores:
+        for handler in core.logger.handlers[:]:
+            handler.close()
+            core.logger.removeHandler(handler)
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from core.printer_backend import SimulatedBackend, SimulatedSpooler, SpoolerError, create_backend
+from core.printer_status import PRINTER_STATUS_PAPER_OUT
+from synthetic_tree import make_clinic_tree
+
+
+def test_spooler_models_latency_and_print_speed():
+    spooler = SimulatedSpooler(job_latency=0.02, pages_per_minute=600)
+    job = spooler.submit("P", "a.pdf", pages=3)
+    assert spooler.job_duration(job) == pytest.approx(0.02 + 0.3)
+    assert spooler.wait_idle(timeout=2)
+    assert job.finished_at - job.started_at >= 0.3
+    stats = spooler.stats()["printers"]["P"]
+    assert (stats["completed"], stats["pages"], stats["queued"]) == (1, 3, 0)
+    assert stats["busy_seconds"] == pytest.approx(0.32, abs=0.05)
+
+
+def test_spooler_rejects_jobs_beyond_queue_depth():
+    spooler = SimulatedSpooler(job_latency=1, max_queue_depth=2)
+    spooler.set_status("P", PRINTER_STATUS_PAPER_OUT)
+    spooler.submit("P", "a.pdf")
+    spooler.submit("P", "b.pdf")
+    with pytest.raises(SpoolerError):
+        spooler.submit("P", "c.pdf")
+    assert (spooler.submitted, spooler.rejected) == (2, 1)
+
+
+def test_blocked_printer_holds_jobs_until_cleared():
+    spooler = SimulatedSpooler()
+    spooler.set_status("P", PRINTER_STATUS_PAPER_OUT)
+    job = spooler.submit("P", "a.pdf")
+    time.sleep(0.1)
+    assert job.status == "queued"
+    spooler.set_status("P", 0)
+    assert spooler.wait_idle(timeout=1)
+    assert job.status == "done"
+
+
+def test_offline_printer_rejects_and_failure_injection_is_seeded():
+    spooler = SimulatedSpooler()
+    spooler.set_offline("P")
+    with pytest.raises(SpoolerError, match="脱机"):
+        spooler.submit("P", "a.pdf")
+    spooler.set_offline("P", False)
+    spooler.submit("P", "a.pdf")
+
+    def failures(seed):
+        flaky = SimulatedSpooler(failure_rate=0.5, seed=seed)
+        result = []
+        for index in range(20):
+            try:
+                flaky.submit("P", f"{index}.pdf")
+            except SpoolerError:
+                result.append(index)
+        return result
+
+    assert failures(7) == failures(7)
+    assert 0 < len(failures(7)) < 20
+
+
+def test_create_backend():
+    backend = create_backend({"printer_backend": "simulated", "simulated_backend": {"printers": ["A", "B"]}})
+    assert isinstance(backend, SimulatedBackend)
+    assert backend.list_printers() == ["A", "B"]
+    with pytest.raises(ValueError):
+        create_backend({"printer_backend": "cups"})
+
+
+def test_run_end_to_end_on_simulated_backend(core_factory):
+    counts = make_clinic_tree(str(core_factory.source), clinics=3, files_per_clinic=4, lock_ratio=0)
+    backend = SimulatedBackend(seed=1)
+    core_factory(backend=backend).run()
+
+    total = counts["pdf"] + counts["xlsx"] + counts["monthly"]
+    assert backend.spooler.submitted == total
+    assert backend.spooler.wait_idle(timeout=5)
+    stats = backend.spooler.stats()["printers"]
+    assert stats["模拟激光打印机"]["completed"] == counts["monthly"]
+    assert stats["模拟针式打印机"]["completed"] == counts["pdf"] + counts["xlsx"]
+    assert not [path for path in core_factory.source.rglob("*") if path.is_file()]
@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+
+from core.excel_session import ExcelApplicationFactory, ExcelSessionPool
+from core.printer_backend import SimulatedBackend, SimulatedComError
+from core.retry import OUTCOME_RECOVERED
+from synthetic_tree import make_xlsx
+
+
+class FakeApp:
+    def __init__(self):
+        self.quit_called = False
+        self.Workbooks = []
+
+    def Quit(self):
+        self.quit_called = True
+
+
+class CountingFactory(ExcelApplicationFactory):
+    def __init__(self):
+        self.apps = []
+        self.initialized = 0
+        self.uninitialized = 0
+
+    def initialize(self):
+        self.initialized += 1
+
+    def uninitialize(self):
+        self.uninitialized += 1
+
+    def create(self):
+        app = FakeApp()
+        self.apps.append(app)
+        return app
+
+    def quit(self, app):
+        app.Quit()
+
+
+def test_session_is_reused_until_recycle_threshold():
+    factory = CountingFactory()
+    pool = ExcelSessionPool(factory, size=1, recycle_after=3)
+    for _ in range(3):
+        session = pool.acquire()
+        pool.release(session)
+    assert len(factory.apps) == 1
+    assert factory.apps[0].quit_called
+    assert pool.recycled_count == 1
+
+    pool.release(pool.acquire())
+    assert len(factory.apps) == 2
+
+
+def test_failed_session_is_recycled_immediately():
+    factory = CountingFactory()
+    pool = ExcelSessionPool(factory, recycle_after=50)
+    session = pool.acquire()
+    pool.release(session, failed=True)
+    assert factory.apps[0].quit_called
+    assert pool.acquire().app is not factory.apps[0]
+
+
+def test_session_context_manager_recycles_on_error():
+    factory = CountingFactory()
+    pool = ExcelSessionPool(factory)
+    with pytest.raises(ValueError):
+        with pool.session():
+            raise ValueError()
+    assert factory.apps[0].quit_called
+
+
+def test_pool_size_limit_and_shutdown():
+    factory = CountingFactory()
+    pool = ExcelSessionPool(factory, size=1)
+    pool.acquire()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.shutdown()
+    assert factory.apps[0].quit_called
+    assert (factory.initialized, factory.uninitialized) == (1, 1)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_pool_is_bound_to_one_thread():
+    pool = ExcelSessionPool(CountingFactory())
+    pool.release(pool.acquire())
+    errors = []
+
+    def other():
+        try:
+            pool.acquire()
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    thread.join()
+    assert errors
+
+
+def test_excel_start_failure_goes_through_retry_queue(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    make_xlsx(str(clinic / "送货单.xlsx"))
+    make_xlsx(str(clinic / "月结单.xlsx"))
+
+    backend = SimulatedBackend()
+    factory = backend.excel_factory()
+    create = factory.create
+    failures = []
+
+    def create_busy():
+        if not failures:
+            failures.append(1)
+            # DispatchEx 时 Excel 忙
+            raise SimulatedComError(-2147418111, "Call was rejected by callee.")
+        return create()
+
+    factory.create = create_busy
+    core = core_factory(backend=backend, retry_policies={"com_busy": {"delay": 0}})
+    core.run()
+    # 启动失败的文件重试后打印，同一打印机队列中的其他文件照常打印
+    assert backend.spooler.submitted == 2
+    assert core.retry_report.counts()[OUTCOME_RECOVERED] == 1
+    assert not list(clinic.glob("*.xlsx"))
+
+
+def test_fake_page_setup_charges_only_explicit_writes(monkeypatch):
+    from core.printer_backend import FakeExcelApplication, FakeSheet
+
+    sleeps = []
+    monkeypatch.setattr("core.printer_backend.time.sleep", sleeps.append)
+    app = FakeExcelApplication(SimulatedBackend(page_setup_write_seconds=0.05))
+    setup = FakeSheet("Sheet1", app).PageSetup
+    # 打开工作表时的默认设置不计入耗时
+    assert sleeps == []
+    assert setup.PaperSize == 9 and setup.Zoom == 100
+
+    setup.Zoom = False
+    setup.FitToPagesWide = 1
+    assert sleeps == [0.05, 0.05]
+    app.PrintCommunication = False
+    setup.FitToPagesTall = False
+    assert len(sleeps) == 2
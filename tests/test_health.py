@@ -0,0 +1,130 @@
+import pytest
+
+from core.health import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, PrinterHealthMonitor
+from core.printer_backend import SimulatedBackend
+from core.printer_status import PRINTER_STATUS_OFFLINE, PRINTER_STATUS_PAPER_OUT, QueueState
+from synthetic_tree import make_pdf
+
+
+class FakePrinters:
+    """可随时修改状态位的打印机，代替 backend.get_queue_state"""
+
+    def __init__(self, **status):
+        self.status = dict(status)
+
+    def __call__(self, printer):
+        if printer not in self.status:
+            return None
+        return QueueState(0, self.status[printer])
+
+
+def test_breaker_opens_and_recovers_after_healthy_checks(clock):
+    breaker = CircuitBreaker("P", recovery_checks=2, clock=clock)
+    assert breaker.observe(0) is None and breaker.allows
+
+    assert breaker.observe(PRINTER_STATUS_PAPER_OUT) == BREAKER_OPEN
+    assert not breaker.allows and breaker.reason == "缺纸"
+    assert breaker.observe(PRINTER_STATUS_PAPER_OUT | PRINTER_STATUS_OFFLINE) is None
+    assert breaker.reason == "缺纸, 脱机"
+
+    clock.advance(10)
+    assert breaker.observe(0) is None
+    # 恢复前再次异常，重新计数
+    assert breaker.observe(PRINTER_STATUS_PAPER_OUT) is None
+    assert breaker.observe(0) is None
+    assert breaker.observe(0) == BREAKER_HALF_OPEN
+    assert breaker.allows
+
+    clock.advance(5)
+    assert breaker.record_success() == BREAKER_CLOSED
+    assert breaker.trips == 1
+    # 只统计暂停的时间，不含试打
+    assert breaker.open_seconds == pytest.approx(10)
+
+
+def test_half_open_failure_reopens(clock):
+    breaker = CircuitBreaker("P", recovery_checks=1, clock=clock)
+    breaker.observe(PRINTER_STATUS_OFFLINE)
+    assert breaker.observe(0) == BREAKER_HALF_OPEN
+    assert breaker.record_failure(0) == BREAKER_OPEN
+    assert breaker.trips == 2
+
+
+def test_failure_while_closed_only_opens_on_blocking_status(clock):
+    breaker = CircuitBreaker("P", clock=clock)
+    assert breaker.record_failure(None) is None
+    assert breaker.record_failure(0) is None
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.record_failure(PRINTER_STATUS_OFFLINE) == BREAKER_OPEN
+
+
+def test_unreadable_status_half_opens_after_cooldown(clock):
+    breaker = CircuitBreaker("P", cooldown=30, clock=clock)
+    breaker.observe(PRINTER_STATUS_OFFLINE)
+    clock.advance(29)
+    assert breaker.observe(None) is None
+    clock.advance(1)
+    assert breaker.observe(None) == BREAKER_HALF_OPEN
+
+
+def test_monitor_fails_over_and_returns_to_primary(clock):
+    printers = FakePrinters(A=0, B=0)
+    changes = []
+    monitor = PrinterHealthMonitor(printers, recovery_checks=1, failover={"A": ["B"]}, clock=clock,
+                                   listener=lambda printer, state, reason: changes.append((printer, state)))
+    monitor.watch(["A"])
+    assert set(monitor.breakers) == {"A", "B"}
+    assert monitor.acquire("A") == "A"
+
+    printers.status["A"] = PRINTER_STATUS_PAPER_OUT
+    monitor.check_all()
+    assert monitor.acquire("A") == "B"
+
+    printers.status["A"] = 0
+    monitor.check_all()
+    # 试打时回到原打印机
+    assert monitor.acquire("A") == "A"
+    monitor.record_success("A")
+    assert changes == [("A", BREAKER_OPEN), ("A", BREAKER_HALF_OPEN), ("A", BREAKER_CLOSED)]
+
+
+def test_monitor_blocks_only_when_no_backup_is_available(clock):
+    printers = FakePrinters(A=PRINTER_STATUS_OFFLINE, B=PRINTER_STATUS_PAPER_OUT)
+    monitor = PrinterHealthMonitor(printers, failover={"A": ["B"]}, clock=clock)
+    monitor.watch(["A"])
+    monitor.check_all()
+    polls = []
+
+    def should_continue():
+        polls.append(1)
+        return len(polls) < 3
+
+    assert monitor.acquire("A", should_continue, poll_interval=0.01) is None
+    assert len(polls) == 3
+    # 其他打印机不受影响
+    assert monitor.acquire("C") == "C"
+
+
+def test_record_failure_checks_status_immediately(clock):
+    printers = FakePrinters(A=0)
+    monitor = PrinterHealthMonitor(printers, clock=clock)
+    assert monitor.record_failure("A") is False
+    printers.status["A"] = PRINTER_STATUS_OFFLINE
+    assert monitor.record_failure("A") is True
+    assert monitor.states()[0]["state"] == BREAKER_OPEN
+
+
+def test_offline_printer_fails_over_to_backup(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    for index in range(3):
+        make_pdf(str(clinic / f"送货单{index}.pdf"))
+    backend = SimulatedBackend()
+    backend.spooler.set_offline("模拟针式打印机")
+    core_factory(backend=backend, health_monitor=True, health_check_interval=0.05,
+                 printer_classes={"模拟针式打印机": "针式", "模拟针式打印机2": "针式"},
+                 printer_failover={"模拟针式打印机": ["模拟针式打印机2"]}).run()
+
+    stats = backend.spooler.stats()["printers"]
+    assert stats["模拟针式打印机2"]["completed"] + stats["模拟针式打印机2"]["queued"] == 3
+    assert not list(clinic.glob("*.pdf"))
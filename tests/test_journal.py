@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from core.journal import (JobJournal, SENT_STATES, STATE_DISCOVERED, STATE_MOVED, STATE_SPOOLED, STATE_STARTED,
+                          STATE_SUBMITTED)
+from core.printer_backend import SimulatedBackend
+from synthetic_tree import make_pdf, make_xlsx
+
+
+class SimulatedCrash(BaseException):
+    """模拟进程崩溃 / 打印线程被 terminate()：不会被打印代码中的 except Exception 捕获"""
+
+
+def crash(*args, **kwargs):
+    raise SimulatedCrash()
+
+
+def journal_state(core, path):
+    journal = JobJournal(core.JOURNAL_PATH, core.source_root)
+    try:
+        stat = os.stat(path)
+        return journal.state_of(journal.key_for(str(path), stat.st_size, stat.st_mtime_ns))
+    finally:
+        journal.close()
+
+
+def test_latest_state_wins(tmp_path):
+    journal = JobJournal(str(tmp_path / "journal.db"), str(tmp_path))
+    key = journal.key_for(str(tmp_path / "101" / "a.pdf"), 10, 1)
+    assert key == ("101/a.pdf", 10, 1)
+    for state in (STATE_DISCOVERED, STATE_STARTED, STATE_SUBMITTED, STATE_SPOOLED):
+        journal.record(key, state)
+    assert journal.latest_states() == {key: STATE_SPOOLED}
+    journal.close()
+
+
+def test_started_is_not_a_sent_state():
+    assert STATE_STARTED not in SENT_STATES
+    assert STATE_SUBMITTED in SENT_STATES
+
+
+def test_crash_before_excel_printout_is_reprinted(core_factory, monkeypatch):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    path = clinic / "送货单.xlsx"
+    make_xlsx(str(path))
+
+    # 单线程打印，崩溃直接从 run() 抛出
+    core = core_factory(parallel_dispatch=False)
+    # 在页面设置时崩溃：工作簿已打开，还没有 PrintOut
+    monkeypatch.setattr(core.page_setup, "apply", crash)
+    with pytest.raises(SimulatedCrash):
+        core.run()
+    assert journal_state(core, path) == STATE_STARTED
+    assert core.backend.spooler.submitted == 0
+
+    backend = SimulatedBackend()
+    core_factory(backend=backend).run()
+    # 下次运行重新打印，而不是当作已打印直接移走
+    assert backend.spooler.submitted == 1
+    assert not path.exists()
+
+
+def test_crash_after_pdf_submit_is_only_moved(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    path = clinic / "送货单.pdf"
+    make_pdf(str(path))
+
+    backend = SimulatedBackend()
+    submit = backend.print_pdf
+
+    def print_pdf(*args, **kwargs):
+        handle = submit(*args, **kwargs)
+        # 已交给打印机，等待打印队列确认时崩溃
+        handle.wait = crash
+        return handle
+
+    backend.print_pdf = print_pdf
+    core = core_factory(backend=backend, parallel_dispatch=False, pdf_wait_for="spooled")
+    with pytest.raises(SimulatedCrash):
+        core.run()
+    assert journal_state(core, path) == STATE_SUBMITTED
+    assert backend.spooler.submitted == 1
+
+    backend = SimulatedBackend()
+    core = core_factory(backend=backend)
+    core.run()
+    assert backend.spooler.submitted == 0
+    assert not path.exists()
+    assert os.path.exists(os.path.join(core.target_root, "101", "送货单.pdf"))
+
+
+def test_printed_file_is_journaled_as_moved(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    make_pdf(str(clinic / "送货单.pdf"))
+
+    core = core_factory()
+    core.run()
+    moved = os.path.join(core.target_root, "101", "送货单.pdf")
+    assert os.path.exists(moved)
+    journal = JobJournal(core.JOURNAL_PATH, core.source_root)
+    stat = os.stat(moved)
+    assert journal.state_of(journal.key_for(str(clinic / "送货单.pdf"), stat.st_size, stat.st_mtime_ns)) == STATE_MOVED
+    journal.close()
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from core.merge import merge_available
+from core.printer_backend import SimulatedBackend
+from synthetic_tree import make_pdf, make_xlsx
+
+pytestmark = pytest.mark.skipif(not merge_available(), reason="未安装 pypdf")
+
+
+def make_clinic(source, name="101"):
+    clinic = source / name
+    clinic.mkdir()
+    make_pdf(str(clinic / "送货单1.pdf"), pages=2)
+    make_pdf(str(clinic / "送货单2.pdf"))
+    make_xlsx(str(clinic / "出货单.xlsx"))
+    return clinic
+
+
+def test_clinic_files_are_merged_into_one_job(core_factory, tmp_path):
+    make_clinic(core_factory.source)
+    backend = SimulatedBackend()
+    core = core_factory(backend=backend, merge_clinic_jobs=True, merge_dir=str(tmp_path / "merged"))
+    core.run()
+    assert backend.spooler.submitted == 1
+    assert not (core_factory.source / "101").exists()
+    # 本轮的合并文件打印后删除，子目录也已删除
+    assert os.listdir(tmp_path / "merged") == []
+
+
+def test_merge_dir_keeps_unrelated_files(core_factory, tmp_path):
+    # merge_dir 被指向了共享目录
+    shared = tmp_path / "共享"
+    (shared / "资料").mkdir(parents=True)
+    (shared / "资料" / "合同.pdf").write_bytes(b"%PDF-1.4")
+    (shared / "报表.pdf").write_bytes(b"%PDF-1.4")
+    stale = shared / "pyautoprint_merge_old"
+    stale.mkdir()
+    (stale / "101_1.pdf").write_bytes(b"%PDF-1.4")
+
+    make_clinic(core_factory.source)
+    core_factory(merge_clinic_jobs=True, merge_dir=str(shared)).run()
+
+    assert (shared / "资料" / "合同.pdf").exists()
+    assert (shared / "报表.pdf").exists()
+    assert not stale.exists()
+
+
+def test_unconfirmed_merged_files_are_cleaned_next_run(core_factory, tmp_path):
+    merged = tmp_path / "merged"
+    make_clinic(core_factory.source)
+    core_factory(merge_clinic_jobs=True, merge_dir=str(merged), pdf_wait_for="none").run()
+    leftovers = [name for name in os.listdir(merged)]
+    assert len(leftovers) == 1 and os.listdir(merged / leftovers[0])
+
+    make_clinic(core_factory.source, "102")
+    core_factory(merge_clinic_jobs=True, merge_dir=str(merged)).run()
+    assert not (merged / leftovers[0]).exists()
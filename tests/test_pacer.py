@@ -0,0 +1,127 @@
+import pytest
+
+from core.pacer import AdaptivePacer
+from core.printer_status import PRINTER_STATUS_PAPER_OUT, QueueState
+
+
+class FakeQueue:
+    """按时钟排空的打印队列：每 drain_seconds 秒打印完一个任务"""
+
+    def __init__(self, clock, jobs=0, drain_seconds=1.0):
+        self.clock = clock
+        self.jobs = jobs
+        self.drain_seconds = drain_seconds
+        self.printer_status = 0
+        self.queries = 0
+        self._drained_at = clock()
+
+    def submit(self):
+        self._drain()
+        self.jobs += 1
+
+    def _drain(self):
+        if self.printer_status:
+            self._drained_at = self.clock()
+            return
+        while self.jobs and self.clock() - self._drained_at >= self.drain_seconds:
+            self.jobs -= 1
+            self._drained_at += self.drain_seconds
+        if not self.jobs:
+            self._drained_at = self.clock()
+
+    def __call__(self, printer_name):
+        self.queries += 1
+        self._drain()
+        return QueueState(self.jobs, self.printer_status)
+
+
+def make_pacer(clock, queue, **kwargs):
+    options = dict(high_water=1, min_delay=0.5, max_delay=5.0, poll_interval=0.25,
+                   backoff_initial=2.0, backoff_max=8.0, max_error_wait=60.0)
+    options.update(kwargs)
+    return AdaptivePacer(queue, sleep=clock.sleep, clock=clock, **options)
+
+
+def test_returns_after_min_delay_when_queue_is_empty(clock):
+    queue = FakeQueue(clock)
+    pacer = make_pacer(clock, queue)
+    assert pacer.wait("P") == pytest.approx(0.5)
+    assert queue.queries == 1
+
+
+def test_waits_until_queue_drains_below_high_water(clock):
+    queue = FakeQueue(clock, drain_seconds=2.0)
+    pacer = make_pacer(clock, queue)
+    queue.submit()
+    waited = pacer.wait("P")
+    assert 2.0 <= waited < 2.5
+    assert queue.jobs == 0
+
+
+def test_high_water_allows_jobs_to_stay_queued(clock):
+    queue = FakeQueue(clock, drain_seconds=10.0)
+    pacer = make_pacer(clock, queue, high_water=3)
+    queue.submit()
+    queue.submit()
+    assert pacer.wait("P") == pytest.approx(0.5)
+
+
+def test_wait_is_capped_by_max_delay(clock):
+    queue = FakeQueue(clock, drain_seconds=30.0)
+    pacer = make_pacer(clock, queue)
+    queue.submit()
+    assert pacer.wait("P") == pytest.approx(5.0)
+    assert queue.jobs == 1
+
+
+def test_unavailable_queue_state_falls_back_to_fixed_delay(clock):
+    pacer = make_pacer(clock, lambda printer_name: None)
+    assert pacer.wait("P") == pytest.approx(5.0)
+
+    def broken(printer_name):
+        raise OSError("RPC server unavailable")
+
+    assert make_pacer(clock, broken).wait("P") == pytest.approx(5.0)
+
+
+def test_paper_out_backs_off_exponentially_until_recovered(clock):
+    queue = FakeQueue(clock)
+    pacer = make_pacer(clock, queue)
+    queue.printer_status = PRINTER_STATUS_PAPER_OUT
+    recovered_at = clock() + 0.5 + 2 + 4 + 8
+
+    def should_continue():
+        if clock() >= recovered_at:
+            queue.printer_status = 0
+        return True
+
+    waited = pacer.wait("P", should_continue)
+    # 0.5 秒下限后退避 2、4、8 秒，恢复后立即提交
+    assert waited == pytest.approx(0.5 + 2 + 4 + 8)
+    assert pacer.error_wait == pytest.approx(2 + 4 + 8)
+    assert pacer.total_wait == pytest.approx(waited)
+
+
+def test_blocked_printer_gives_up_after_max_error_wait(clock):
+    queue = FakeQueue(clock)
+    queue.printer_status = PRINTER_STATUS_PAPER_OUT
+    pacer = make_pacer(clock, queue, max_error_wait=20.0)
+    waited = pacer.wait("P")
+    assert 20.0 <= waited - 0.5 < 20.0 + 8.0
+    assert pacer.error_wait == pytest.approx(waited - 0.5)
+
+
+def test_blocked_printer_is_left_to_health_monitor_without_pause(clock):
+    queue = FakeQueue(clock)
+    queue.printer_status = PRINTER_STATUS_PAPER_OUT
+    pacer = make_pacer(clock, queue, pause_on_error=False)
+    assert pacer.wait("P") == pytest.approx(0.5)
+    assert pacer.error_wait == 0
+
+
+def test_stop_request_interrupts_wait(clock):
+    queue = FakeQueue(clock, drain_seconds=30.0)
+    pacer = make_pacer(clock, queue)
+    queue.submit()
+    stop_at = clock() + 1.0
+    assert pacer.wait("P", lambda: clock() < stop_at) < 1.5
@@ -0,0 +1,194 @@
+import os
+import zipfile
+
+import pytest
+
+from core.jobs import PrintJob
+from core.preflight import (PREFLIGHT_CORRUPT, PREFLIGHT_ENCRYPTED, PageEstimateError, PreflightAnalyzer,
+                            PreflightError, pdf_page_count, xlsx_page_estimate)
+from synthetic_tree import make_pdf, make_xlsx
+
+STRICT_NAMESPACES = (
+    (b"http://schemas.openxmlformats.org/spreadsheetml/2006/main", b"http://purl.oclc.org/ooxml/spreadsheetml/main"),
+    (b"http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+     b"http://purl.oclc.org/ooxml/officeDocument/relationships"),
+)
+EMPTY_SHEET = (b'<?xml version="1.0" encoding="UTF-8"?>'
+               b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               b'<dimension ref="A1"/><sheetData/></worksheet>')
+
+
+def rewrite_xlsx(src, dest, transform):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dest, "w") as zout:
+        for name in zin.namelist():
+            zout.writestr(name, transform(name, zin.read(name)))
+
+
+def analyze(path, **kwargs):
+    return PreflightAnalyzer(**kwargs).analyze(PrintJob(str(path), "P", False))
+
+
+def test_pdf_page_count_by_xref(tmp_path):
+    path = tmp_path / "a.pdf"
+    make_pdf(str(path), pages=3)
+    assert pdf_page_count(str(path)) == (3, False)
+
+
+def test_pdf_with_trailing_bytes_after_eof(tmp_path):
+    # 下载工具、签名追加的数据超过文件尾读取范围时仍能找到 %%EOF
+    path = tmp_path / "a.pdf"
+    make_pdf(str(path), pages=3)
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 5000)
+    assert pdf_page_count(str(path)) == (3, False)
+    report = analyze(path)
+    assert report.ok and report.pages == 3 and report.exact
+
+
+def test_pdf_with_padding_before_xref(tmp_path):
+    path = tmp_path / "a.pdf"
+    make_pdf(str(path), pages=2, padding=10000)
+    assert pdf_page_count(str(path))[0] == 2
+
+
+def test_truncated_pdf_counts_pages_by_scan(tmp_path):
+    # 复制中断，缺少 xref 和 %%EOF：逐个对象查找 Pages 节点
+    path = tmp_path / "a.pdf"
+    make_pdf(str(path), pages=2)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 30)
+    assert pdf_page_count(str(path))[0] == 2
+
+
+def test_pdf_without_pages_is_printed_with_estimate(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>\nendobj\n")
+    with pytest.raises(PageEstimateError):
+        pdf_page_count(str(path))
+    report = analyze(path)
+    assert report.ok
+    assert report.pages == 1 and not report.exact
+    assert "%%EOF" in report.detail
+
+
+def test_not_a_pdf_is_corrupt(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"\x00" * 1024)
+    with pytest.raises(PreflightError) as error:
+        pdf_page_count(str(path))
+    assert error.value.status == PREFLIGHT_CORRUPT
+    assert analyze(path).status == PREFLIGHT_CORRUPT
+
+
+def test_xlsx_estimate(tmp_path):
+    path = tmp_path / "a.xlsx"
+    make_xlsx(str(path), sheets=2, rows=120)
+    pages, sheets = xlsx_page_estimate(str(path))
+    assert sheets == 2
+    # 120 行 x 15 磅 = 1800 磅，A4 去掉上下页边距可打印 733.9 磅，每个工作表 3 页
+    assert pages == 6
+    assert xlsx_page_estimate(str(path), fit_to_page=True) == (2, 2)
+
+
+def test_xlsx_with_empty_sheet_data_is_printed(tmp_path):
+    # 只有图片、形状的工作表没有单元格
+    src, path = tmp_path / "src.xlsx", tmp_path / "a.xlsx"
+    make_xlsx(str(src), sheets=2)
+    rewrite_xlsx(src, path, lambda name, data: EMPTY_SHEET if name.startswith("xl/worksheets/") else data)
+    with pytest.raises(PageEstimateError) as error:
+        xlsx_page_estimate(str(path))
+    assert error.value.pages == 2
+    report = analyze(path)
+    assert report.ok and report.pages == 2 and not report.exact
+
+
+def test_strict_ooxml_workbook(tmp_path):
+    src, path = tmp_path / "src.xlsx", tmp_path / "a.xlsx"
+    make_xlsx(str(src), sheets=1, rows=10)
+
+    def strict(name, data):
+        for transitional, purl in STRICT_NAMESPACES:
+            data = data.replace(transitional, purl)
+        return data
+
+    rewrite_xlsx(src, path, strict)
+    assert xlsx_page_estimate(str(path)) == (1, 1)
+
+
+def test_xlsx_missing_sheet_part_is_estimated(tmp_path):
+    src, path = tmp_path / "src.xlsx", tmp_path / "a.xlsx"
+    make_xlsx(str(src), sheets=1)
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(path, "w") as zout:
+        for name in zin.namelist():
+            if not name.startswith("xl/worksheets/"):
+                zout.writestr(name, zin.read(name))
+    report = analyze(path)
+    assert report.ok and report.pages == 1
+
+
+def test_encrypted_xlsx(tmp_path):
+    path = tmp_path / "a.xlsx"
+    path.write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 504)
+    assert analyze(path).status == PREFLIGHT_ENCRYPTED
+
+
+def test_bad_zip_is_corrupt(tmp_path):
+    path = tmp_path / "a.xlsx"
+    make_xlsx(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    assert analyze(path).status == PREFLIGHT_CORRUPT
+
+
+def test_html_xls_is_printed_with_estimate(tmp_path):
+    # 网页导出的 “xls” 实际是 HTML 表格，Excel 可以打开
+    path = tmp_path / "出货单.xls"
+    path.write_text("<html><body><table><tr><td>出货单</td></tr></table></body></html>", encoding="utf-8")
+    report = analyze(path)
+    assert report.ok and report.pages == 1 and not report.exact
+
+    other = tmp_path / "送货单.pdf"
+    make_pdf(str(other))
+    preflight = PreflightAnalyzer().run([PrintJob(str(path), "P", False), PrintJob(str(other), "P", False)])
+    assert [os.path.basename(r.job.path) for r in preflight.ok] == ["出货单.xls", "送货单.pdf"]
+
+
+def test_first_page_only_caps_pages(tmp_path):
+    path = tmp_path / "a.pdf"
+    make_pdf(str(path), pages=5)
+    assert analyze(path, first_page_only=True).pages == 1
+
+
+def test_preflight_warnings_are_printed_and_problems_stay_in_source(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    make_pdf(str(clinic / "送货单.pdf"), pages=3)
+    with open(clinic / "送货单.pdf", "ab") as f:
+        f.write(b"\x00" * 5000)
+    make_xlsx(str(clinic / "src.xlsx"))
+    rewrite_xlsx(clinic / "src.xlsx", clinic / "图片.xlsx",
+                 lambda name, data: EMPTY_SHEET if name.startswith("xl/worksheets/") else data)
+    os.remove(clinic / "src.xlsx")
+    (clinic / "加密.xlsx").write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 504)
+
+    core = core_factory()
+    jobs = [PrintJob(str(clinic / name), "P", False)
+            for name in ("送货单.pdf", "图片.xlsx", "加密.xlsx")]
+    ready = core.preflight(jobs)
+
+    assert [os.path.basename(job.path) for job in ready] == ["送货单.pdf", "图片.xlsx"]
+    # 默认不隔离预检发现的问题文件
+    assert (clinic / "加密.xlsx").exists()
+    assert not os.path.exists(core.QUARANTINE_DIR)
+    assert core.retry_report.counts()["quarantined"] == 0
+
+
+def test_preflight_quarantine_is_opt_in(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    (clinic / "加密.xlsx").write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\x00" * 504)
+
+    core = core_factory(quarantine_preflight=True)
+    assert core.preflight([PrintJob(str(clinic / "加密.xlsx"), "P", False)]) == []
+    assert not (clinic / "加密.xlsx").exists()
+    assert os.path.exists(os.path.join(core.QUARANTINE_DIR, "101", "加密.xlsx"))
@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+from core.jobs import PrintJob
+from core.printer_backend import SimulatedComError, SpoolerError
+from core.preflight import PREFLIGHT_CORRUPT, PreflightError
+from core.retry import (ERROR_COM_BUSY, ERROR_PERMANENT, ERROR_SPOOLER, ERROR_UNKNOWN, OUTCOME_QUARANTINED,
+                        OUTCOME_RECOVERED, Quarantine, RetryPolicy, RetryQueue, RetryReport, STAGE_OPEN,
+                        STAGE_SPOOL, STAGE_SUBMIT, classify_error, load_retry_policies)
+
+DISP_E_EXCEPTION = -2147352567
+XL_E_OPEN_FAILED = -2146827284
+
+
+def excel_error(description, scode=XL_E_OPEN_FAILED):
+    return SimulatedComError(DISP_E_EXCEPTION, "Exception occurred.",
+                             (0, "Microsoft Excel", description, None, 0, scode))
+
+
+@pytest.mark.parametrize("error, stage, expected", [
+    (SimulatedComError(-2147418111, "Call was rejected by callee."), STAGE_OPEN, ERROR_COM_BUSY),
+    (excel_error("", scode=-2146777998), STAGE_SUBMIT, ERROR_COM_BUSY),
+    (FileNotFoundError("a.xlsx"), STAGE_OPEN, ERROR_PERMANENT),
+    (PreflightError(PREFLIGHT_CORRUPT, "不是 PDF 文件"), "", ERROR_PERMANENT),
+    (excel_error("The password you supplied is not correct."), STAGE_OPEN, ERROR_PERMANENT),
+    (excel_error("The file is corrupt and cannot be opened."), STAGE_OPEN, ERROR_PERMANENT),
+    (excel_error("文件格式或文件扩展名无效。"), STAGE_OPEN, ERROR_PERMANENT),
+    (SimulatedComError(0x80030109 - 2 ** 32, "STG_E_DOCFILECORRUPT"), STAGE_OPEN, ERROR_PERMANENT),
+    # 文件还在写入、共享冲突、网络路径暂时不可用：稍后重试
+    (excel_error("Microsoft Excel cannot access the file '\\\\server\\share\\a.xlsx'."), STAGE_OPEN,
+     ERROR_UNKNOWN),
+    (PermissionError(13, "The process cannot access the file because it is being used by another process"),
+     STAGE_OPEN, ERROR_UNKNOWN),
+    (OSError(64, "The specified network name is no longer available"), STAGE_OPEN, ERROR_UNKNOWN),
+    (SpoolerError("打印队列已满"), STAGE_SUBMIT, ERROR_SPOOLER),
+    (SpoolerError("任务出错"), STAGE_SPOOL, ERROR_SPOOLER),
+    (None, STAGE_OPEN, ERROR_UNKNOWN),
+])
+def test_classify_error(error, stage, expected):
+    assert classify_error(error, stage) == expected
+
+
+def test_policy_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(retries=5, delay=2, max_delay=10)
+    assert [policy.delay_for(attempt) for attempt in range(1, 6)] == [2, 4, 8, 10, 10]
+
+
+def test_load_retry_policies_overrides_defaults():
+    policies = load_retry_policies({ERROR_COM_BUSY: {"retries": 8}})
+    assert policies[ERROR_COM_BUSY].retries == 8
+    assert policies[ERROR_COM_BUSY].delay == 2
+    assert policies[ERROR_PERMANENT].quarantine
+    assert not policies[ERROR_UNKNOWN].quarantine
+
+
+def test_retry_queue_orders_by_due_time_per_printer(clock):
+    queue = RetryQueue(clock=clock)
+    a, b, c = PrintJob("a.pdf", "P1", False), PrintJob("b.pdf", "P2", False), PrintJob("c.pdf", "P1", False)
+    queue.push(a, 5)
+    queue.push(b, 1)
+    queue.push(c, 3)
+    assert queue.pop_due() is None
+    assert queue.wait_time("P1") == 3
+    assert queue.contains(a) and queue.settled(a) == 0
+
+    clock.advance(3)
+    assert queue.pop_due("P1") is c
+    assert queue.pop_due("P1") is None  # a 还没到期
+    assert queue.pop_due("P2") is b
+    assert queue.pending() == 1
+    clock.advance(2)
+    assert queue.pop_due() is a
+    assert queue.settled(a) == 1
+    assert queue.wait_time() is None
+
+
+def test_quarantine_moves_file_and_records_reason(tmp_path):
+    source = tmp_path / "src"
+    (source / "101").mkdir(parents=True)
+    path = source / "101" / "送货单.xlsx"
+    path.write_bytes(b"x")
+    quarantine = Quarantine(str(source), str(tmp_path / "隔离"))
+
+    dest = quarantine.move(str(path), "文件无法打开: 有打开密码")
+    assert dest == str(tmp_path / "隔离" / "101" / "送货单.xlsx")
+    assert os.path.exists(dest) and not path.exists()
+    reasons = (tmp_path / "隔离" / Quarantine.REASON_FILE).read_text(encoding="utf-8")
+    assert "101/送货单.xlsx\t文件无法打开: 有打开密码" in reasons.replace("\\", "/")
+
+    # 同名文件再次隔离时不覆盖
+    path.write_bytes(b"y")
+    assert quarantine.move(str(path), "again") != dest
+
+
+def test_retry_report_tracks_outcomes():
+    report = RetryReport()
+    job = PrintJob("a.pdf", "P", False)
+    job.attempts = 2
+    report.record(job, OUTCOME_QUARANTINED, ERROR_PERMANENT, "损坏", "/q/a.pdf")
+    other = PrintJob("b.pdf", "P", False)
+    report.record(other, "retrying", ERROR_SPOOLER, "队列已满")
+    report.resolved(other)
+    counts = report.counts()
+    assert counts[OUTCOME_QUARANTINED] == 1 and counts[OUTCOME_RECOVERED] == 1
+
+
+def test_transient_open_failure_is_retried_not_quarantined(core_factory, monkeypatch):
+    from core.printer_backend import _FakeWorkbooks
+    from synthetic_tree import make_xlsx
+
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    path = clinic / "送货单.xlsx"
+    make_xlsx(str(path))
+    opened = _FakeWorkbooks.Open
+    failures = []
+
+    def open_locked(self, *args, **kwargs):
+        if not failures:
+            failures.append(1)
+            raise excel_error("Microsoft Excel cannot access the file. The file is being used by another process.")
+        return opened(self, *args, **kwargs)
+
+    monkeypatch.setattr(_FakeWorkbooks, "Open", open_locked)
+    core = core_factory(retry_policies={ERROR_UNKNOWN: {"delay": 0}})
+    core.run()
+    assert core.backend.spooler.submitted == 1
+    assert not os.path.exists(core.QUARANTINE_DIR)
+    assert core.retry_report.counts()[OUTCOME_RECOVERED] == 1
+
+
+def test_corrupt_workbook_is_quarantined(core_factory):
+    clinic = core_factory.source / "101"
+    clinic.mkdir()
+    (clinic / "送货单.xlsx").write_bytes(b"not a zip")
+
+    core = core_factory(preflight=False)
+    core.run()
+    assert os.path.exists(os.path.join(core.QUARANTINE_DIR, "101", "送货单.xlsx"))
+    assert core.retry_report.counts()[OUTCOME_QUARANTINED] == 1
@@ -0,0 +1,81 @@
+import os
+
+from core.printer_backend import SimulatedBackend
+from core.printer_status import JOB_STATUS_SPOOLING
+from core.spool import JOB_COMPLETED, JOB_SPOOLED, JOB_SUBMITTED, Win32SpoolHandle
+
+
+class FakeQueueHandle(Win32SpoolHandle):
+    """用列表代替 EnumJobs 的 Win32SpoolHandle"""
+
+    def __init__(self, *args, jobs=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jobs = jobs if jobs is not None else []
+
+    def _list_jobs(self):
+        return list(self.jobs)
+
+
+def queue_job(job_id, document, status=0):
+    return {"JobId": job_id, "pDocument": document, "Status": status}
+
+
+def test_older_job_with_same_name_is_ignored(clock):
+    # 上一个诊所的同名送货单还在队列中
+    older = queue_job(7, "送货单.pdf")
+    handle = FakeQueueHandle("P", os.path.join("出货单", "102", "送货单.pdf"), existing_ids=frozenset({7}),
+                             jobs=[older], clock=clock)
+    assert handle.poll() == JOB_SUBMITTED
+    assert handle.job_id is None
+
+    handle.jobs.append(queue_job(8, "送货单.pdf", JOB_STATUS_SPOOLING))
+    assert handle.poll() == JOB_SUBMITTED
+    assert handle.job_id == 8
+    handle.jobs[-1] = queue_job(8, "送货单.pdf")
+    assert handle.poll() == JOB_SPOOLED
+    # 自己的任务离开队列后视为完成，与更早的同名任务无关
+    handle.jobs.pop()
+    assert handle.poll() == JOB_COMPLETED
+
+
+def test_submitted_job_that_never_appears_is_bounded(clock):
+    handle = FakeQueueHandle("P", "a.pdf", submit_grace=15, clock=clock)
+    clock.advance(10)
+    assert handle.poll() == JOB_SUBMITTED
+    clock.advance(6)
+    assert handle.poll() == JOB_COMPLETED
+
+
+def test_spooled_job_that_never_appears_uses_vanish_grace(clock):
+    handle = FakeQueueHandle("P", "a.pdf", state=JOB_SPOOLED, vanish_grace=3, submit_grace=15, clock=clock)
+    clock.advance(2)
+    assert handle.poll() == JOB_SPOOLED
+    clock.advance(2)
+    assert handle.poll() == JOB_COMPLETED
+
+
+def test_job_id_lookup(clock):
+    handle = FakeQueueHandle("P", "a.pdf", job_id=3, jobs=[queue_job(2, "a.pdf"), queue_job(3, "other")],
+                             clock=clock)
+    assert handle.poll() == JOB_SPOOLED
+    handle.jobs = [queue_job(2, "a.pdf")]
+    assert handle.poll() == JOB_COMPLETED
+
+
+def test_queue_errors_keep_state(clock):
+    class Broken(FakeQueueHandle):
+        def _list_jobs(self):
+            raise OSError("RPC server unavailable")
+
+    handle = Broken("P", "a.pdf", clock=clock)
+    assert handle.poll() == JOB_SUBMITTED
+    assert "RPC" in handle.error
+
+
+def test_simulated_handle_waits_for_spooler(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4\n%%EOF\n")
+    backend = SimulatedBackend(job_latency=0.05)
+    handle = backend.print_pdf(str(path), "模拟针式打印机")
+    assert handle.wait(JOB_SPOOLED, timeout=1)
+    assert handle.wait(JOB_COMPLETED, timeout=2, poll_interval=0.01)
@@ -0,0 +1,134 @@
+import os
+
+from core.watcher import ChangeSource, HotFolderWatcher, PollingChangeSource
+
+
+class FakeChangeSource(ChangeSource):
+    """手动通知变化的文件，等待时推进时钟"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.changes = set()
+        self.closed = False
+
+    def notify(self, *paths):
+        self.changes.update(str(path) for path in paths)
+
+    def wait_changes(self, timeout):
+        self.clock.advance(timeout)
+        changes, self.changes = self.changes, set()
+        return changes
+
+    def close(self):
+        self.closed = True
+
+
+def is_printable(name):
+    return name.lower().endswith((".pdf", ".xlsx"))
+
+
+def make_watcher(clock, settle_seconds=2.0):
+    source = FakeChangeSource(clock)
+    return source, HotFolderWatcher(source, is_printable, settle_seconds=settle_seconds, clock=clock)
+
+
+def test_file_is_returned_once_after_it_settles(tmp_path, clock):
+    source, watcher = make_watcher(clock)
+    path = tmp_path / "送货单.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    source.notify(path)
+
+    assert watcher.poll(1) == []
+    assert watcher.poll(1) == []
+    ready = watcher.poll(1)
+    assert [(p, size) for p, size, _ in ready] == [(str(path), 8)]
+    assert watcher.pending == 0
+
+    # 没有变化的文件再次收到通知时不重复返回
+    source.notify(path)
+    assert watcher.poll(1) == [] and watcher.poll(1) == [] and watcher.poll(1) == []
+
+
+def test_growing_file_restarts_settle_time(tmp_path, clock):
+    source, watcher = make_watcher(clock)
+    path = tmp_path / "送货单.pdf"
+    path.write_bytes(b"%PDF")
+    source.notify(path)
+    watcher.poll(1)
+    watcher.poll(1)
+
+    with open(path, "ab") as f:
+        f.write(b"-1.4 still copying")
+    # 从大小变化时重新计时，不是从第一次发现时
+    assert watcher.poll(1) == []
+    assert watcher.poll(1) == []
+    assert [p for p, _, _ in watcher.poll(1)] == [str(path)]
+
+
+def test_empty_and_locked_files_are_held_back(tmp_path, clock):
+    source, watcher = make_watcher(clock, settle_seconds=0)
+    empty = tmp_path / "空.pdf"
+    empty.write_bytes(b"")
+    book = tmp_path / "出货单.xlsx"
+    book.write_bytes(b"PK")
+    lock = tmp_path / "~$出货单.xlsx"
+    lock.write_bytes(b"x")
+    source.notify(empty, book, lock, tmp_path / "说明.txt")
+
+    watcher.poll(1)
+    assert watcher.poll(1) == []
+    assert watcher.pending == 2
+
+    # Excel 关闭工作簿后锁文件消失
+    lock.unlink()
+    assert [p for p, _, _ in watcher.poll(1)] == [str(book)]
+    assert watcher.pending == 1
+
+
+def test_deleted_candidate_is_dropped(tmp_path, clock):
+    source, watcher = make_watcher(clock)
+    path = tmp_path / "送货单.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    source.notify(path)
+    watcher.poll(1)
+    path.unlink()
+    assert watcher.poll(1) == []
+    assert watcher.pending == 0
+
+
+def test_forgotten_file_is_returned_again(tmp_path, clock):
+    source, watcher = make_watcher(clock, settle_seconds=0)
+    path = tmp_path / "送货单.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    source.notify(path)
+    watcher.poll(1)
+    assert watcher.poll(1)
+
+    # 打印并移走后，同名文件再次出现
+    watcher.forget(str(path))
+    source.notify(path)
+    watcher.poll(1)
+    assert [p for p, _, _ in watcher.poll(1)] == [str(path)]
+
+    watcher.close()
+    assert source.closed
+
+
+def test_polling_source_reports_only_changed_directories(tmp_path):
+    (tmp_path / "101").mkdir()
+    (tmp_path / "102").mkdir()
+    first = tmp_path / "101" / "送货单.pdf"
+    first.write_bytes(b"%PDF-1.4")
+    sleeps = []
+    source = PollingChangeSource(str(tmp_path), sleep=sleeps.append)
+
+    assert source.wait_changes(5) == {str(first)}
+    assert sleeps == []
+
+    added = tmp_path / "102" / "月结单.pdf"
+    added.write_bytes(b"%PDF-1.4")
+    # 保证目录的修改时间变化
+    stat = os.stat(tmp_path / "102")
+    os.utime(tmp_path / "102", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert source.wait_changes(5) == {str(added)}
+    assert sleeps == [5]
@@ -1,42 +1,93 @@
+import time
 from typing import Dict, Any, Optional
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGroupBox,
                              QLabel, QLineEdit, QSpinBox, QDoubleSpinBox, QCheckBox,
-                             QPushButton, QTextEdit, QFileDialog, QMessageBox, QSizePolicy, QComboBox)
-from PyQt5.QtCore import Qt, pyqtSignal, QThread
+                             QPushButton, QPlainTextEdit, QFileDialog, QMessageBox, QSizePolicy, QComboBox,
+                             QProgressBar)
+from PyQt5.QtCore import Qt, pyqtSignal, QThread, QTimer
 
 from utils.config_manager import ConfigManager
 from printer_core import PrinterCore
+from core.planner import format_eta
+from core.scheduler import POLICY_NAMES, POLICY_SCAN
+from core.printer_backend import create_backend
+from core.printer_catalog import PrinterCatalog
+from core.printer_status import describe_printer_status
 from utils.path_utils import get_app_path, ensure_directory_exists
+from utils.log_buffer import LogBuffer
 from PyQt5.QtGui import QFont
-import win32print
 
 
 class PrinterThread(QThread):
     finished = pyqtSignal(bool)
     log_message = pyqtSignal(str)
+    progress = pyqtSignal(int, int, float)  # 已完成数, 总数, 预计剩余秒数
+    pauses_changed = pyqtSignal(list)  # 当前所有诊所边界暂停
 
-    def __init__(self, config: Dict[str, Any], parent=None):
+    def __init__(self, config: Dict[str, Any], parent=None, log_buffer: Optional[LogBuffer] = None):
         super().__init__(parent)
         self.config = config
+        # 打印日志写入缓冲区，由界面定时批量显示；没有缓冲区时逐行发送信号
+        self.log_buffer = log_buffer
         self._is_running = True  # 控制线程运行的标志
+        self._drain = False
         self._parent = parent
+        self._printer: Optional[PrinterCore] = None
 
     def run(self):
         try:
-            printer = PrinterCore(self.config, self._parent, self.log_message.emit)
-            while self._is_running:  # 添加循环检查
-                if not printer.run():  # 修改run方法使其可中断
-                    break
+            log_callback = self.log_buffer.append if self.log_buffer is not None else self.log_message.emit
+            printer = PrinterCore(self.config, self._parent, log_callback,
+                                  progress_callback=self.progress.emit,
+                                  pause_callback=self.pauses_changed.emit)
+            self._printer = printer
+            if not self._is_running:
+                # 创建 PrinterCore 期间已点击停止
+                printer.stop(self._drain)
+            if self.config.get("watch_mode", False):
+                # 监控模式：一直运行到点击停止
+                printer.run_watch()
+            else:
+                while self._is_running:  # 添加循环检查
+                    if not printer.run():  # 修改run方法使其可中断
+                        break
             self.finished.emit(True)
         except Exception as e:
             self.log_message.emit(f"❌ 打印线程异常: {str(e)}")
             self.finished.emit(False)
 
-    def stop(self):
+    def skip_pause(self):
+        """跳过当前所有诊所边界暂停"""
+        if self._printer is not None:
+            self._printer.pauses.skip()
+
+    def stop(self, drain=False):
+        """请求停止；drain=True 时打印完正在打印的文件后停止。不等待，线程结束时发出 finished"""
         self._is_running = False  # 设置标志位停止线程
+        self._drain = drain
+        if self._printer is not None:
+            self._printer.stop(drain)
         self.quit()  # 确保线程退出
 
 
+class PrinterDiscoveryThread(QThread):
+    """在后台线程中查询打印机列表和各打印机的纸张、状态，更新 PrinterCatalog"""
+    discovered = pyqtSignal(bool)  # 缓存是否有变化
+    failed = pyqtSignal(str)
+
+    def __init__(self, catalog: PrinterCatalog, force: bool = False, names=None, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.force = force
+        self.names = names
+
+    def run(self):
+        try:
+            self.discovered.emit(self.catalog.refresh(self.force, self.names))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -53,6 +104,21 @@ class MainWindow(QMainWindow):
         self.config_manager = ConfigManager()
         self.printer_thread: Optional[PrinterThread] = None
 
+        # 打印机列表和纸张缓存：启动时先显示缓存，后台线程查询后再更新，界面不等待网络打印机
+        self.printer_catalog = PrinterCatalog(
+            create_backend(self.config_manager.get_all()),
+            get_app_path("cache", "printers.json"),
+            ttl=float(self.config_manager.get("printer_cache_ttl", 3600)),
+        )
+        self.printer_catalog.load()
+        self._discovery_threads = []
+
+        # 打印日志缓冲区：工作线程写入，界面每 LOG_FLUSH_INTERVAL_MS 毫秒批量显示一次
+        self.log_buffer = LogBuffer(self.config_manager.get("log_buffer_max_lines", 10000))
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(int(self.config_manager.get("log_flush_interval_ms", 100)))
+        self.log_timer.timeout.connect(self.flush_log_buffer)
+
         # 设置大字体
         self.setFont(QFont("Microsoft YaHei", 12))  # 设置默认字体
         self.init_ui()
@@ -107,6 +173,7 @@ class MainWindow(QMainWindow):
         self.delay_spin = QDoubleSpinBox()
         self.delay_spin.setRange(0.01, 100)
         self.delay_spin.setSingleStep(0.5)
+        self.delay_spin.setToolTip("自适应节奏下为每个文件的最长等待时间，打印队列空闲时会提前提交下一个文件")
         other_layout.addWidget(self.delay_spin)
 
         self.wait_prompt_check = QCheckBox("打印完成弹窗提示")
@@ -124,9 +191,37 @@ class MainWindow(QMainWindow):
         # 日志区域
         log_group = QGroupBox("打印日志")
         log_layout = QVBoxLayout()
-        self.log_edit = QTextEdit()
+        self.log_edit = QPlainTextEdit()
         self.log_edit.setReadOnly(True)
+        # 界面只保留最近的日志行，完整日志见 logs 目录
+        self.log_edit.setMaximumBlockCount(int(self.config_manager.get("log_view_max_lines", 5000)))
         log_layout.addWidget(self.log_edit)
+
+        # 打印进度
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        self.eta_label = QLabel("预计剩余: --:--:--")
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.eta_label)
+        log_layout.addLayout(progress_layout)
+
+        # 诊所边界暂停：倒计时期间其他打印机继续打印，可点击跳过
+        pause_layout = QHBoxLayout()
+        self.pause_label = QLabel("")
+        self.skip_pause_btn = QPushButton("跳过等待")
+        self.skip_pause_btn.clicked.connect(self.skip_pause)
+        pause_layout.addWidget(self.pause_label)
+        pause_layout.addStretch()
+        pause_layout.addWidget(self.skip_pause_btn)
+        self.pause_widget = QWidget()
+        self.pause_widget.setLayout(pause_layout)
+        self.pause_widget.setVisible(False)
+        log_layout.addWidget(self.pause_widget)
+        self.pauses = []
+        self.pause_timer = QTimer(self)
+        self.pause_timer.setInterval(200)
+        self.pause_timer.timeout.connect(self.refresh_pause_countdown)
         log_group.setLayout(log_layout)
         main_layout.addWidget(log_group)
 
@@ -142,6 +237,11 @@ class MainWindow(QMainWindow):
         self.stop_btn.setEnabled(False)
         button_layout.addWidget(self.stop_btn)
 
+        self.drain_btn = QPushButton("打印完当前文件后停止")
+        self.drain_btn.clicked.connect(lambda: self.stop_printing(drain=True))
+        self.drain_btn.setEnabled(False)
+        button_layout.addWidget(self.drain_btn)
+
         self.save_btn = QPushButton("保存配置")
         self.save_btn.clicked.connect(lambda: self.save_config(showAlert=True))
         button_layout.addWidget(self.save_btn)
@@ -176,7 +276,7 @@ class MainWindow(QMainWindow):
 
         # 刷新打印机列表按钮
         refresh_btn = QPushButton("刷新列表")
-        refresh_btn.clicked.connect(self.refresh_printer_list)
+        refresh_btn.clicked.connect(lambda: self.refresh_printer_list(force=True))
 
         # 新增"设为默认"按钮
         set_default_btn = QPushButton("设为默认")
@@ -255,7 +355,23 @@ class MainWindow(QMainWindow):
 
         print_params_layout.addWidget(self.bw_print_check)
         print_params_layout.addWidget(self.duplex_check)
+        # 监控模式：持续监控源目录，新文件写完后自动打印
+        self.watch_mode_check = QCheckBox("监控模式")
+        self.watch_mode_check.setFont(QFont("Microsoft YaHei", 12))
+        self.watch_mode_check.setToolTip("持续监控源目录，新放入的文件写完后自动打印，直到点击停止打印")
+        self.watch_mode_check.setChecked(False)
+
         print_params_layout.addWidget(self.print_firstPage_check)
+        print_params_layout.addWidget(self.watch_mode_check)
+
+        # 打印顺序
+        schedule_label = QLabel("打印顺序:")
+        self.schedule_combo = QComboBox()
+        for policy, name in POLICY_NAMES.items():
+            self.schedule_combo.addItem(name, policy)
+        self.schedule_combo.setToolTip("诊所目录的打印顺序；同一诊所的文件始终连续打印")
+        print_params_layout.addWidget(schedule_label)
+        print_params_layout.addWidget(self.schedule_combo)
         print_params_layout.addStretch()
         print_params_group.setLayout(print_params_layout)
 
@@ -284,6 +400,12 @@ class MainWindow(QMainWindow):
         self.bw_print_check.setChecked(config.get("bw_print", True))
         self.duplex_check.setChecked(config.get("duplex_print", False))
         self.print_firstPage_check.setChecked(config.get("print_firstPage", False))
+        self.watch_mode_check.setChecked(config.get("watch_mode", False))
+        policy = config.get("schedule_policy", POLICY_SCAN)
+        if self.schedule_combo.findData(policy) < 0:
+            # 配置文件中手动设置的组合策略，如 "clinic_id,monthly_first"
+            self.schedule_combo.addItem(policy, policy)
+        self.schedule_combo.setCurrentIndex(self.schedule_combo.findData(policy))
 
         # 设置纸张默认选择
         if self.paper_size_spin.value() < len(self.paper_sizes):
@@ -313,6 +435,8 @@ class MainWindow(QMainWindow):
             "bw_print": self.bw_print_check.isChecked(),
             "duplex_print": self.duplex_check.isChecked(),
             "print_firstPage": self.print_firstPage_check.isChecked(),
+            "watch_mode": self.watch_mode_check.isChecked(),
+            "schedule_policy": self.schedule_combo.currentData(),
         }
 
         # 保存默认打印机
@@ -339,36 +463,23 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "错误", "保存配置失败!")
 
-    def show_paper_info(self):
-        """显示打印机支持的纸张信息"""
-        try:
-            import win32print
-
-            if not win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL):
-                self.log_message("⚠️ 未检测到可用的打印机")
-                return
-
-            printer_name = win32print.GetDefaultPrinter()
-            self.log_message(f"\n🖨️ 正在获取打印机 '{printer_name}' 的纸张信息...")
-
-            hprinter = win32print.OpenPrinter(printer_name)
-            forms = win32print.EnumForms(hprinter)
-
-            self.log_message(f"✅ 找到 {len(forms)} 种支持的纸张尺寸:")
-            for i, form in enumerate(forms, 1):
-                width_cm = form['Size']['cx'] / 1000
-                height_cm = form['Size']['cy'] / 1000
-                self.log_message(
-                    f"{i}. {form['Name']} "
-                    f"(宽度: {width_cm:.1f}cm × 高度: {height_cm:.1f}cm)"
-                )
-
-            win32print.ClosePrinter(hprinter)
+    def show_paper_info(self, printer_name=None):
+        """显示打印机支持的纸张信息（来自打印机缓存）"""
+        printer_name = printer_name or self.get_default_printer_by_default_name()
+        forms = self.printer_catalog.forms(printer_name)
+        if forms is None:
+            self.log_message(f"⚠️ 还没有获取到打印机 '{printer_name}' 的纸张信息")
+            return
 
-        except win32print.error as e:
-            self.log_message(f"❌ 打印机API错误: {str(e)}")
-        except Exception as e:
-            self.log_message(f"❌ 获取纸张信息失败: {str(e)}")
+        self.log_message(f"\n🖨️ 打印机 '{printer_name}' 的纸张信息:")
+        self.log_message(f"✅ 找到 {len(forms)} 种支持的纸张尺寸:")
+        for i, form in enumerate(forms, 1):
+            width_cm = form['Size']['cx'] / 1000
+            height_cm = form['Size']['cy'] / 1000
+            self.log_message(
+                f"{i}. {form['Name']} "
+                f"(宽度: {width_cm:.1f}cm × 高度: {height_cm:.1f}cm)"
+            )
 
     # 设置默认打印机
     def set_default_printer(self):
@@ -386,7 +497,7 @@ class MainWindow(QMainWindow):
             win32print.SetDefaultPrinter(selected_printer)
 
             # 刷新列表显示新的默认打印机
-            self.refresh_printer_list()
+            self.refresh_printer_list(force=True)
 
             self.log_message(f"✅ 已将 '{selected_printer}' 设置为默认打印机")
 
@@ -420,56 +531,72 @@ class MainWindow(QMainWindow):
             self.log_message(f"❌ 获取管理员权限失败: {str(e)}")
             return False
 
-    def refresh_printer_list(self):
-        """刷新打印机列表并设置默认选中"""
-        try:
-            import win32print
-
+    def refresh_printer_list(self, force=False):
+        """先用缓存填充打印机列表，再在后台线程中刷新；force 时忽略缓存有效期重新查询"""
+        if self.printer_catalog.printers:
+            self.populate_printer_list()
+        if force:
             self.log_message("\n🔄 正在刷新打印机列表...")
-            self.printer_combo.clear()
-            self.monthly_printer_combo.clear()
-
-            # 获取所有打印机
-            self.available_printers = win32print.EnumPrinters(
-                win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
-            )
-
-            # 获取默认打印机
-            default_printer = win32print.GetDefaultPrinter()
-            default_index = 0
-
-            # 添加到下拉框
-            for i, printer in enumerate(self.available_printers):
-                printer_name = printer[2]
-                self.printer_combo.addItem(printer_name)
-                self.monthly_printer_combo.addItem(printer_name)
-
-                # 标记默认打印机
-                if printer_name == default_printer:
-                    default_index = i
-                    self.printer_combo.setItemText(i, f"{printer_name} (默认)")
-                    # 加载该打印机的纸张类型
-                    self.load_paper_sizes(printer_name)
-
-            # 尝试恢复保存的月结单打印机设置
-            saved_monthly_printer = self.config_manager.get("monthly_printer_name", "")
-            if saved_monthly_printer:
-                index = self.monthly_printer_combo.findText(saved_monthly_printer)
-                if index >= 0:
-                    self.monthly_printer_combo.setCurrentIndex(index)
-
-            # 设置默认选中
-            self.printer_combo.setCurrentIndex(default_index)
+        self.start_printer_discovery(force=force, on_done=self.on_printers_discovered)
+
+    def start_printer_discovery(self, force=False, names=None, on_done=None):
+        """启动后台查询，完成后在界面线程中调用 on_done(是否有变化)"""
+        thread = PrinterDiscoveryThread(self.printer_catalog, force, names, self)
+        if on_done is not None:
+            thread.discovered.connect(on_done)
+        thread.failed.connect(lambda error: self.log_message(f"❌ 刷新打印机列表失败: {error}"))
+        thread.finished.connect(lambda: self._discovery_threads.remove(thread))
+        self._discovery_threads.append(thread)
+        thread.start()
+
+    def on_printers_discovered(self, changed: bool):
+        if changed or self.printer_combo.count() == 0:
+            self.populate_printer_list()
             self.log_message(f"✅ 已加载 {len(self.available_printers)} 台打印机")
 
-        except Exception as e:
-            self.log_message(f"❌ 刷新打印机列表失败: {str(e)}")
+    def populate_printer_list(self):
+        """用打印机缓存填充打印机下拉框并标记默认打印机"""
+        catalog = self.printer_catalog
+        # 保留当前选中的月结单打印机（第一次填充时使用保存的设置）
+        saved_monthly_printer = (self.monthly_printer_combo.currentText()
+                                 or self.config_manager.get("monthly_printer_name", ""))
+
+        self.printer_combo.clear()
+        self.monthly_printer_combo.clear()
+
+        self.available_printers = catalog.printers
+        default_printer = catalog.default_printer
+        default_index = 0
+
+        # 添加到下拉框
+        for i, printer_name in enumerate(self.available_printers):
+            self.printer_combo.addItem(printer_name)
+            self.monthly_printer_combo.addItem(printer_name)
+
+            # 标记默认打印机
+            if printer_name == default_printer:
+                default_index = i
+                self.printer_combo.setItemText(i, f"{printer_name} (默认)")
+                # 加载该打印机的纸张类型
+                self.load_paper_sizes(printer_name)
+
+        # 尝试恢复保存的月结单打印机设置
+        if saved_monthly_printer:
+            index = self.monthly_printer_combo.findText(saved_monthly_printer)
+            if index >= 0:
+                self.monthly_printer_combo.setCurrentIndex(index)
+
+        # 设置默认选中
+        self.printer_combo.setCurrentIndex(default_index)
 
     def get_selected_printer(self):
         """获取当前选中的打印机"""
         if self.printer_combo.count() > 0:
             # 去除"(默认)"标记
             return self.printer_combo.currentText().replace(" (默认)", "")
+        if self.printer_catalog.default_printer:
+            return self.printer_catalog.default_printer
+        import win32print
         return win32print.GetDefaultPrinter()  # 回退到系统默认
 
     # 打印机设置
@@ -519,17 +646,23 @@ class MainWindow(QMainWindow):
             self.paper_size_spin.setValue(int(paper_id))
 
     def load_paper_sizes(self, printer_name):
-        """加载指定打印机支持的纸张类型"""
-        try:
-            import win32print
+        """加载指定打印机支持的纸张类型（来自打印机缓存，没有缓存时在后台查询后再加载）"""
+        forms = self.printer_catalog.forms(printer_name)
+        if forms is None:
+            self.log_message(f"🔄 正在获取打印机 '{printer_name}' 的纸张信息...")
+            self.start_printer_discovery(names=[printer_name], on_done=lambda changed: (
+                self.printer_catalog.forms(printer_name) is not None
+                and self.get_default_printer_by_default_name() == printer_name
+                and self.load_paper_sizes(printer_name)))
+            return False
 
+        # 重新填充时保留当前选中的纸张，不触发 on_paper_selected
+        current_paper_id = self.paper_size_spin.value()
+        self.paper_combo.blockSignals(True)
+        try:
             self.paper_combo.clear()
             self.paper_sizes.clear()
 
-            hprinter = win32print.OpenPrinter(win32print.GetDefaultPrinter())
-            forms = win32print.EnumForms(hprinter)
-            win32print.ClosePrinter(hprinter)
-
             # 常见针式打印机纸张类型映射
             dot_matrix_papers = {
                 # 1: "Letter 8.5x11英寸",
@@ -573,11 +706,16 @@ class MainWindow(QMainWindow):
             # if index >= 0:
             #     self.paper_combo.setCurrentIndex(index)
 
+            index = self.paper_combo.findData(current_paper_id)
+            if index >= 0:
+                self.paper_combo.setCurrentIndex(index)
             return True
 
         except Exception as e:
             self.log_message(f"❌ 加载纸张类型失败: {str(e)}")
             return False
+        finally:
+            self.paper_combo.blockSignals(False)
 
     def _get_paper_id_by_size(self, size):
         """根据纸张尺寸获取标准ID"""
@@ -599,44 +737,32 @@ class MainWindow(QMainWindow):
     # end: 打印纸列表设置
 
     def show_printer_info(self):
+        """显示完整的打印机信息（在后台重新查询默认打印机后显示）"""
         self.log_edit.clear()
-        """显示完整的打印机信息"""
-        try:
-            import win32print
-
-            printer_name = win32print.GetDefaultPrinter()
-            hprinter = win32print.OpenPrinter(printer_name)
-
-            # 获取打印机详细信息
-            info_level = 2
-            printer_info = win32print.GetPrinter(hprinter, info_level)
-
-            self.log_message("\n📋 打印机详细信息:")
-            self.log_message(f"名称: {printer_info['pPrinterName']}")
-            self.log_message(f"驱动程序: {printer_info['pDriverName']}")
-            self.log_message(f"端口: {printer_info['pPortName']}")
-            self.log_message(f"状态: {self.get_printer_status(printer_info['Status'])}")
-
-            # 显示纸张信息
-            self.show_paper_info()
+        printer_name = self.get_default_printer_by_default_name()
+        self.log_message(f"🔄 正在获取打印机 '{printer_name}' 的信息...")
+        self.start_printer_discovery(force=True, names=[printer_name],
+                                     on_done=lambda changed: self.log_printer_info(printer_name))
+
+    def log_printer_info(self, printer_name):
+        caps = self.printer_catalog.get(printer_name)
+        if caps is None or caps.error:
+            error = caps.error if caps is not None else "打印机不存在"
+            self.log_message(f"❌ 获取打印机信息失败: {error}")
+            return
 
-            win32print.ClosePrinter(hprinter)
+        self.log_message("\n📋 打印机详细信息:")
+        self.log_message(f"名称: {caps.name}")
+        self.log_message(f"驱动程序: {caps.driver}")
+        self.log_message(f"端口: {caps.port}")
+        self.log_message(f"状态: {self.get_printer_status(caps.status)}")
 
-        except Exception as e:
-            self.log_message(f"❌ 获取打印机信息失败: {str(e)}")
+        # 显示纸张信息
+        self.show_paper_info(printer_name)
 
     def get_printer_status(self, status_code):
-        """将状态代码转换为可读文本"""
-        status_map = {
-            0: "准备就绪",
-            1: "暂停",
-            2: "错误",
-            3: "待删除",
-            4: "纸张卡住",
-            5: "纸张用完",
-            # ... 其他状态码 ...
-        }
-        return status_map.get(status_code, f"未知状态 ({status_code})")
+        """将 GetPrinter 的状态位转换为可读文本（状态是按位组合的，不是序号）"""
+        return describe_printer_status(status_code)
 
     def select_source_dir(self):
         dir_path = QFileDialog.getExistingDirectory(self, "选择源目录")
@@ -644,7 +770,15 @@ class MainWindow(QMainWindow):
             self.source_edit.setText(dir_path)
 
     def log_message(self, message: str):
-        self.log_edit.append(message)
+        # 先显示缓冲区中更早的打印日志，保证顺序
+        self.flush_log_buffer()
+        self.log_edit.appendPlainText(message)
+
+    def flush_log_buffer(self):
+        """把缓冲区中的打印日志一次性追加到日志框"""
+        lines = self.log_buffer.drain(int(self.config_manager.get("log_flush_max_lines", 1000)))
+        if lines:
+            self.log_edit.appendPlainText("\n".join(lines))
 
     def start_printing(self):
         if not self.source_edit.text():
@@ -657,30 +791,74 @@ class MainWindow(QMainWindow):
         self.save_config(False)  # 开始前自动保存配置，不提示保存成功弹出框
 
         config = self.config_manager.get_all()
-        self.printer_thread = PrinterThread(config, self)
+        self.printer_thread = PrinterThread(config, self, self.log_buffer)
         self.printer_thread.log_message.connect(self.log_message)
+        self.printer_thread.progress.connect(self.update_progress)
+        self.printer_thread.pauses_changed.connect(self.update_pauses)
         self.printer_thread.finished.connect(self.printing_finished)
 
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
+        self.drain_btn.setEnabled(True)
         self.log_edit.clear()
+        self.progress_bar.setValue(0)
+        self.eta_label.setText("预计剩余: --:--:--")
 
         self.printer_thread.start()
+        self.log_timer.start()
 
-    def stop_printing(self):
+    def stop_printing(self, drain=False):
+        """
+        停止打印：各种等待在 0.5 秒内结束，打印线程自行关闭 Excel、完成文件移动后发出 finished，
+        不再强制终止线程。drain=True 时打印完正在打印的文件后停止，之后仍可点击停止打印立即停止。
+        """
         if self.printer_thread and self.printer_thread.isRunning():
-            self.printer_thread.stop()  # 调用停止方法
-            self.log_message("🛑 正在停止打印...")
-            if not self.printer_thread.wait(2000):  # 等待2秒线程结束
-                self.printer_thread.terminate()  # 强制终止
-                self.log_message("⚠️ 打印线程已强制终止")
+            self.printer_thread.stop(drain)  # 调用停止方法
+            self.log_message("🛑 打印完当前文件后停止..." if drain else "🛑 正在停止打印...")
+            self.drain_btn.setEnabled(False)
+            self.stop_btn.setEnabled(drain)
+            return
 
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
+        self.drain_btn.setEnabled(False)
+
+    def update_progress(self, done: int, total: int, eta: float):
+        """更新打印进度和预计剩余时间"""
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"{done}/{total}")
+        self.eta_label.setText(f"预计剩余: {format_eta(eta)}")
+
+    def update_pauses(self, pauses: list):
+        """打印线程中的诊所边界暂停开始或结束"""
+        now = time.monotonic()
+        self.pauses = [dict(pause, deadline=now + pause["remaining"]) for pause in pauses]
+        self.refresh_pause_countdown()
+        if self.pauses:
+            self.pause_timer.start()
+        else:
+            self.pause_timer.stop()
+
+    def refresh_pause_countdown(self):
+        now = time.monotonic()
+        lines = [f"📁 诊所 {pause['clinic']} 打印完成，[{pause['printer']}] "
+                 f"{max(0, int(pause['deadline'] - now + 0.999))} 秒后继续打印下一个诊所"
+                 for pause in self.pauses]
+        self.pause_label.setText("\n".join(lines))
+        self.pause_widget.setVisible(bool(lines))
+
+    def skip_pause(self):
+        if self.printer_thread is not None:
+            self.printer_thread.skip_pause()
 
     def printing_finished(self, success: bool):
+        self.update_pauses([])
+        self.log_timer.stop()
+        self.flush_log_buffer()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
+        self.drain_btn.setEnabled(False)
 
         if success:
             self.log_message("✅ 所有文件打印完成")
@@ -697,8 +875,16 @@ class MainWindow(QMainWindow):
 
             if reply == QMessageBox.Yes:
                 self.stop_printing()
+                # 等待打印线程关闭 Excel 和完成文件移动；Excel 无响应时才强制终止
+                if not self.printer_thread.wait(10000):
+                    self.printer_thread.terminate()
                 event.accept()
             else:
                 event.ignore()
         else:
             event.accept()
+
+        if event.isAccepted():
+            # 后台的打印机查询线程结束后再销毁窗口
+            for thread in list(self._discovery_threads):
+                thread.wait(3000)
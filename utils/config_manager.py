@@ -1,7 +1,7 @@
 import json
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .path_utils import get_app_path, ensure_directory_exists
 
 DEFAULT_CONFIG = {
@@ -10,18 +10,86 @@ DEFAULT_CONFIG = {
     "default_paper_size": 132,
     "default_paper_zoom": 75,
     "delay_seconds": 5,
+    "pacing_mode": "adaptive",
+    "min_delay_seconds": 0.5,
+    "queue_high_water": 2,
+    "pacing_poll_interval": 0.25,
+    "printer_error_backoff_max": 60,
+    "printer_error_max_wait": 600,
+    "parallel_dispatch": True,
+    "switch_default_printer": False,
+    "pdf_print_method": "auto",
+    "sumatra_path": "",
+    "pdf_wait_for": "spooled",
+    "pdf_wait_timeout": 60,
+    "pdf_submit_grace": 15,
+    "enable_journal": True,
+    "journal_path": "",
+    "watch_mode": False,
+    "watch_settle_seconds": 2,
+    "watch_poll_interval": 0.5,
+    "watch_use_notifications": True,
+    "log_flush_interval_ms": 100,
+    "log_flush_max_lines": 1000,
+    "log_buffer_max_lines": 10000,
+    "log_view_max_lines": 5000,
     "enable_wait_prompt": True,
     "wait_prompt_sleep": 30,
+    "wait_prompt_printers": [],
     "bw_print": True,
     "duplex_print": False,
     "print_firstPage": False,
+    "excel_pool_size": 1,
+    "excel_recycle_after": 50,
+    "excel_batch_page_setup": True,
+    "excel_prerender": False,
+    "prerender_converter": "excel",
+    "libreoffice_path": "",
+    "prerender_workers": 1,
+    "prerender_lookahead": 4,
+    "prerender_dir": "",
+    "render_cache": True,
+    "render_cache_dir": "",
+    "render_cache_max_mb": 512,
+    "metrics_textfile": "",
+    "metrics_port": 0,
+    "metrics_summary": True,
+    "async_move": True,
+    "schedule_policy": "scan",
+    "clinic_priority": {},
+    "printer_backend": "win32",
+    "simulated_backend": {},
+    "printer_cache_ttl": 3600,
+    "preflight": True,
+    "preflight_workers": 4,
+    "pages_per_minute": 10,
+    "printer_pages_per_minute": {},
+    "merge_clinic_jobs": False,
+    "merge_max_files": 50,
+    "health_monitor": True,
+    "health_check_interval": 2,
+    "health_recovery_checks": 2,
+    "health_cooldown_seconds": 30,
+    "health_retry_limit": 3,
+    "printer_failover": {},
+    "printer_classes": {},
+    "retry_failed": True,
+    "retry_policies": {},
+    "quarantine_failed": True,
+    "quarantine_dir": "",
+    "quarantine_preflight": False,
 }
 
 
 class ConfigManager:
-    def __init__(self):
-        self.config_dir = ensure_directory_exists(get_app_path("config"))
-        self.config_path = os.path.join(self.config_dir, "settings.json")
+    def __init__(self, config_path: Optional[str] = None):
+        # config_path 为空时使用程序目录下的 config/settings.json（命令行可指定其他配置文件）
+        if config_path:
+            self.config_dir = os.path.dirname(os.path.abspath(config_path))
+            self.config_path = config_path
+        else:
+            self.config_dir = ensure_directory_exists(get_app_path("config"))
+            self.config_path = os.path.join(self.config_dir, "settings.json")
         self.config = DEFAULT_CONFIG.copy()
         self.load_config()
 
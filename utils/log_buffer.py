@@ -0,0 +1,39 @@
+import threading
+from collections import deque
+from typing import List
+
+
+class LogBuffer:
+    """
+    工作线程和界面之间的日志缓冲区（环形队列）。
+
+    工作线程只做一次 append，不再每行发送一次跨线程信号；界面定时调用 drain() 批量取出。
+    界面跟不上时丢弃最旧的行，并在下一批开头注明丢弃的行数（完整日志见日志文件）。
+    """
+
+    def __init__(self, max_pending: int = 10000):
+        self._lines = deque(maxlen=max(1, int(max_pending)))
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self.total = 0
+
+    def append(self, line: str):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(line)
+            self.total += 1
+
+    def drain(self, max_lines: int = 0) -> List[str]:
+        """取出缓冲的日志行，max_lines 为 0 时全部取出"""
+        with self._lock:
+            count = len(self._lines) if max_lines <= 0 else min(max_lines, len(self._lines))
+            lines = [self._lines.popleft() for _ in range(count)]
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            lines.insert(0, f"⚠️ 日志过多，界面省略了 {dropped} 行，完整内容请查看日志文件")
+        return lines
+
+    def __len__(self):
+        with self._lock:
+            return len(self._lines)